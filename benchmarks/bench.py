@@ -0,0 +1,316 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from uuid import uuid4
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+
+OPERATIONS = ("create_event", "create_bet", "settle", "get_bets")
+
+# Фоновые запросы, не связанные с нагрузкой: проверка отставания реплик.
+IGNORED_QUERIES = {"replica_lag"}
+
+
+class Operation:
+    """
+    Результаты одной операции нагрузочного сценария.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.duration = 0.0
+        self.queries: Dict[str, int] = {}
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Возвращает пропускную способность, перцентили задержки и число запросов к базе на операцию.
+        """
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        round_trips = sum(self.queries.values())
+        return {
+            "count": count,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "duration_s": round(self.duration, 3),
+            "throughput_rps": round(count / self.duration, 1) if self.duration else 0.0,
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50) * 1000, 2),
+                "p99": round(percentile(latencies, 99) * 1000, 2),
+                "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+                "mean": round(sum(latencies) / count * 1000, 2) if count else 0.0,
+            },
+            "db_round_trips_per_op": round(round_trips / count, 2) if count else 0.0,
+            "db_queries": dict(sorted(self.queries.items())),
+        }
+
+
+def percentile(values: List[float], rank: float) -> float:
+    """
+    Возвращает перцентиль отсортированного списка методом ближайшего ранга.
+
+    :param values: Отсортированные значения.
+    :param rank: Перцентиль от 0 до 100.
+    :return: Значение перцентиля или 0, если список пуст.
+    """
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(len(values) * rank / 100 + 0.5) - 1))
+    return values[index]
+
+
+async def request(session: ClientSession, method: str, url: str, expected_status: int, **kwargs) -> Any:
+    """
+    Выполняет HTTP-запрос и возвращает ответ в формате JSON.
+
+    :param session: Экземпляр ClientSession для выполнения запросов.
+    :param method: HTTP-метод.
+    :param url: URL запроса.
+    :param expected_status: Ожидаемый HTTP-статус ответа.
+    :param kwargs: Дополнительные параметры запроса.
+    :return: Ответ в формате JSON.
+    :raises RuntimeError: Если статус ответа отличается от ожидаемого.
+    """
+    async with session.request(method, url, **kwargs) as response:
+        body = await response.read()
+        if response.status != expected_status:
+            raise RuntimeError(f"{method} {url}: {response.status} {body[:200].decode(errors='replace')}")
+        return json.loads(body) if body else None
+
+
+async def query_counts(session: ClientSession) -> Dict[str, int]:
+    """
+    Возвращает число выполненных bet-maker запросов к базе данных по именам запросов,
+    суммируя основную базу и реплики.
+
+    :param session: Сессия bet-maker.
+    :return: Словарь имя запроса -> число выполнений.
+    """
+    pools = [await request(session, "GET", "/db/stats", 200)]
+    pools += [replica["pool"] for replica in await request(session, "GET", "/db/replicas", 200)]
+    counts: Dict[str, int] = {}
+    for pool in pools:
+        for name, stats in pool["queries"].items():
+            if name not in IGNORED_QUERIES:
+                counts[name] = counts.get(name, 0) + stats["count"]
+    return counts
+
+
+async def run_phase(operation: Operation, calls: List[Callable[[], Awaitable[Any]]], concurrency: int,
+                    bet_maker: ClientSession) -> None:
+    """
+    Выполняет вызовы операции не более чем в concurrency одновременных запросов
+    и записывает задержку каждого вызова и число запросов bet-maker к базе данных.
+
+    :param operation: Результаты операции.
+    :param calls: Вызовы операции.
+    :param concurrency: Число одновременных запросов.
+    :param bet_maker: Сессия bet-maker для чтения статистики базы данных.
+    """
+    pending = iter(calls)
+
+    async def worker() -> None:
+        for call in pending:
+            started = time.perf_counter()
+            try:
+                await call()
+            except Exception as error:
+                operation.errors += 1
+                operation.last_error = str(error) or repr(error)
+            else:
+                operation.latencies.append(time.perf_counter() - started)
+
+    before = await query_counts(bet_maker)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    operation.duration = time.perf_counter() - started
+    after = await query_counts(bet_maker)
+    operation.queries = {name: count - before.get(name, 0) for name, count in after.items()
+                         if count != before.get(name, 0)}
+
+
+async def run_scenario(args: argparse.Namespace, events: int, bets_per_event: int,
+                       operations: Dict[str, Operation]) -> None:
+    """
+    Прогоняет сценарий create_event -> create_bet -> settle -> get_bets.
+
+    :param args: Параметры запуска.
+    :param events: Число событий.
+    :param bets_per_event: Число ставок на событие.
+    :param operations: Результаты операций, которые дополняются этим прогоном.
+    """
+    rng = random.Random(args.seed)
+    run_id = uuid4().hex[:8]
+    event_ids = [f"bench-{run_id}-{index}" for index in range(events)]
+    deadline = (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat()
+    coefficients = {event_id: round(rng.uniform(1.1, 5), 2) for event_id in event_ids}
+    results = {event_id: rng.choice(("finished_win", "finished_lose")) for event_id in event_ids}
+    bets = [(event_id, round(rng.uniform(1, 1000), 2)) for _ in range(bets_per_event) for event_id in event_ids]
+    timeout = ClientTimeout(total=args.timeout)
+
+    async with ClientSession(base_url=args.line_provider_url, timeout=timeout,
+                             connector=TCPConnector(limit=args.concurrency)) as line_provider, \
+            ClientSession(base_url=args.bet_maker_url, timeout=timeout,
+                          connector=TCPConnector(limit=args.concurrency)) as bet_maker:
+        phases = {
+            "create_event": [
+                lambda event_id=event_id: request(line_provider, "POST", "/events/", 201, json={
+                    "event_id": event_id,
+                    "coefficient": coefficients[event_id],
+                    "deadline": deadline,
+                    "state": "new",
+                })
+                for event_id in event_ids
+            ],
+            "create_bet": [
+                lambda event_id=event_id, amount=amount: request(
+                    bet_maker, "POST", "/bets/", 201, json={"event_id": event_id, "amount": amount}
+                )
+                for event_id, amount in bets
+            ],
+            "settle": [
+                lambda event_id=event_id: request(
+                    bet_maker, "POST", "/bets/update", 200,
+                    json={"event_id": event_id, "status": results[event_id]}
+                )
+                for event_id in event_ids
+            ],
+            "get_bets": [
+                lambda event_id=event_id: request(
+                    bet_maker, "GET", "/bets/", 200, params={"event_id": event_id, "limit": args.page_size}
+                )
+                for event_id in event_ids
+            ],
+        }
+        for name in OPERATIONS:
+            await run_phase(operations[name], phases[name], args.concurrency, bet_maker)
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Сравнивает результаты с базовыми и печатает изменения по операциям.
+
+    Регрессией считается падение пропускной способности, рост p99 или рост числа
+    запросов к базе на операцию больше чем на threshold процентов.
+
+    :param report: Результаты текущего запуска.
+    :param baseline: Результаты базового запуска.
+    :param threshold: Допустимое ухудшение в процентах.
+    :return: Описания регрессий.
+    """
+    if report["params"] != baseline["params"]:
+        print(f"warning: parameters differ from the baseline: {baseline['params']}")
+
+    def change(current: float, base: float) -> float:
+        return (current - base) / base * 100 if base else 0.0
+
+    regressions = []
+    print(f"\n{'operation':<14}{'throughput':>14}{'p50':>10}{'p99':>10}{'db/op':>10}")
+    for name, current in report["operations"].items():
+        base = baseline["operations"].get(name)
+        if base is None:
+            continue
+        throughput = change(current["throughput_rps"], base["throughput_rps"])
+        p50 = change(current["latency_ms"]["p50"], base["latency_ms"]["p50"])
+        p99 = change(current["latency_ms"]["p99"], base["latency_ms"]["p99"])
+        round_trips = change(current["db_round_trips_per_op"], base["db_round_trips_per_op"])
+        print(f"{name:<14}{throughput:>+13.1f}%{p50:>+9.1f}%{p99:>+9.1f}%{round_trips:>+9.1f}%")
+        if throughput < -threshold:
+            regressions.append(f"{name}: throughput {throughput:+.1f}%")
+        if p99 > threshold:
+            regressions.append(f"{name}: p99 latency {p99:+.1f}%")
+        if round_trips > threshold:
+            regressions.append(f"{name}: db round-trips per operation {round_trips:+.1f}%")
+    return regressions
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """
+    Печатает результаты запуска таблицей.
+
+    :param report: Результаты запуска.
+    """
+    print(f"{'operation':<14}{'count':>8}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p99 ms':>10}"
+          f"{'max ms':>10}{'db/op':>8}")
+    for name, result in report["operations"].items():
+        latency = result["latency_ms"]
+        print(f"{name:<14}{result['count']:>8}{result['errors']:>8}{result['throughput_rps']:>10}"
+              f"{latency['p50']:>10}{latency['p99']:>10}{latency['max']:>10}{result['db_round_trips_per_op']:>8}")
+        if result["last_error"]:
+            print(f"  last error: {result['last_error']}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Load test for bet placement and settlement: create_event -> create_bet -> settle -> get_bets."
+    )
+    parser.add_argument("--bet-maker-url", default=os.getenv("SERVICE_BET_MAKER_URL", "http://localhost:8000"))
+    parser.add_argument("--line-provider-url",
+                        default=os.getenv("SERVICE_LINE_PROVIDER_URL", "http://localhost:8001"))
+    parser.add_argument("--events", type=int, default=50, help="The number of events to create")
+    parser.add_argument("--bets-per-event", type=int, default=20, help="The number of bets on each event")
+    parser.add_argument("--concurrency", type=int, default=20, help="The number of concurrent requests")
+    parser.add_argument("--page-size", type=int, default=50, help="The limit of each get_bets request")
+    parser.add_argument("--warmup-events", type=int, default=5,
+                        help="Events in the unmeasured warm-up run that fills caches and connection pools")
+    parser.add_argument("--seed", type=int, default=1, help="The seed for bet amounts and event results")
+    parser.add_argument("--timeout", type=float, default=30, help="The timeout of a single request in seconds")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare the results with this JSON file written by --output")
+    parser.add_argument("--max-regression", type=float, default=10,
+                        help="Exit with code 1 if an operation is this many percent worse than the baseline")
+    return parser.parse_args()
+
+
+async def main() -> int:
+    args = parse_args()
+    params = {
+        "events": args.events,
+        "bets_per_event": args.bets_per_event,
+        "concurrency": args.concurrency,
+        "page_size": args.page_size,
+        "seed": args.seed,
+    }
+
+    if args.warmup_events:
+        warmup = {name: Operation(name) for name in OPERATIONS}
+        await run_scenario(args, args.warmup_events, args.bets_per_event, warmup)
+        errors = {name: operation.last_error for name, operation in warmup.items() if operation.errors}
+        if errors:
+            print(f"warm-up failed: {errors}")
+            return 1
+
+    started_at = datetime.now(timezone.utc).isoformat()
+    operations = {name: Operation(name) for name in OPERATIONS}
+    await run_scenario(args, args.events, args.bets_per_event, operations)
+    report = {
+        "params": params,
+        "started_at": started_at,
+        "operations": {name: operation.report() for name, operation in operations.items()},
+    }
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(report, json.load(file), args.max_regression)
+        if regressions:
+            print("\nregressions:\n  " + "\n  ".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
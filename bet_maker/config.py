@@ -1,3 +1,6 @@
+from decimal import Decimal
+from typing import List
+
 from pydantic import PostgresDsn, Field
 from pydantic_settings import BaseSettings
 
@@ -24,8 +27,89 @@ class Settings(BaseSettings):
             f"@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
         )
 
+    DB_POOL_MIN_SIZE: int = Field(default=5, ge=0, env="DB_POOL_MIN_SIZE")
+    DB_POOL_MAX_SIZE: int = Field(default=20, gt=0, env="DB_POOL_MAX_SIZE")
+    DB_STATEMENT_CACHE_SIZE: int = Field(default=100, ge=0, env="DB_STATEMENT_CACHE_SIZE")
+    DB_COMMAND_TIMEOUT: float = Field(default=30.0, gt=0, env="DB_COMMAND_TIMEOUT")
+    DB_SLOW_QUERY_MS: float = Field(default=500.0, gt=0, env="DB_SLOW_QUERY_MS")
+
+    DB_REPLICA_URLS: str = Field(default="", env="DB_REPLICA_URLS")
+    DB_REPLICA_CHECK_INTERVAL: float = Field(default=2.0, gt=0, env="DB_REPLICA_CHECK_INTERVAL")
+    DB_REPLICA_MAX_LAG: float = Field(default=5.0, ge=0, env="DB_REPLICA_MAX_LAG")
+
+    @property
+    def DATABASE_REPLICA_URLS(self) -> List[str]:
+        """
+        Возвращает строки подключения к репликам PostgreSQL, перечисленные через запятую в DB_REPLICA_URLS.
+        """
+        return [url.strip() for url in self.DB_REPLICA_URLS.split(",") if url.strip()]
+
     APP_HOST: str = Field(default="0.0.0.0", env="APP_HOST")
     APP_PORT: int = Field(default=8000, env="APP_PORT")
+    SERVER_LOOP: str = Field(default="auto", env="SERVER_LOOP")
+    SERVER_HTTP: str = Field(default="auto", env="SERVER_HTTP")
+    SERVER_BACKLOG: int = Field(default=2048, gt=0, env="SERVER_BACKLOG")
+    SERVER_KEEP_ALIVE_TIMEOUT: int = Field(default=75, gt=0, env="SERVER_KEEP_ALIVE_TIMEOUT")
+    GRACEFUL_SHUTDOWN_TIMEOUT: int = Field(default=10, gt=0, env="GRACEFUL_SHUTDOWN_TIMEOUT")
+    STARTUP_BUDGET: float = Field(default=10.0, gt=0, env="STARTUP_BUDGET")
+
+    LINE_PROVIDER_URL: str = Field(default="http://line-provider:8001", env="LINE_PROVIDER_URL")
+    LINE_PROVIDER_POOL_SIZE: int = Field(default=100, gt=0, env="LINE_PROVIDER_POOL_SIZE")
+    LINE_PROVIDER_KEEPALIVE_TIMEOUT: float = Field(default=30.0, gt=0, env="LINE_PROVIDER_KEEPALIVE_TIMEOUT")
+    LINE_PROVIDER_CONNECT_TIMEOUT: float = Field(default=0.5, gt=0, env="LINE_PROVIDER_CONNECT_TIMEOUT")
+    LINE_PROVIDER_TIMEOUT: float = Field(default=2.0, gt=0, env="LINE_PROVIDER_TIMEOUT")
+    LINE_PROVIDER_RETRIES: int = Field(default=2, ge=0, env="LINE_PROVIDER_RETRIES")
+    LINE_PROVIDER_RETRY_BACKOFF: float = Field(default=0.05, ge=0, env="LINE_PROVIDER_RETRY_BACKOFF")
+    LINE_PROVIDER_BREAKER_THRESHOLD: int = Field(default=5, gt=0, env="LINE_PROVIDER_BREAKER_THRESHOLD")
+    LINE_PROVIDER_BREAKER_RESET_TIMEOUT: float = Field(
+        default=10.0, gt=0, env="LINE_PROVIDER_BREAKER_RESET_TIMEOUT"
+    )
+
+    EVENT_CACHE_MAX_SIZE: int = Field(default=10000, gt=0, env="EVENT_CACHE_MAX_SIZE")
+    EVENT_CACHE_TTL: float = Field(default=30.0, gt=0, env="EVENT_CACHE_TTL")
+
+    BET_BATCH_MAX_SIZE: int = Field(default=10000, gt=0, env="BET_BATCH_MAX_SIZE")
+
+    IDEMPOTENCY_CACHE_MAX_SIZE: int = Field(default=100000, gt=0, env="IDEMPOTENCY_CACHE_MAX_SIZE")
+
+    BET_CLIENT_RATE_LIMIT: float = Field(default=0.0, ge=0, env="BET_CLIENT_RATE_LIMIT")
+    BET_CLIENT_BURST: int = Field(default=20, gt=0, env="BET_CLIENT_BURST")
+    BET_CLIENT_ID_HEADER: str = Field(default="", env="BET_CLIENT_ID_HEADER")
+    BET_EVENT_RATE_LIMIT: float = Field(default=0.0, ge=0, env="BET_EVENT_RATE_LIMIT")
+    BET_EVENT_BURST: int = Field(default=100, gt=0, env="BET_EVENT_BURST")
+    BET_RATE_LIMIT_MAX_KEYS: int = Field(default=100000, gt=0, env="BET_RATE_LIMIT_MAX_KEYS")
+    EVENT_MAX_TOTAL_STAKE: Decimal = Field(default=Decimal(0), ge=0, env="EVENT_MAX_TOTAL_STAKE")
+
+    BET_WRITE_BEHIND_ENABLED: bool = Field(default=False, env="BET_WRITE_BEHIND_ENABLED")
+    BET_WRITE_BATCH_SIZE: int = Field(default=500, gt=0, env="BET_WRITE_BATCH_SIZE")
+    BET_WRITE_BATCH_WINDOW_MS: float = Field(default=5.0, ge=0, env="BET_WRITE_BATCH_WINDOW_MS")
+    BET_WRITE_QUEUE_SIZE: int = Field(default=10000, gt=0, env="BET_WRITE_QUEUE_SIZE")
+    BET_WRITE_ENQUEUE_TIMEOUT: float = Field(default=0.1, ge=0, env="BET_WRITE_ENQUEUE_TIMEOUT")
+
+    BET_HISTORY_DEFAULT_LIMIT: int = Field(default=100, gt=0, env="BET_HISTORY_DEFAULT_LIMIT")
+    BET_HISTORY_MAX_LIMIT: int = Field(default=1000, gt=0, env="BET_HISTORY_MAX_LIMIT")
+    BET_HISTORY_STREAM_CHUNK_SIZE: int = Field(default=500, gt=0, env="BET_HISTORY_STREAM_CHUNK_SIZE")
+
+    BETS_PARTITIONING_ENABLED: bool = Field(default=False, env="BETS_PARTITIONING_ENABLED")
+    BETS_PARTITIONS_AHEAD: int = Field(default=2, ge=1, env="BETS_PARTITIONS_AHEAD")
+    BETS_RETENTION_MONTHS: int = Field(default=0, ge=0, env="BETS_RETENTION_MONTHS")
+    BETS_PARTITION_MAINTENANCE_INTERVAL: float = Field(
+        default=3600.0, gt=0, env="BETS_PARTITION_MAINTENANCE_INTERVAL"
+    )
+
+    SETTLEMENT_CHUNK_SIZE: int = Field(default=5000, gt=0, env="SETTLEMENT_CHUNK_SIZE")
+    SETTLEMENT_INLINE_CHUNKS: int = Field(default=1, ge=0, env="SETTLEMENT_INLINE_CHUNKS")
+    SETTLEMENT_WORKERS: int = Field(default=2, gt=0, env="SETTLEMENT_WORKERS")
+    SETTLEMENT_CHUNK_PAUSE: float = Field(default=0.01, ge=0, env="SETTLEMENT_CHUNK_PAUSE")
+    SETTLEMENT_RETRY_DELAY: float = Field(default=5.0, gt=0, env="SETTLEMENT_RETRY_DELAY")
+    SETTLEMENT_BATCH_MAX_SIZE: int = Field(default=1000, gt=0, env="SETTLEMENT_BATCH_MAX_SIZE")
+    SETTLEMENT_BATCH_CONCURRENCY: int = Field(default=8, gt=0, env="SETTLEMENT_BATCH_CONCURRENCY")
+
+    PROFILING_ENABLED: bool = Field(default=False, env="PROFILING_ENABLED")
+    PROFILING_SAMPLE_RATE: float = Field(default=0.01, ge=0, le=1, env="PROFILING_SAMPLE_RATE")
+    PROFILING_SLOW_REQUEST_MS: float = Field(default=500.0, gt=0, env="PROFILING_SLOW_REQUEST_MS")
+    PROFILING_TRACE_BUFFER_SIZE: int = Field(default=200, gt=0, env="PROFILING_TRACE_BUFFER_SIZE")
+    PROFILING_MAX_SECONDS: float = Field(default=60.0, gt=0, env="PROFILING_MAX_SECONDS")
 
     class Config:
         """
@@ -1,33 +1,104 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from fastapi import FastAPI, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+from metrics import STARTUP_DURATION, CacheCollector, MetricsMiddleware, register_collector, render_metrics
 from routers.bets import router as bets_router
 from routers.events import router as events_router
+from routers.database import router as database_router
+from routers.event_stats import router as event_stats_router
+from routers.debug import router as debug_router
 from provider.database import database
+from provider.event_cache import event_cache
+from provider.idempotency_cache import idempotency_cache
+from provider.line_provider import LineProviderError, line_provider_client
+from provider.migrations import apply_migrations
+from provider.replicas import read_database
+from provider.partitions import start_partition_maintenance, stop_partition_maintenance
+from profiling import ProfilingMiddleware
+from responses import ORJSONResponse
+from services.bet_writer import bet_write_queue
+from services.events import refresh_events
+from services.settlement import settlement_engine
 from config import settings
 
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Подключение к базе данных и применение миграций, проверка реплик, создание пула соединений
+    к line-provider, запуск очереди отложенной записи ставок и движка расчета
+    ставок, прогрев кэша событий при запуске приложения; остановка движка расчета
+    ставок, запись оставшихся в очереди ставок, закрытие пула соединений к line-provider
+    и отключение от реплик и базы данных при остановке.
+
+    Выполняется в рабочем процессе после его запуска. Длительность запуска
+    попадает в метрику app_startup_duration_seconds; прогрев кэша событий не обязателен
+    и прерывается, если запуск не укладывается в STARTUP_BUDGET секунд.
+    """
+    started = time.perf_counter()
+    await database.connect()
+    await apply_migrations()
+    await read_database.start()
+    if settings.BETS_PARTITIONING_ENABLED:
+        await start_partition_maintenance()
+    await line_provider_client.start()
+    if settings.BET_WRITE_BEHIND_ENABLED:
+        await bet_write_queue.start()
+    await settlement_engine.start()
+    remaining = settings.STARTUP_BUDGET - (time.perf_counter() - started)
+    try:
+        await asyncio.wait_for(refresh_events(), timeout=max(remaining, 0))
+    except (LineProviderError, asyncio.TimeoutError):
+        pass
+    elapsed = time.perf_counter() - started
+    STARTUP_DURATION.set(elapsed)
+    if elapsed > settings.STARTUP_BUDGET:
+        logger.warning("Startup took %.2f s, over the budget of %.2f s", elapsed, settings.STARTUP_BUDGET)
+
+    yield
+
+    await settlement_engine.stop()
+    await bet_write_queue.stop()
+    await stop_partition_maintenance()
+    await line_provider_client.close()
+    await read_database.stop()
+    await database.disconnect()
+
+
 app = FastAPI(
     title="Bet Maker Service",
     description="Сервис для работы с ставками",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
+app.add_middleware(MetricsMiddleware)
+register_collector(CacheCollector({"event": event_cache, "idempotency": idempotency_cache}))
+
 app.include_router(bets_router, prefix="/bets", tags=["Bets"])
 app.include_router(events_router, prefix="/get_events", tags=["Events"])
+app.include_router(event_stats_router, prefix="/events", tags=["Events"])
+app.include_router(database_router, prefix="/db", tags=["Database"])
 
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+    app.include_router(debug_router, prefix="/debug", tags=["Debug"])
 
-@app.on_event("startup")
-async def startup() -> None:
-    """
-    Подключение к базе данных при запуске приложения.
-    """
-    await database.connect()
 
-
-@app.on_event("shutdown")
-async def shutdown() -> None:
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
     """
-    Отключение от базы данных при остановке приложения.
+    Возвращает метрики приложения в текстовом формате Prometheus.
     """
-    await database.disconnect()
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
 
 
 if __name__ == "__main__":
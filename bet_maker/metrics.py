@@ -0,0 +1,160 @@
+import os
+import time
+from typing import Any, Dict, Iterator
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Границы корзин гистограмм длительности: от половины миллисекунды до десяти секунд.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+LINE_PROVIDER_REQUEST_DURATION = Histogram(
+    "line_provider_request_duration_seconds",
+    "Latency of a single request to line-provider by operation and response status",
+    ["operation", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+LINE_PROVIDER_ERRORS = Counter(
+    "line_provider_errors_total",
+    "Failed line-provider calls by operation and reason",
+    ["operation", "reason"],
+)
+
+DB_POOL_ACQUIRE_DURATION = Histogram(
+    "db_pool_acquire_duration_seconds",
+    "Time spent waiting for a pooled database connection",
+    ["pool"],
+    buckets=LATENCY_BUCKETS,
+)
+
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Database query latency by pool and query name",
+    ["pool", "query"],
+    buckets=LATENCY_BUCKETS,
+)
+
+SETTLEMENT_DURATION = Histogram(
+    "settlement_duration_seconds",
+    "Time from receiving an event result to settling all bets of the event",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0),
+)
+
+SETTLED_BETS = Counter(
+    "settled_bets_total",
+    "Bets settled by resulting status",
+    ["status"],
+)
+
+BETS_REJECTED = Counter(
+    "bets_rejected_total",
+    "Bets rejected by admission control by reason",
+    ["reason"],
+)
+
+STARTUP_DURATION = Gauge(
+    "app_startup_duration_seconds",
+    "Time taken by application startup in the slowest worker process",
+    multiprocess_mode="max",
+)
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware, измеряющее длительность обработки HTTP-запросов.
+
+    Запрос учитывается по шаблону маршрута (например, /bets/{bet_id}), а не по
+    фактическому пути, чтобы число временных рядов не зависело от идентификаторов
+    в URL. Запросы, не попавшие ни в один маршрут, учитываются под маршрутом unmatched.
+    Для потоковых ответов учитывается время до отправки последней порции тела.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status)
+            ).observe(time.perf_counter() - started)
+
+
+class CacheCollector:
+    """
+    Сборщик метрик локальных кэшей.
+
+    Кэши и так считают попадания и промахи, поэтому значения читаются
+    из них только в момент запроса /metrics и не добавляют работы при обращении к кэшу.
+    """
+
+    def __init__(self, caches: Dict[str, Any]) -> None:
+        self.caches = caches
+
+    def collect(self) -> Iterator[Metric]:
+        hits = CounterMetricFamily("cache_hits", "Lookups served from the cache", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Lookups not served from the cache", labels=["cache"])
+        entries = GaugeMetricFamily("cache_entries", "The number of cached entries", labels=["cache"])
+        for name, cache in self.caches.items():
+            hits.add_metric([name], cache.hits)
+            misses.add_metric([name], cache.misses)
+            entries.add_metric([name], len(cache))
+        yield hits
+        yield misses
+        yield entries
+
+
+_collectors = []
+
+
+def register_collector(collector: Any) -> None:
+    """
+    Регистрирует сборщик метрик, значения которого вычисляются при запросе /metrics.
+
+    :param collector: Объект с методом collect.
+    """
+    REGISTRY.register(collector)
+    _collectors.append(collector)
+
+
+def render_metrics() -> bytes:
+    """
+    Возвращает метрики в текстовом формате Prometheus.
+
+    Если задана переменная PROMETHEUS_MULTIPROC_DIR, счётчики и гистограммы
+    суммируются по всем процессам приложения, а сборщики из register_collector
+    отражают процесс, ответивший на запрос.
+
+    :return: Текст метрик.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    for collector in _collectors:
+        registry.register(collector)
+    return generate_latest(registry)
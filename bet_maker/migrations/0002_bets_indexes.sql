@@ -0,0 +1,9 @@
+-- Settlement: pending bets of one event.
+CREATE INDEX IF NOT EXISTS bets_event_id_pending_idx ON bets (event_id) WHERE status = 'pending';
+
+-- History: keyset pages filtered by event or by status.
+CREATE INDEX IF NOT EXISTS bets_event_id_bet_id_idx ON bets (event_id, bet_id);
+CREATE INDEX IF NOT EXISTS bets_status_bet_id_idx ON bets (status, bet_id);
+
+-- History: time range filters.
+CREATE INDEX IF NOT EXISTS bets_created_at_idx ON bets (created_at);
@@ -0,0 +1,12 @@
+CREATE TABLE IF NOT EXISTS settlements (
+    event_id VARCHAR(50) PRIMARY KEY,
+    event_status VARCHAR(20) NOT NULL,
+    bet_status VARCHAR(20) NOT NULL,
+    state VARCHAR(20) NOT NULL DEFAULT 'pending',
+    settled_bets INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS settlements_unfinished_idx ON settlements (created_at) WHERE state <> 'completed';
@@ -0,0 +1,5 @@
+ALTER TABLE bets ADD COLUMN IF NOT EXISTS coefficient DECIMAL(10, 2) CHECK (coefficient > 0);
+ALTER TABLE bets ADD COLUMN IF NOT EXISTS payout DECIMAL(14, 2);
+
+ALTER TABLE settlements ADD COLUMN IF NOT EXISTS total_stake DECIMAL(16, 2) NOT NULL DEFAULT 0;
+ALTER TABLE settlements ADD COLUMN IF NOT EXISTS total_payout DECIMAL(16, 2) NOT NULL DEFAULT 0;
@@ -0,0 +1,31 @@
+CREATE TABLE IF NOT EXISTS event_stats (
+    event_id VARCHAR(50) PRIMARY KEY,
+    bet_count INTEGER NOT NULL DEFAULT 0,
+    total_stake DECIMAL(16, 2) NOT NULL DEFAULT 0,
+    pending_count INTEGER NOT NULL DEFAULT 0,
+    pending_stake DECIMAL(16, 2) NOT NULL DEFAULT 0,
+    pending_liability DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    won_count INTEGER NOT NULL DEFAULT 0,
+    lost_count INTEGER NOT NULL DEFAULT 0,
+    total_payout DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Backfill: aggregates of the bets accepted before the table existed.
+INSERT INTO event_stats (
+    event_id, bet_count, total_stake, pending_count, pending_stake, pending_liability,
+    won_count, lost_count, total_payout
+)
+SELECT
+    event_id,
+    count(*),
+    SUM(amount),
+    count(*) FILTER (WHERE status = 'pending'),
+    COALESCE(SUM(amount) FILTER (WHERE status = 'pending'), 0),
+    COALESCE(SUM(ROUND(amount * coefficient, 2)) FILTER (WHERE status = 'pending'), 0),
+    count(*) FILTER (WHERE status = 'won'),
+    count(*) FILTER (WHERE status = 'lost'),
+    COALESCE(SUM(payout), 0)
+FROM bets
+GROUP BY event_id
+ON CONFLICT (event_id) DO NOTHING;
@@ -0,0 +1,7 @@
+-- Idempotency keys of POST /bets. Kept outside of bets: a unique index on a table
+-- partitioned by created_at must include created_at and would not dedupe retries.
+CREATE TABLE IF NOT EXISTS bet_idempotency_keys (
+    idempotency_key VARCHAR(255) PRIMARY KEY,
+    bet_id INTEGER NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
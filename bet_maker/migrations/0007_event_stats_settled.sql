@@ -0,0 +1,6 @@
+ALTER TABLE event_stats ADD COLUMN IF NOT EXISTS settled BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- Backfill: events whose result was recorded before the column existed.
+INSERT INTO event_stats (event_id, settled)
+SELECT event_id, TRUE FROM settlements
+ON CONFLICT (event_id) DO UPDATE SET settled = TRUE;
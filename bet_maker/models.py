@@ -1,5 +1,7 @@
 from enum import Enum
+from datetime import datetime
 from decimal import Decimal
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -20,6 +22,8 @@ class Bet(BaseModel):
     event_id: str = Field(..., description="The unique identifier of the event")
     amount: Decimal = Field(..., gt=0, description="The amount of the bet")
     status: BetStatus = Field(BetStatus.PENDING, description="The status of the bet")
+    coefficient: Optional[Decimal] = Field(None, description="The event coefficient locked in for the bet")
+    payout: Optional[Decimal] = Field(None, description="The payout computed when the bet was settled")
 
 
 class CreateBetRequest(BaseModel):
@@ -38,6 +42,34 @@ class CreateBetResponse(BaseModel):
     event_id: str = Field(..., description="The identifier of the related event")
     amount: float = Field(..., description="The amount of the bet")
     status: str = Field(..., description="The current status of the bet")
+    coefficient: float = Field(..., description="The event coefficient locked in for the bet")
+
+
+class CreateBetBatchRequest(BaseModel):
+    """
+    Модель запроса для пакетного создания ставок.
+    """
+    bets: List[CreateBetRequest] = Field(..., min_length=1, description="The bets to create")
+
+
+class BatchBetResult(BaseModel):
+    """
+    Результат создания одной ставки из пакета.
+    """
+    index: int = Field(..., description="The position of the bet in the request")
+    bet_id: Optional[str] = Field(None, description="The unique identifier of the created bet")
+    event_id: str = Field(..., description="The identifier of the related event")
+    status: Optional[str] = Field(None, description="The current status of the created bet")
+    error: Optional[str] = Field(None, description="The reason the bet was rejected")
+
+
+class CreateBetBatchResponse(BaseModel):
+    """
+    Модель ответа после пакетного создания ставок.
+    """
+    accepted: int = Field(..., description="The number of created bets")
+    rejected: int = Field(..., description="The number of rejected bets")
+    results: List[BatchBetResult] = Field(..., description="Per-item results in request order")
 
 
 class BetHistoryResponse(BaseModel):
@@ -48,3 +80,165 @@ class BetHistoryResponse(BaseModel):
     event_id: str = Field(..., description="The unique identifier of the event")
     amount: Decimal = Field(..., gt=0, description="The amount of the bet")
     status: BetStatus = Field(BetStatus.PENDING, description="The status of the bet")
+    coefficient: Optional[Decimal] = Field(None, description="The event coefficient locked in for the bet")
+    payout: Optional[Decimal] = Field(None, description="The payout computed when the bet was settled")
+    created_at: Optional[datetime] = Field(None, description="The time the bet was accepted")
+
+
+class SortOrder(str, Enum):
+    """
+    Enum, представляющий порядок сортировки истории ставок по идентификатору.
+    """
+    ASC = "asc"
+    DESC = "desc"
+
+
+class SettlementState(str, Enum):
+    """
+    Enum, представляющий стадии расчёта ставок по завершённому событию.
+    """
+    PENDING = "pending"
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+
+
+class Settlement(BaseModel):
+    """
+    Модель, представляющая ход расчёта ставок по завершённому событию.
+    """
+    event_id: str = Field(..., description="The unique identifier of the event")
+    event_status: str = Field(..., description="The final status of the event")
+    bet_status: BetStatus = Field(..., description="The status assigned to the pending bets of the event")
+    state: SettlementState = Field(..., description="The current stage of the settlement")
+    settled_bets: int = Field(..., description="The number of bets settled so far")
+    total_stake: Decimal = Field(..., description="The total amount of the bets settled so far")
+    total_payout: Decimal = Field(..., description="The total payout of the bets settled so far")
+    created_at: datetime = Field(..., description="The time the event result was recorded")
+    updated_at: datetime = Field(..., description="The time of the last settlement progress")
+    completed_at: Optional[datetime] = Field(None, description="The time the settlement was completed")
+
+
+class EventResult(BaseModel):
+    """
+    Модель результата события, передаваемого для расчёта ставок.
+    """
+    event_id: str = Field(..., description="The unique identifier of the event")
+    status: str = Field(..., description="The final status of the event")
+
+
+class SettlementResponse(BaseModel):
+    """
+    Модель ответа на передачу результата события для расчёта ставок.
+    """
+    message: str = Field(..., description="The human readable result of the request")
+    settlement: Settlement = Field(..., description="The current progress of the settlement")
+
+
+class EventState(str, Enum):
+    """
+    Enum, представляющий возможные статусы события в line-provider.
+    """
+    NEW = "new"
+    CLOSED = "closed"
+    FINISHED_WIN = "finished_win"
+    FINISHED_LOSE = "finished_lose"
+
+
+class Event(BaseModel):
+    """
+    Модель события, получаемого от line-provider.
+    """
+    event_id: str = Field(..., description="The unique identifier of the event")
+    coefficient: Decimal = Field(..., gt=0, description="The coefficient of betting on the event")
+    deadline: datetime = Field(..., description="The deadline for accepting bets on the event")
+    state: EventState = Field(EventState.NEW, description="The current status of the event")
+    version: int = Field(0, description="The version of the event record in line-provider storage")
+
+
+class EventStats(BaseModel):
+    """
+    Модель агрегатов ставок на событие.
+    """
+    event_id: str = Field(..., description="The unique identifier of the event")
+    bet_count: int = Field(..., description="The number of bets on the event")
+    total_stake: Decimal = Field(..., description="The total amount of the bets on the event")
+    pending_count: int = Field(..., description="The number of bets awaiting settlement")
+    pending_stake: Decimal = Field(..., description="The total amount of the bets awaiting settlement")
+    pending_liability: Decimal = Field(..., description="The payout owed if all pending bets win")
+    won_count: int = Field(..., description="The number of won bets")
+    lost_count: int = Field(..., description="The number of lost bets")
+    total_payout: Decimal = Field(..., description="The total payout of the settled bets")
+    updated_at: datetime = Field(..., description="The time the aggregates last changed")
+
+
+class EventCacheStats(BaseModel):
+    """
+    Модель ответа со статистикой локального кэша событий.
+    """
+    size: int = Field(..., description="The number of cached events")
+    max_size: int = Field(..., description="The maximum number of cached events")
+    ttl: float = Field(..., description="The time to live of a cache entry in seconds")
+    hits: int = Field(..., description="The number of cache hits")
+    misses: int = Field(..., description="The number of cache misses")
+    evictions: int = Field(..., description="The number of entries evicted by the LRU policy")
+    expirations: int = Field(..., description="The number of entries dropped after TTL expiry")
+    hit_rate: float = Field(..., description="The share of lookups served from the cache")
+
+
+class LatencyStats(BaseModel):
+    """
+    Модель статистики длительности операций.
+    """
+    count: int = Field(..., description="The number of observed operations")
+    total_ms: float = Field(..., description="The total duration of the operations in milliseconds")
+    avg_ms: float = Field(..., description="The average duration of an operation in milliseconds")
+    max_ms: float = Field(..., description="The longest duration of an operation in milliseconds")
+
+
+class DatabaseStats(BaseModel):
+    """
+    Модель ответа со статистикой пула соединений с базой данных.
+    """
+    min_size: int = Field(..., description="The minimum number of pooled connections")
+    max_size: int = Field(..., description="The maximum number of pooled connections")
+    size: int = Field(..., description="The current number of pooled connections")
+    idle: int = Field(..., description="The number of idle pooled connections")
+    waiting: int = Field(..., description="The number of requests waiting for a connection")
+    acquire: LatencyStats = Field(..., description="The time spent waiting for a pooled connection")
+    queries: Dict[str, LatencyStats] = Field(..., description="The latency of queries by name")
+
+
+class ReplicaStats(BaseModel):
+    """
+    Модель ответа с состоянием реплики базы данных.
+    """
+    name: str = Field(..., description="The host, port and database of the replica")
+    healthy: bool = Field(..., description="Whether read queries are routed to the replica")
+    lag_seconds: Optional[float] = Field(None, description="The replication lag measured by the last check")
+    checked_at: Optional[datetime] = Field(None, description="The time of the last health check")
+    pool: DatabaseStats = Field(..., description="The connection pool statistics of the replica")
+
+
+class StageTiming(BaseModel):
+    """
+    Модель длительности одного этапа обработки запроса.
+    """
+    count: int = Field(..., description="The number of calls made during the request")
+    total_ms: float = Field(..., description="The total duration of the calls in milliseconds")
+
+
+class RequestTrace(BaseModel):
+    """
+    Модель разбивки времени обработки запроса по этапам.
+    """
+    method: str = Field(..., description="The HTTP method of the request")
+    route: str = Field(..., description="The route template of the request")
+    status: int = Field(..., description="The response status code")
+    reason: str = Field(..., description="Why the request was recorded: slow or sampled")
+    started_at: datetime = Field(..., description="The time the request was received")
+    duration_ms: float = Field(..., description="The total duration of the request in milliseconds")
+    stages: Dict[str, StageTiming] = Field(..., description="The time spent in each stage by stage name")
+    other_ms: float = Field(
+        ...,
+        description="The time not attributed to any stage, such as handler code and response model validation",
+    )
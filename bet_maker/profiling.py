@@ -0,0 +1,237 @@
+# Модуль повторяет line_provider/profiling.py: у сервисов нет общего пакета,
+# поэтому изменения этого модуля вносятся в оба сервиса.
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+from models import RequestTrace, StageTiming
+
+
+class Trace:
+    """
+    Разбивка времени обработки одного запроса по этапам.
+    """
+
+    __slots__ = ("started_at", "stages", "finished")
+
+    def __init__(self) -> None:
+        self.started_at = datetime.now(timezone.utc)
+        self.stages: Dict[str, List[float]] = {}
+        self.finished = False
+
+    def add(self, stage: str, seconds: float) -> None:
+        """
+        Учитывает длительность одного вызова этапа.
+
+        :param stage: Имя этапа.
+        :param seconds: Длительность в секундах.
+        """
+        timing = self.stages.get(stage)
+        if timing is None:
+            self.stages[stage] = [1, seconds]
+        else:
+            timing[0] += 1
+            timing[1] += seconds
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """
+    Учитывает длительность этапа в разбивке текущего запроса.
+
+    Если профилирование выключено или вызов выполняется вне запроса, ничего не делает.
+
+    :param stage: Имя этапа: line_provider, db, db_pool или serialization.
+    :param seconds: Длительность в секундах.
+    """
+    trace = _current_trace.get()
+    if trace is not None and not trace.finished:
+        trace.add(stage, seconds)
+
+
+class TraceRecorder:
+    """
+    Последние запросы, попавшие в выборку профилирования.
+
+    Запрос сохраняется, если он выполнялся не меньше slow_request_ms миллисекунд
+    или попал в случайную выборку с долей sample_rate. Хранятся последние buffer_size
+    запросов процесса.
+    """
+
+    def __init__(self, sample_rate: float, slow_request_ms: float, buffer_size: int) -> None:
+        self.sample_rate = sample_rate
+        self.slow_request_ms = slow_request_ms
+        self._traces: Deque[RequestTrace] = deque(maxlen=buffer_size)
+
+    def record(self, trace: Trace, method: str, route: str, status: int, seconds: float) -> None:
+        """
+        Сохраняет разбивку запроса, если он медленный или попал в выборку.
+
+        :param trace: Разбивка времени запроса по этапам.
+        :param method: HTTP-метод.
+        :param route: Шаблон маршрута.
+        :param status: Код ответа.
+        :param seconds: Полная длительность запроса в секундах.
+        """
+        duration_ms = seconds * 1000
+        if duration_ms >= self.slow_request_ms:
+            reason = "slow"
+        elif random.random() < self.sample_rate:
+            reason = "sampled"
+        else:
+            return
+        stages = {
+            stage: StageTiming(count=count, total_ms=total * 1000)
+            for stage, (count, total) in trace.stages.items()
+        }
+        self._traces.append(RequestTrace(
+            method=method,
+            route=route,
+            status=status,
+            reason=reason,
+            started_at=trace.started_at,
+            duration_ms=duration_ms,
+            stages=stages,
+            other_ms=max(0.0, duration_ms - sum(timing.total_ms for timing in stages.values())),
+        ))
+
+    def traces(self, limit: int, min_duration_ms: float = 0.0) -> List[RequestTrace]:
+        """
+        Возвращает сохранённые запросы от новых к старым.
+
+        :param limit: Максимальное количество запросов.
+        :param min_duration_ms: Минимальная длительность запроса в миллисекундах.
+        :return: Разбивки запросов.
+        """
+        result = []
+        for trace in reversed(self._traces):
+            if trace.duration_ms >= min_duration_ms:
+                result.append(trace)
+                if len(result) == limit:
+                    break
+        return result
+
+
+class ProfilingMiddleware:
+    """
+    ASGI-middleware, собирающее разбивку времени обработки запросов по этапам.
+
+    На время запроса в контекст помещается объект Trace, в который record_stage
+    записывает длительность обращений к line-provider, базе данных и сериализации ответа.
+    Потоковые ответы server-sent events и запросы к /debug не сохраняются. Middleware
+    подключается, только если включено профилирование.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith("/debug/"):
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        streaming = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                streaming = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", ())
+                )
+            await send(message)
+
+        trace = Trace()
+        token = _current_trace.set(trace)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_trace.reset(token)
+            trace.finished = True
+            if not streaming:
+                route = scope.get("route")
+                trace_recorder.record(
+                    trace, scope["method"], getattr(route, "path", "unmatched"), status,
+                    time.perf_counter() - started,
+                )
+
+
+def _frame_name(frame) -> str:
+    """
+    Возвращает имя кадра стека в виде функция (файл:строка начала функции).
+    """
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Статистический профилировщик CPU.
+
+    Отдельный поток раз в interval секунд снимает стек потока цикла событий и считает
+    одинаковые стеки. Результат выводится в формате collapsed stacks
+    (функции от корня через точку с запятой и число снимков), который принимают
+    flamegraph.pl и speedscope. Профилировщик работает, только пока выполняется запрос
+    на профиль, и одновременно может выполняться один профиль.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+
+    @property
+    def busy(self) -> bool:
+        """
+        Возвращает True, если профиль уже снимается.
+        """
+        return self._lock.locked()
+
+    def profile(self, thread_id: int, seconds: float, interval: float) -> str:
+        """
+        Снимает профиль потока.
+
+        :param thread_id: Идентификатор профилируемого потока.
+        :param seconds: Длительность профилирования в секундах.
+        :param interval: Интервал между снимками стека в секундах.
+        :return: Стеки в формате collapsed stacks, от самых частых.
+        :raises RuntimeError: Если профиль уже снимается.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already being collected")
+        try:
+            stacks: Counter = Counter()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                frame = sys._current_frames().get(thread_id)
+                names = []
+                while frame is not None:
+                    names.append(_frame_name(frame))
+                    frame = frame.f_back
+                if names:
+                    stacks[";".join(reversed(names))] += 1
+                time.sleep(interval)
+        finally:
+            self._lock.release()
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+trace_recorder = TraceRecorder(
+    sample_rate=settings.PROFILING_SAMPLE_RATE,
+    slow_request_ms=settings.PROFILING_SLOW_REQUEST_MS,
+    buffer_size=settings.PROFILING_TRACE_BUFFER_SIZE,
+)
+
+stack_sampler = StackSampler()
@@ -1,6 +1,319 @@
-from databases import Database
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import asyncpg
+
 from config import settings
+from metrics import DB_POOL_ACQUIRE_DURATION, DB_QUERY_DURATION
+from models import DatabaseStats, LatencyStats
+from profiling import record_stage
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyCounter:
+    """
+    Счётчик количества, суммарной и максимальной длительности операций.
+
+    Если передана гистограмма Prometheus, длительность записывается и в неё.
+    """
+
+    __slots__ = ("count", "total", "max", "histogram")
+
+    def __init__(self, histogram: Optional[Any] = None) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram = histogram
+
+    def observe(self, seconds: float) -> None:
+        """
+        Учитывает длительность одной операции.
+
+        :param seconds: Длительность операции в секундах.
+        """
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if self.histogram is not None:
+            self.histogram.observe(seconds)
+
+    def stats(self) -> LatencyStats:
+        """
+        Возвращает накопленную статистику в миллисекундах.
+        """
+        return LatencyStats(
+            count=self.count,
+            total_ms=self.total * 1000,
+            avg_ms=self.total * 1000 / self.count if self.count else 0.0,
+            max_ms=self.max * 1000,
+        )
+
+
+class Transaction:
+    """
+    Запросы, выполняемые в одной транзакции на одном соединении пула.
+
+    Длительность запросов учитывается в статистике пула, как и у запросов Database.
+    """
+
+    def __init__(self, database: "Database", connection: asyncpg.Connection) -> None:
+        self._database = database
+        self._connection = connection
+
+    async def fetch(self, query: str, *args: Any, name: str = "query") -> List[asyncpg.Record]:
+        """
+        Выполняет запрос и возвращает все строки результата.
+
+        :param query: Текст запроса с позиционными параметрами.
+        :param args: Значения параметров.
+        :param name: Имя запроса для статистики.
+        :return: Строки результата.
+        """
+        return await self._database._call(self._connection, "fetch", name, query, args)
+
+    async def fetchrow(self, query: str, *args: Any, name: str = "query") -> Optional[asyncpg.Record]:
+        """
+        Выполняет запрос и возвращает первую строку результата.
+
+        :param query: Текст запроса с позиционными параметрами.
+        :param args: Значения параметров.
+        :param name: Имя запроса для статистики.
+        :return: Строка результата или None.
+        """
+        return await self._database._call(self._connection, "fetchrow", name, query, args)
+
+    async def fetchval(self, query: str, *args: Any, name: str = "query") -> Any:
+        """
+        Выполняет запрос и возвращает значение первой колонки первой строки.
+
+        :param query: Текст запроса с позиционными параметрами.
+        :param args: Значения параметров.
+        :param name: Имя запроса для статистики.
+        :return: Значение или None.
+        """
+        return await self._database._call(self._connection, "fetchval", name, query, args)
+
+    async def execute(self, query: str, *args: Any, name: str = "query") -> str:
+        """
+        Выполняет запрос без возврата строк.
+
+        :param query: Текст запроса с позиционными параметрами.
+        :param args: Значения параметров.
+        :param name: Имя запроса для статистики.
+        :return: Статус выполнения команды.
+        """
+        return await self._database._call(self._connection, "execute", name, query, args)
+
+
+class Database:
+    """
+    Пул соединений asyncpg с учётом времени ожидания соединения и длительности запросов.
+
+    Запросы передаются в asyncpg как есть, с позиционными параметрами $1, $2, ...
+    asyncpg подготавливает каждый текст запроса один раз на соединение и хранит
+    подготовленные операторы в кэше размером DB_STATEMENT_CACHE_SIZE, поэтому
+    запросы с постоянным текстом (вставка и чтение ставки, расчёт порции ставок)
+    выполняются без повторного разбора и планирования.
+
+    Длительность запросов учитывается отдельно по имени, переданному в параметре name,
+    и вместе со временем ожидания соединения попадает в метрики Prometheus с меткой pool.
+    Запросы дольше DB_SLOW_QUERY_MS миллисекунд записываются в журнал.
+    """
+
+    def __init__(self, dsn: str, min_size: int, max_size: int, statement_cache_size: int,
+                 command_timeout: float, slow_query_ms: float,
+                 server_settings: Optional[Dict[str, str]] = None, label: str = "primary") -> None:
+        self.dsn = dsn
+        self.label = label
+        self.min_size = min_size
+        self.max_size = max_size
+        self.statement_cache_size = statement_cache_size
+        self.command_timeout = command_timeout
+        self.slow_query_ms = slow_query_ms
+        self.server_settings = server_settings
+        self._pool: Optional[asyncpg.Pool] = None
+        self._waiting = 0
+        self._acquire = LatencyCounter(DB_POOL_ACQUIRE_DURATION.labels(label))
+        self._queries: Dict[str, LatencyCounter] = {}
+
+    async def connect(self) -> None:
+        """
+        Создаёт пул соединений.
+        """
+        if self._pool is None:
+            self._pool = await asyncpg.create_pool(
+                self.dsn,
+                min_size=self.min_size,
+                max_size=self.max_size,
+                statement_cache_size=self.statement_cache_size,
+                command_timeout=self.command_timeout,
+                server_settings=self.server_settings,
+            )
+
+    async def disconnect(self) -> None:
+        """
+        Закрывает пул соединений.
+        """
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[asyncpg.Connection]:
+        """
+        Выдаёт соединение из пула на время блока и учитывает время его ожидания.
+
+        :return: Соединение asyncpg.
+        """
+        self._waiting += 1
+        started = time.perf_counter()
+        try:
+            connection = await self._pool.acquire()
+        finally:
+            self._waiting -= 1
+        waited = time.perf_counter() - started
+        self._acquire.observe(waited)
+        record_stage("db_pool", waited)
+        try:
+            yield connection
+        finally:
+            await self._pool.release(connection)
+
+    def _observe(self, name: str, started: float) -> None:
+        """
+        Учитывает длительность запроса и записывает в журнал медленные запросы.
+        """
+        elapsed = time.perf_counter() - started
+        counter = self._queries.get(name)
+        if counter is None:
+            counter = self._queries[name] = LatencyCounter(DB_QUERY_DURATION.labels(self.label, name))
+        counter.observe(elapsed)
+        record_stage("db", elapsed)
+        if elapsed * 1000 >= self.slow_query_ms:
+            logger.warning("Slow query %s took %.1f ms", name, elapsed * 1000)
+
+    async def _call(self, connection: asyncpg.Connection, method: str, name: str, query: str, args: tuple) -> Any:
+        """
+        Выполняет запрос на соединении указанным методом asyncpg и учитывает его длительность.
+        """
+        started = time.perf_counter()
+        try:
+            return await getattr(connection, method)(query, *args)
+        finally:
+            self._observe(name, started)
+
+    async def _run(self, method: str, name: str, query: str, args: tuple) -> Any:
+        """
+        Выполняет запрос на соединении из пула указанным методом asyncpg.
+        """
+        async with self.connection() as connection:
+            return await self._call(connection, method, name, query, args)
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[Transaction]:
+        """
+        Открывает транзакцию на соединении из пула на время блока.
+
+        Транзакция фиксируется при выходе из блока и откатывается, если блок завершился исключением.
+
+        :return: Объект Transaction для выполнения запросов в транзакции.
+        """
+        async with self.connection() as connection:
+            async with connection.transaction():
+                yield Transaction(self, connection)
+
+    async def fetch(self, query: str, *args: Any, name: str = "query") -> List[asyncpg.Record]:
+        """
+        Выполняет запрос и возвращает все строки результата.
+
+        :param query: Текст запроса с позиционными параметрами.
+        :param args: Значения параметров.
+        :param name: Имя запроса для статистики.
+        :return: Строки результата.
+        """
+        return await self._run("fetch", name, query, args)
+
+    async def fetchrow(self, query: str, *args: Any, name: str = "query") -> Optional[asyncpg.Record]:
+        """
+        Выполняет запрос и возвращает первую строку результата.
+
+        :param query: Текст запроса с позиционными параметрами.
+        :param args: Значения параметров.
+        :param name: Имя запроса для статистики.
+        :return: Строка результата или None.
+        """
+        return await self._run("fetchrow", name, query, args)
+
+    async def fetchval(self, query: str, *args: Any, name: str = "query") -> Any:
+        """
+        Выполняет запрос и возвращает значение первой колонки первой строки.
+
+        :param query: Текст запроса с позиционными параметрами.
+        :param args: Значения параметров.
+        :param name: Имя запроса для статистики.
+        :return: Значение или None.
+        """
+        return await self._run("fetchval", name, query, args)
+
+    async def execute(self, query: str, *args: Any, name: str = "query") -> str:
+        """
+        Выполняет запрос без возврата строк.
+
+        :param query: Текст запроса с позиционными параметрами.
+        :param args: Значения параметров.
+        :param name: Имя запроса для статистики.
+        :return: Статус выполнения команды.
+        """
+        return await self._run("execute", name, query, args)
+
+    async def iterate(self, query: str, *args: Any, prefetch: int = 500,
+                      name: str = "query") -> AsyncIterator[asyncpg.Record]:
+        """
+        Читает результат запроса серверным курсором, не загружая его в память целиком.
+
+        Соединение занято, пока итерация не завершится. В статистику запроса
+        попадает полное время чтения результата.
+
+        :param query: Текст запроса с позиционными параметрами.
+        :param args: Значения параметров.
+        :param prefetch: Количество строк, читаемых курсором за одно обращение.
+        :param name: Имя запроса для статистики.
+        :return: Асинхронный итератор строк результата.
+        """
+        async with self.connection() as connection:
+            started = time.perf_counter()
+            try:
+                async with connection.transaction(readonly=True):
+                    async for row in connection.cursor(query, *args, prefetch=prefetch):
+                        yield row
+            finally:
+                self._observe(name, started)
+
+    def stats(self) -> DatabaseStats:
+        """
+        Возвращает состояние пула и статистику ожидания соединений и запросов.
+        """
+        pool = self._pool
+        return DatabaseStats(
+            min_size=self.min_size,
+            max_size=self.max_size,
+            size=pool.get_size() if pool else 0,
+            idle=pool.get_idle_size() if pool else 0,
+            waiting=self._waiting,
+            acquire=self._acquire.stats(),
+            queries={name: counter.stats() for name, counter in sorted(self._queries.items())},
+        )
 
-database = Database(settings.DATABASE_URL)
 
-print("DATABASE URL: ", settings.DATABASE_URL)
\ No newline at end of file
+database = Database(
+    dsn=settings.DATABASE_URL,
+    min_size=settings.DB_POOL_MIN_SIZE,
+    max_size=settings.DB_POOL_MAX_SIZE,
+    statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+    command_timeout=settings.DB_COMMAND_TIMEOUT,
+    slow_query_ms=settings.DB_SLOW_QUERY_MS,
+)
@@ -0,0 +1,143 @@
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+from config import settings
+from models import Event, EventCacheStats, EventState
+
+
+class EventCache:
+    """
+    Локальный кэш событий line-provider с TTL и вытеснением по LRU.
+
+    Кэш наполняется списком событий из /events и поддерживается в актуальном
+    состоянии изменениями, которые line-provider присылает при создании
+    события и смене его статуса. TTL служит страховкой на случай потери
+    уведомления.
+
+    Уведомления и ответы line-provider могут приходить не по порядку, поэтому
+    запись с версией меньше уже имеющейся в кэше не заменяет её.
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Event]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, event_id: str) -> Optional[Event]:
+        """
+        Возвращает событие из кэша, если запись есть и её TTL не истёк.
+
+        :param event_id: Уникальный идентификатор события.
+        :return: Событие или None при промахе.
+        """
+        entry = self._entries.get(event_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, event = entry
+        if expires_at <= time.monotonic():
+            del self._entries[event_id]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(event_id)
+        self.hits += 1
+        return event
+
+    def peek(self, event_id: str) -> Optional[Event]:
+        """
+        Возвращает событие из кэша без учёта в статистике и без изменения порядка LRU.
+
+        :param event_id: Уникальный идентификатор события.
+        :return: Событие или None, если записи нет или её TTL истёк.
+        """
+        entry = self._entries.get(event_id)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def put(self, event: Event) -> Event:
+        """
+        Добавляет или обновляет событие в кэше, если его версия не старше имеющейся.
+
+        :param event: Событие для кэширования.
+        :return: Событие, оказавшееся в кэше: переданное или более новое из кэша.
+        """
+        entry = self._entries.get(event.event_id)
+        if entry is not None and entry[1].version > event.version:
+            return entry[1]
+        self._entries[event.event_id] = (time.monotonic() + self.ttl, event)
+        self._entries.move_to_end(event.event_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return event
+
+    def put_many(self, events: Iterable[Event]) -> None:
+        """
+        Добавляет в кэш несколько событий.
+
+        :param events: События для кэширования.
+        """
+        for event in events:
+            self.put(event)
+
+    def finish(self, event_id: str, state: EventState) -> None:
+        """
+        Отмечает событие в кэше завершённым, когда в bet-maker поступил его результат.
+
+        Результат может прийти раньше уведомления line-provider о смене статуса события,
+        поэтому запись получает следующую версию: устаревшие ответы и уведомления
+        line-provider её не заменят, а уведомление о самой смене статуса заменит.
+
+        :param event_id: Уникальный идентификатор события.
+        :param state: Итоговый статус события.
+        """
+        entry = self._entries.get(event_id)
+        if entry is None or entry[1].state == state:
+            return
+        expires_at, event = entry
+        self._entries[event_id] = (
+            expires_at, event.model_copy(update={"state": state, "version": event.version + 1})
+        )
+
+    def invalidate(self, event_id: str) -> None:
+        """
+        Удаляет событие из кэша.
+
+        :param event_id: Уникальный идентификатор события.
+        """
+        self._entries.pop(event_id, None)
+
+    def clear(self) -> None:
+        """
+        Очищает кэш.
+        """
+        self._entries.clear()
+
+    def stats(self) -> EventCacheStats:
+        """
+        Возвращает статистику попаданий и промахов кэша.
+        """
+        lookups = self.hits + self.misses
+        return EventCacheStats(
+            size=len(self._entries),
+            max_size=self.max_size,
+            ttl=self.ttl,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            expirations=self.expirations,
+            hit_rate=self.hits / lookups if lookups else 0.0,
+        )
+
+
+event_cache = EventCache(max_size=settings.EVENT_CACHE_MAX_SIZE, ttl=settings.EVENT_CACHE_TTL)
@@ -0,0 +1,59 @@
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Optional, Tuple
+
+from config import settings
+from models import CreateBetResponse
+
+_Entry = Tuple[str, Decimal, CreateBetResponse]
+
+
+class IdempotencyCache:
+    """
+    Кэш ответов на создание ставок по ключу идемпотентности с вытеснением по LRU.
+
+    Повторный запрос с известным ключом получает исходный ответ из памяти,
+    без обращения к line-provider и базе данных. Кэш есть у каждого процесса,
+    а источником истины остаётся таблица bet_idempotency_keys.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[_Entry]:
+        """
+        Возвращает запомненный ответ по ключу идемпотентности.
+
+        :param key: Ключ идемпотентности.
+        :return: Событие и сумма исходного запроса и ответ на него или None при промахе.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, event_id: str, amount: Decimal, response: CreateBetResponse) -> None:
+        """
+        Запоминает ответ на запрос с ключом идемпотентности.
+
+        :param key: Ключ идемпотентности.
+        :param event_id: Событие исходного запроса.
+        :param amount: Сумма исходного запроса.
+        :param response: Ответ на исходный запрос.
+        """
+        self._entries[key] = (event_id, amount, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+idempotency_cache = IdempotencyCache(max_size=settings.IDEMPOTENCY_CACHE_MAX_SIZE)
@@ -0,0 +1,274 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from config import settings
+from metrics import LINE_PROVIDER_ERRORS, LINE_PROVIDER_REQUEST_DURATION
+from profiling import record_stage
+
+
+class LineProviderError(Exception):
+    """
+    Базовая ошибка взаимодействия с сервисом line-provider.
+    """
+
+
+class LineProviderUnavailable(LineProviderError):
+    """
+    Сервис line-provider недоступен: исчерпаны повторы или разомкнут circuit breaker.
+    """
+
+
+class EventNotFound(LineProviderError):
+    """
+    Событие не найдено в line-provider.
+    """
+
+
+class CircuitBreaker:
+    """
+    Простой circuit breaker с состояниями closed / open / half-open.
+
+    После ``failure_threshold`` подряд идущих ошибок цепь размыкается, и вызовы
+    отклоняются без обращения к сети. Через ``reset_timeout`` секунд пропускается
+    один пробный вызов: при успехе цепь замыкается, при ошибке снова размыкается.
+    Если пробный вызов завершился без результата (отменён или упал с неожиданной
+    ошибкой), слот пробного вызова освобождается, и следующий вызов снова пробный.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        """
+        Возвращает текущее состояние цепи.
+        """
+        if self.failures < self.failure_threshold:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """
+        Проверяет, можно ли выполнить вызов.
+
+        :return: True, если вызов разрешён.
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        """
+        Регистрирует успешный вызов и замыкает цепь.
+        """
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def release(self) -> None:
+        """
+        Освобождает слот пробного вызова, если вызов завершился без результата.
+        """
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """
+        Регистрирует неудачный вызов и при превышении порога размыкает цепь.
+        """
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class LineProviderClient:
+    """
+    Клиент сервиса line-provider с общим пулом keep-alive соединений.
+
+    Сессия создаётся один раз при запуске приложения и закрывается при остановке.
+    Каждый вызов ограничен таймаутом, идемпотентные запросы повторяются
+    с экспоненциальной задержкой, а circuit breaker не даёт копить корутины,
+    пока line-provider недоступен.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int,
+        keepalive_timeout: float,
+        connect_timeout: float,
+        timeout: float,
+        retries: int,
+        retry_backoff: float,
+        breaker: CircuitBreaker,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=connect_timeout)
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.breaker = breaker
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._events_etag: Optional[str] = None
+        self._events: List[Dict[str, Any]] = []
+
+    async def start(self) -> None:
+        """
+        Создаёт HTTP-сессию с пулом соединений.
+        """
+        if self._session is not None:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300,
+        )
+        self._session = aiohttp.ClientSession(
+            base_url=self.base_url,
+            connector=connector,
+            timeout=self.timeout,
+        )
+
+    async def close(self) -> None:
+        """
+        Закрывает HTTP-сессию и все соединения пула.
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """
+        Возвращает активную HTTP-сессию.
+
+        :raises LineProviderError: Если клиент не запущен.
+        """
+        if self._session is None:
+            raise LineProviderError("Line-provider client is not started")
+        return self._session
+
+    async def _get(self, operation: str, path: str, etag: Optional[str] = None) -> Tuple[Any, Optional[str]]:
+        """
+        Выполняет GET-запрос с повторами и учётом состояния circuit breaker.
+
+        Длительность каждой попытки и причины неудач записываются в метрики
+        с меткой operation. Если вызов был пробным, слот пробного вызова
+        освобождается при любом выходе, в том числе при отмене.
+
+        :param operation: Имя операции для метрик.
+        :param path: Путь относительно базового URL line-provider.
+        :param etag: ETag уже имеющейся версии ресурса для условного запроса.
+        :return: Десериализованное JSON-тело ответа (None, если ресурс не изменился)
+            и ETag ответа.
+        :raises EventNotFound: Если line-provider вернул 404.
+        :raises LineProviderUnavailable: Если цепь разомкнута или повторы исчерпаны.
+        :raises LineProviderError: Если line-provider вернул неожиданный статус.
+        """
+        trial = self.breaker.state == CircuitBreaker.HALF_OPEN
+        if not self.breaker.allow():
+            LINE_PROVIDER_ERRORS.labels(operation, "circuit_open").inc()
+            raise LineProviderUnavailable("Line-provider circuit is open")
+
+        try:
+            headers = {"If-None-Match": etag} if etag else None
+            last_error: Optional[BaseException] = None
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+                started = time.perf_counter()
+                try:
+                    async with self.session.get(path, headers=headers) as response:
+                        LINE_PROVIDER_REQUEST_DURATION.labels(operation, str(response.status)).observe(
+                            time.perf_counter() - started
+                        )
+                        if response.status == 304:
+                            self.breaker.record_success()
+                            return None, response.headers.get("ETag")
+                        if response.status == 404:
+                            self.breaker.record_success()
+                            raise EventNotFound(path)
+                        if response.status >= 500:
+                            LINE_PROVIDER_ERRORS.labels(operation, "server_error").inc()
+                            last_error = LineProviderError(f"Line-provider responded with {response.status}")
+                            continue
+                        if response.status != 200:
+                            self.breaker.record_success()
+                            raise LineProviderError(f"Line-provider responded with {response.status}")
+                        data = await response.json()
+                        response_etag = response.headers.get("ETag")
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    reason = "timeout" if isinstance(e, asyncio.TimeoutError) else "connection"
+                    LINE_PROVIDER_REQUEST_DURATION.labels(operation, reason).observe(time.perf_counter() - started)
+                    LINE_PROVIDER_ERRORS.labels(operation, reason).inc()
+                    last_error = e
+                    continue
+                finally:
+                    record_stage("line_provider", time.perf_counter() - started)
+                self.breaker.record_success()
+                return data, response_etag
+
+            LINE_PROVIDER_ERRORS.labels(operation, "retries_exhausted").inc()
+            self.breaker.record_failure()
+            raise LineProviderUnavailable(str(last_error) or last_error.__class__.__name__)
+        finally:
+            if trial:
+                self.breaker.release()
+
+    async def get_event(self, event_id: str) -> Dict[str, Any]:
+        """
+        Возвращает событие по идентификатору.
+
+        :param event_id: Уникальный идентификатор события.
+        :return: Данные события.
+        """
+        data, _ = await self._get("get_event", f"/events/{event_id}")
+        return data
+
+    async def get_events(self) -> List[Dict[str, Any]]:
+        """
+        Возвращает список активных событий.
+
+        Запрос выполняется условно по ETag предыдущего ответа: если список
+        не изменился, line-provider отвечает 304 без тела и возвращается
+        ранее полученный список.
+
+        :return: Список событий.
+        """
+        data, etag = await self._get("get_events", "/events/", etag=self._events_etag)
+        if data is not None:
+            self._events = data
+            self._events_etag = etag
+        return self._events
+
+
+line_provider_client = LineProviderClient(
+    base_url=settings.LINE_PROVIDER_URL,
+    pool_size=settings.LINE_PROVIDER_POOL_SIZE,
+    keepalive_timeout=settings.LINE_PROVIDER_KEEPALIVE_TIMEOUT,
+    connect_timeout=settings.LINE_PROVIDER_CONNECT_TIMEOUT,
+    timeout=settings.LINE_PROVIDER_TIMEOUT,
+    retries=settings.LINE_PROVIDER_RETRIES,
+    retry_backoff=settings.LINE_PROVIDER_RETRY_BACKOFF,
+    breaker=CircuitBreaker(
+        failure_threshold=settings.LINE_PROVIDER_BREAKER_THRESHOLD,
+        reset_timeout=settings.LINE_PROVIDER_BREAKER_RESET_TIMEOUT,
+    ),
+)
@@ -0,0 +1,53 @@
+import logging
+from pathlib import Path
+from typing import List
+
+from provider.database import database
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+# Ключ advisory-блокировки, под которой применяются миграции: несколько
+# процессов bet-maker, запущенных одновременно, применяют их по очереди.
+MIGRATIONS_LOCK_ID = 7_240_001
+
+CREATE_MIGRATIONS_TABLE_QUERY = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version VARCHAR(255) PRIMARY KEY,
+    applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+
+async def apply_migrations() -> List[str]:
+    """
+    Применяет к базе данных ещё не применённые SQL-миграции из каталога migrations.
+
+    Миграции применяются в порядке имён файлов, каждая в отдельной транзакции
+    вместе с записью её версии в таблицу schema_migrations.
+
+    :return: Версии применённых миграций.
+    """
+    applied: List[str] = []
+    async with database.connection() as raw_connection:
+        await raw_connection.execute("SELECT pg_advisory_lock($1)", MIGRATIONS_LOCK_ID)
+        try:
+            await raw_connection.execute(CREATE_MIGRATIONS_TABLE_QUERY)
+            rows = await raw_connection.fetch("SELECT version FROM schema_migrations")
+            existing = {row["version"] for row in rows}
+
+            for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+                version = path.stem
+                if version in existing:
+                    continue
+                async with raw_connection.transaction():
+                    await raw_connection.execute(path.read_text(encoding="utf-8"))
+                    await raw_connection.execute(
+                        "INSERT INTO schema_migrations (version) VALUES ($1)", version
+                    )
+                logger.info("Applied migration %s", version)
+                applied.append(version)
+        finally:
+            await raw_connection.execute("SELECT pg_advisory_unlock($1)", MIGRATIONS_LOCK_ID)
+    return applied
@@ -0,0 +1,268 @@
+import asyncio
+import logging
+import re
+from datetime import datetime
+from typing import List, Optional
+
+from config import settings
+from provider.database import database
+
+logger = logging.getLogger(__name__)
+
+PARTITIONS_LOCK_ID = 7_240_002
+
+LEGACY_PARTITION = "bets_legacy"
+
+_PARTITION_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+# Проверяет, есть ли в секции нерассчитанные ставки; такая секция не удаляется.
+PARTITION_HAS_PENDING_BETS_QUERY = "SELECT EXISTS (SELECT 1 FROM {partition} WHERE status = 'pending')"
+
+# Вычитает ставки удаляемой секции из агрегатов их событий. Нерассчитанных ставок
+# в секции нет, поэтому ожидающие суммы не меняются. Строки event_stats блокируются
+# в порядке event_id, как при вставке ставок, чтобы не было взаимоблокировок.
+REMOVE_PARTITION_FROM_EVENT_STATS_QUERY = """
+WITH dropped AS (
+    SELECT event_id,
+           count(*) AS bet_count,
+           SUM(amount) AS stake,
+           count(*) FILTER (WHERE status = 'won') AS won_count,
+           count(*) FILTER (WHERE status = 'lost') AS lost_count,
+           COALESCE(SUM(payout), 0) AS payout
+    FROM {partition}
+    GROUP BY event_id
+), locked AS (
+    SELECT event_id FROM event_stats
+    WHERE event_id IN (SELECT event_id FROM dropped)
+    ORDER BY event_id
+    FOR UPDATE
+)
+UPDATE event_stats
+SET bet_count = event_stats.bet_count - dropped.bet_count,
+    total_stake = event_stats.total_stake - dropped.stake,
+    won_count = event_stats.won_count - dropped.won_count,
+    lost_count = event_stats.lost_count - dropped.lost_count,
+    total_payout = event_stats.total_payout - dropped.payout,
+    updated_at = CURRENT_TIMESTAMP
+FROM dropped
+JOIN locked ON locked.event_id = dropped.event_id
+WHERE event_stats.event_id = dropped.event_id
+"""
+
+# Удаляет агрегаты событий, все ставки которых были в удаляемой секции.
+DELETE_EMPTY_EVENT_STATS_QUERY = """
+DELETE FROM event_stats
+WHERE bet_count = 0 AND event_id IN (SELECT event_id FROM {partition})
+"""
+
+# Ключи идемпотентности ставок из удалённых секций: ставок с их bet_id больше нет.
+PURGE_IDEMPOTENCY_KEYS_QUERY = """
+DELETE FROM bet_idempotency_keys
+WHERE created_at < $1
+  AND NOT EXISTS (SELECT 1 FROM bets WHERE bets.bet_id = bet_idempotency_keys.bet_id)
+"""
+
+_maintenance_task: Optional[asyncio.Task] = None
+
+
+def _month_start(value: datetime, months_offset: int = 0) -> datetime:
+    """
+    Возвращает начало месяца, смещённого на указанное число месяцев.
+
+    :param value: Момент времени внутри исходного месяца.
+    :param months_offset: Смещение в месяцах (может быть отрицательным).
+    :return: Начало месяца без часового пояса.
+    """
+    month_index = value.year * 12 + value.month - 1 + months_offset
+    return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+
+async def _is_partitioned(raw_connection) -> bool:
+    """
+    Проверяет, является ли таблица bets секционированной.
+    """
+    relkind = await raw_connection.fetchval("SELECT relkind FROM pg_class WHERE oid = 'bets'::regclass")
+    return relkind == "p"
+
+
+async def _convert_to_partitioned(raw_connection) -> None:
+    """
+    Превращает обычную таблицу bets в таблицу, секционированную по месяцам created_at.
+
+    Существующие строки остаются в прежней таблице, которая подключается как секция
+    для всех дат до начала следующего месяца. Индексы таблицы пересоздаются
+    на секционированной таблице, первичный ключ дополняется колонкой created_at
+    (уникальность bet_id по-прежнему обеспечивается последовательностью).
+    """
+    next_month = _month_start(datetime.utcnow(), 1)
+    async with raw_connection.transaction():
+        await raw_connection.execute("LOCK TABLE bets IN ACCESS EXCLUSIVE MODE")
+        index_rows = await raw_connection.fetch(
+            """
+            SELECT indexname, indexdef FROM pg_indexes
+            WHERE schemaname = current_schema() AND tablename = 'bets' AND indexname <> 'bets_pkey'
+            """
+        )
+
+        await raw_connection.execute(
+            "UPDATE bets SET created_at = 'epoch'::timestamp WHERE created_at IS NULL"
+        )
+        await raw_connection.execute("ALTER TABLE bets ALTER COLUMN created_at SET NOT NULL")
+        await raw_connection.execute(f"ALTER TABLE bets RENAME TO {LEGACY_PARTITION}")
+        await raw_connection.execute(f"ALTER TABLE {LEGACY_PARTITION} DROP CONSTRAINT bets_pkey")
+        for row in index_rows:
+            index_name = row["indexname"]
+            await raw_connection.execute(f'ALTER INDEX "{index_name}" RENAME TO "{index_name}_legacy"')
+
+        await raw_connection.execute(
+            f"""
+            CREATE TABLE bets (LIKE {LEGACY_PARTITION} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+            PARTITION BY RANGE (created_at)
+            """
+        )
+        await raw_connection.execute("ALTER SEQUENCE bets_bet_id_seq OWNED BY bets.bet_id")
+        await raw_connection.execute("ALTER TABLE bets ADD PRIMARY KEY (bet_id, created_at)")
+        await raw_connection.execute(
+            f"ALTER TABLE bets ATTACH PARTITION {LEGACY_PARTITION} "
+            f"FOR VALUES FROM (MINVALUE) TO ('{next_month.isoformat(sep=' ')}')"
+        )
+        for row in index_rows:
+            await raw_connection.execute(row["indexdef"])
+    logger.info("Converted bets to a table partitioned by created_at")
+
+
+async def _create_partitions(raw_connection, now: datetime) -> List[str]:
+    """
+    Создаёт месячные секции на текущий месяц и BETS_PARTITIONS_AHEAD месяцев вперёд.
+
+    Месяцы, уже покрытые существующими секциями, пропускаются.
+
+    :return: Имена созданных секций.
+    """
+    created = []
+    covered_until = await _max_upper_bound(raw_connection)
+    for offset in range(settings.BETS_PARTITIONS_AHEAD + 1):
+        start = _month_start(now, offset)
+        end = _month_start(now, offset + 1)
+        if covered_until is not None and end <= covered_until:
+            continue
+        name = f"bets_p{start:%Y%m}"
+        await raw_connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF bets "
+            f"FOR VALUES FROM ('{start.isoformat(sep=' ')}') TO ('{end.isoformat(sep=' ')}')"
+        )
+        created.append(name)
+    return created
+
+
+async def _partition_bounds(raw_connection) -> List[tuple]:
+    """
+    Возвращает секции таблицы bets и верхние границы их диапазонов.
+    """
+    rows = await raw_connection.fetch(
+        """
+        SELECT child.relname AS name, pg_get_expr(child.relpartbound, child.oid) AS bound
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = 'bets'::regclass
+        """
+    )
+    bounds = []
+    for row in rows:
+        match = _PARTITION_UPPER_BOUND.search(row["bound"] or "")
+        if match:
+            bounds.append((row["name"], datetime.fromisoformat(match.group(1))))
+    return bounds
+
+
+async def _max_upper_bound(raw_connection) -> Optional[datetime]:
+    """
+    Возвращает верхнюю границу последней секции или None, если секций нет.
+    """
+    bounds = await _partition_bounds(raw_connection)
+    return max((upper for _, upper in bounds), default=None)
+
+
+async def _drop_expired_partitions(raw_connection, now: datetime) -> List[str]:
+    """
+    Удаляет секции, все строки которых старше BETS_RETENTION_MONTHS месяцев.
+
+    Секция с нерассчитанными ставками пропускается до следующего обслуживания.
+    Ставки удаляемой секции вычитаются из агрегатов событий, а их ключи
+    идемпотентности удаляются в одной транзакции с удалением секции.
+
+    :return: Имена удалённых секций.
+    """
+    if not settings.BETS_RETENTION_MONTHS:
+        return []
+    cutoff = _month_start(now, -settings.BETS_RETENTION_MONTHS)
+    dropped = []
+    for name, upper in await _partition_bounds(raw_connection):
+        if upper > cutoff:
+            continue
+        async with raw_connection.transaction():
+            if await raw_connection.fetchval(PARTITION_HAS_PENDING_BETS_QUERY.format(partition=name)):
+                logger.warning("Bets partition %s is past retention but has pending bets, keeping it", name)
+                continue
+            await raw_connection.execute(REMOVE_PARTITION_FROM_EVENT_STATS_QUERY.format(partition=name))
+            await raw_connection.execute(DELETE_EMPTY_EVENT_STATS_QUERY.format(partition=name))
+            await raw_connection.execute(f"ALTER TABLE bets DETACH PARTITION {name}")
+            await raw_connection.execute(f"DROP TABLE {name}")
+            await raw_connection.execute(PURGE_IDEMPOTENCY_KEYS_QUERY, upper)
+        dropped.append(name)
+    return dropped
+
+
+async def maintain_partitions() -> None:
+    """
+    Секционирует таблицу bets при первом запуске, создаёт секции на будущие месяцы
+    и удаляет секции старше срока хранения.
+    """
+    now = datetime.utcnow()
+    async with database.connection() as raw_connection:
+        await raw_connection.execute("SELECT pg_advisory_lock($1)", PARTITIONS_LOCK_ID)
+        try:
+            if not await _is_partitioned(raw_connection):
+                await _convert_to_partitioned(raw_connection)
+            created = await _create_partitions(raw_connection, now)
+            dropped = await _drop_expired_partitions(raw_connection, now)
+        finally:
+            await raw_connection.execute("SELECT pg_advisory_unlock($1)", PARTITIONS_LOCK_ID)
+    if created or dropped:
+        logger.info("Bets partitions created: %s, dropped: %s", created, dropped)
+
+
+async def _maintenance_loop() -> None:
+    """
+    Периодически выполняет обслуживание секций.
+    """
+    while True:
+        await asyncio.sleep(settings.BETS_PARTITION_MAINTENANCE_INTERVAL)
+        try:
+            await maintain_partitions()
+        except Exception:
+            logger.exception("Bets partition maintenance failed")
+
+
+async def start_partition_maintenance() -> None:
+    """
+    Выполняет обслуживание секций и запускает его периодическое повторение.
+    """
+    global _maintenance_task
+    await maintain_partitions()
+    if _maintenance_task is None:
+        _maintenance_task = asyncio.create_task(_maintenance_loop())
+
+
+async def stop_partition_maintenance() -> None:
+    """
+    Останавливает периодическое обслуживание секций.
+    """
+    global _maintenance_task
+    if _maintenance_task is not None:
+        _maintenance_task.cancel()
+        try:
+            await _maintenance_task
+        except asyncio.CancelledError:
+            pass
+        _maintenance_task = None
@@ -0,0 +1,271 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, List, Optional
+from urllib.parse import urlsplit
+
+import asyncpg
+
+from config import settings
+from models import ReplicaStats
+from provider.database import Database, database
+
+logger = logging.getLogger(__name__)
+
+# Ошибки, после которых запрос к реплике повторяется на основной базе: реплика
+# недоступна, соединение разорвано или запрос отменён из-за конфликта с применением WAL.
+REPLICA_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.CannotConnectNowError,
+    asyncpg.InterfaceError,
+    asyncpg.SerializationError,
+)
+
+# Отставание реплики в секундах. Если реплика применила весь полученный WAL,
+# отставание считается нулевым: время последней применённой транзакции
+# перестаёт меняться, когда на основной базе нет записей.
+REPLICA_LAG_QUERY = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END::float8 AS lag;
+"""
+
+
+class Replica:
+    """
+    Реплика базы данных и результат последней проверки её состояния.
+    """
+
+    __slots__ = ("database", "name", "healthy", "lag", "checked_at")
+
+    def __init__(self, database: Database) -> None:
+        parts = urlsplit(database.dsn)
+        self.database = database
+        self.name = f"{parts.hostname}:{parts.port or 5432}{parts.path}"
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.checked_at: Optional[datetime] = None
+
+
+class ReadDatabase:
+    """
+    Маршрутизация запросов только на чтение между репликами и основной базой.
+
+    Запросы распределяются по исправным репликам по кругу. Раз в check_interval
+    секунд каждая реплика проверяется запросом отставания; реплика, которая
+    не отвечает или отстаёт больше чем на max_lag секунд, исключается
+    из распределения до следующей успешной проверки. Если исправных реплик нет
+    или реплики не настроены, запросы выполняются на основной базе. Запрос,
+    завершившийся на реплике ошибкой соединения, повторяется на основной базе,
+    а реплика помечается неисправной.
+
+    Чтобы прочитать только что записанные данные, передайте primary=True:
+    запрос выполнится на основной базе.
+    """
+
+    def __init__(self, primary: Database, replicas: List[Database], check_interval: float,
+                 max_lag: float) -> None:
+        self.primary = primary
+        self.replicas = [Replica(replica) for replica in replicas]
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self._next = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """
+        Проверяет реплики и запускает их периодическую проверку.
+        """
+        if not self.replicas or self._task is not None:
+            return
+        await self._check_all()
+        self._task = asyncio.create_task(self._health_loop())
+
+    async def stop(self) -> None:
+        """
+        Останавливает проверку реплик и закрывает пулы соединений с ними.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            await replica.database.disconnect()
+
+    async def _check(self, replica: Replica) -> None:
+        """
+        Проверяет доступность и отставание реплики.
+        """
+        try:
+            await replica.database.connect()
+            lag = await asyncio.wait_for(
+                replica.database.fetchval(REPLICA_LAG_QUERY, name="replica_lag"), self.check_interval
+            )
+        except Exception as error:
+            if replica.healthy or replica.checked_at is None:
+                logger.warning("Replica %s is unavailable: %r", replica.name, error)
+            replica.healthy = False
+            replica.lag = None
+        else:
+            healthy = lag <= self.max_lag
+            if healthy != replica.healthy:
+                logger.warning("Replica %s is %s, lag %.1f s", replica.name,
+                               "healthy" if healthy else "lagging", lag)
+            replica.healthy = healthy
+            replica.lag = lag
+        replica.checked_at = datetime.now(timezone.utc)
+
+    async def _check_all(self) -> None:
+        """
+        Проверяет все реплики параллельно.
+        """
+        await asyncio.gather(*(self._check(replica) for replica in self.replicas))
+
+    async def _health_loop(self) -> None:
+        """
+        Периодически проверяет реплики.
+        """
+        while True:
+            await asyncio.sleep(self.check_interval)
+            await self._check_all()
+
+    def _choose(self) -> Optional[Replica]:
+        """
+        Выбирает следующую по кругу исправную реплику.
+
+        :return: Реплика или None, если исправных реплик нет.
+        """
+        count = len(self.replicas)
+        for _ in range(count):
+            replica = self.replicas[self._next % count]
+            self._next += 1
+            if replica.healthy:
+                return replica
+        return None
+
+    def _fail(self, replica: Replica, error: Exception) -> None:
+        """
+        Исключает реплику из распределения до следующей успешной проверки.
+        """
+        logger.warning("Query on replica %s failed, falling back to primary: %r", replica.name, error)
+        replica.healthy = False
+
+    async def _run(self, method: str, query: str, args: tuple, name: str, primary: bool) -> Any:
+        """
+        Выполняет запрос на реплике, а при её недоступности — на основной базе.
+        """
+        replica = None if primary else self._choose()
+        if replica is not None:
+            try:
+                return await getattr(replica.database, method)(query, *args, name=name)
+            except REPLICA_ERRORS as error:
+                self._fail(replica, error)
+        return await getattr(self.primary, method)(query, *args, name=name)
+
+    async def fetch(self, query: str, *args: Any, name: str = "query",
+                    primary: bool = False) -> List[asyncpg.Record]:
+        """
+        Выполняет запрос на чтение и возвращает все строки результата.
+
+        :param query: Текст запроса с позиционными параметрами.
+        :param args: Значения параметров.
+        :param name: Имя запроса для статистики.
+        :param primary: Выполнить запрос на основной базе.
+        :return: Строки результата.
+        """
+        return await self._run("fetch", query, args, name, primary)
+
+    async def fetchrow(self, query: str, *args: Any, name: str = "query", primary: bool = False,
+                       primary_if_missing: bool = False) -> Optional[asyncpg.Record]:
+        """
+        Выполняет запрос на чтение и возвращает первую строку результата.
+
+        :param query: Текст запроса с позиционными параметрами.
+        :param args: Значения параметров.
+        :param name: Имя запроса для статистики.
+        :param primary: Выполнить запрос на основной базе.
+        :param primary_if_missing: Если реплика не вернула строку, повторить запрос
+            на основной базе: строка могла быть записана только что и ещё не дойти до реплики.
+        :return: Строка результата или None.
+        """
+        replica = None if primary else self._choose()
+        if replica is not None:
+            try:
+                row = await replica.database.fetchrow(query, *args, name=name)
+            except REPLICA_ERRORS as error:
+                self._fail(replica, error)
+            else:
+                if row is not None or not primary_if_missing:
+                    return row
+        return await self.primary.fetchrow(query, *args, name=name)
+
+    async def iterate(self, query: str, *args: Any, prefetch: int = 500, name: str = "query",
+                      primary: bool = False) -> AsyncIterator[asyncpg.Record]:
+        """
+        Читает результат запроса серверным курсором на реплике или основной базе.
+
+        Если реплика стала недоступна до получения первой строки, запрос
+        повторяется на основной базе; после первой строки ошибка передаётся вызывающему.
+
+        :param query: Текст запроса с позиционными параметрами.
+        :param args: Значения параметров.
+        :param prefetch: Количество строк, читаемых курсором за одно обращение.
+        :param name: Имя запроса для статистики.
+        :param primary: Выполнить запрос на основной базе.
+        :return: Асинхронный итератор строк результата.
+        """
+        replica = None if primary else self._choose()
+        if replica is not None:
+            started = False
+            try:
+                async for row in replica.database.iterate(query, *args, prefetch=prefetch, name=name):
+                    started = True
+                    yield row
+                return
+            except REPLICA_ERRORS as error:
+                if started:
+                    raise
+                self._fail(replica, error)
+        async for row in self.primary.iterate(query, *args, prefetch=prefetch, name=name):
+            yield row
+
+    def stats(self) -> List[ReplicaStats]:
+        """
+        Возвращает состояние реплик и статистику их пулов соединений.
+        """
+        return [
+            ReplicaStats(
+                name=replica.name,
+                healthy=replica.healthy,
+                lag_seconds=replica.lag,
+                checked_at=replica.checked_at,
+                pool=replica.database.stats(),
+            )
+            for replica in self.replicas
+        ]
+
+
+read_database = ReadDatabase(
+    primary=database,
+    replicas=[
+        Database(
+            dsn=url,
+            min_size=settings.DB_POOL_MIN_SIZE,
+            max_size=settings.DB_POOL_MAX_SIZE,
+            statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+            command_timeout=settings.DB_COMMAND_TIMEOUT,
+            slow_query_ms=settings.DB_SLOW_QUERY_MS,
+            server_settings={"default_transaction_read_only": "on"},
+            label=f"replica-{index}",
+        )
+        for index, url in enumerate(settings.DATABASE_REPLICA_URLS)
+    ],
+    check_interval=settings.DB_REPLICA_CHECK_INTERVAL,
+    max_lag=settings.DB_REPLICA_MAX_LAG,
+)
@@ -0,0 +1,51 @@
+# Модуль повторяет line_provider/responses.py: у сервисов нет общего пакета,
+# поэтому изменения этого модуля вносятся в оба сервиса.
+import time
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+from profiling import record_stage
+
+
+def _default(value: Any) -> Any:
+    """
+    Сериализует типы, которые orjson не поддерживает сам.
+
+    Decimal записывается строкой, как это делает pydantic, чтобы суммы не теряли точность.
+    """
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Сериализует значение в JSON с помощью orjson.
+
+    Даты и время в UTC записываются с суффиксом Z, Decimal — строкой, поэтому результат
+    совпадает с сериализацией тех же значений через pydantic.
+
+    :param content: Значение из словарей, списков, строк, чисел, Decimal, дат и перечислений.
+    :return: JSON в кодировке UTF-8.
+    """
+    return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON-ответ, сериализуемый orjson.
+
+    Используется как класс ответа по умолчанию. Эндпоинты, отдающие большие списки,
+    возвращают его напрямую со словарями, построенными из строк базы данных:
+    такой ответ не проходит повторную валидацию по response_model.
+    Время сериализации учитывается в разбивке запроса по этапам.
+    """
+
+    def render(self, content: Any) -> bytes:
+        started = time.perf_counter()
+        body = dumps(content)
+        record_stage("serialization", time.perf_counter() - started)
+        return body
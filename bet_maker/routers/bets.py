@@ -1,90 +1,357 @@
-from typing import List, Dict
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple, Union
 
-import aiohttp
-from fastapi import APIRouter, HTTPException
-from models import CreateBetRequest, CreateBetResponse, BetStatus, BetHistoryResponse, Bet
-from provider.database import database
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from config import settings
+from models import (
+    CreateBetRequest,
+    CreateBetResponse,
+    BetStatus,
+    BetHistoryResponse,
+    Bet,
+    CreateBetBatchRequest,
+    CreateBetBatchResponse,
+    BatchBetResult,
+    EventResult,
+    SortOrder,
+    Settlement,
+    SettlementResponse,
+    SettlementState,
+)
+from provider.idempotency_cache import idempotency_cache
+from provider.replicas import read_database
+from responses import ORJSONResponse
+from services.admission import admission_control
+from services.bet_writer import bet_write_queue
+from services.bets import (
+    build_history_query,
+    get_bet_by_idempotency_key,
+    history_row_to_dict,
+    insert_bet,
+    insert_bets,
+    insert_idempotent_bet,
+    stream_history_ndjson,
+)
+from services.events import get_open_event, get_open_events
+from services.settlement import get_settlement, settlement_engine
 
 router = APIRouter()
 
+GET_BET_QUERY = "SELECT bet_id, event_id, amount, status, coefficient, payout FROM bets WHERE bet_id = $1"
+
+
+def _replay_bet(bet_request: CreateBetRequest, entry: Tuple[str, Decimal, CreateBetResponse],
+                response: Response) -> CreateBetResponse:
+    """
+    Возвращает ответ на ранее выполненный запрос с тем же ключом идемпотентности.
+
+    :param bet_request: Данные повторного запроса.
+    :param entry: Событие и сумма исходного запроса и ответ на него.
+    :param response: Ответ, в который добавляется заголовок Idempotent-Replayed.
+    :return: Исходный объект CreateBetResponse.
+    :raises HTTPException: Если ключ использовался для ставки с другими данными.
+    """
+    event_id, amount, created = entry
+    if event_id != bet_request.event_id or amount != bet_request.amount:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different bet")
+    response.headers["Idempotent-Replayed"] = "true"
+    return created
+
+
+async def _load_idempotent_bet(idempotency_key: str) -> Optional[Tuple[str, Decimal, CreateBetResponse]]:
+    """
+    Читает из базы ставку, созданную с ключом идемпотентности, и запоминает ответ в кэше.
+
+    :param idempotency_key: Ключ идемпотентности.
+    :return: Событие и сумма исходного запроса и ответ на него или None.
+    """
+    row = await get_bet_by_idempotency_key(idempotency_key)
+    if row is None:
+        return None
+    created = CreateBetResponse(
+        bet_id=str(row["bet_id"]),
+        event_id=row["event_id"],
+        amount=float(row["amount"]),
+        status=BetStatus.PENDING.value,
+        coefficient=float(row["coefficient"])
+    )
+    idempotency_cache.put(idempotency_key, row["event_id"], row["amount"], created)
+    return row["event_id"], row["amount"], created
+
+
+def _client_id(request: Request) -> str:
+    """
+    Возвращает идентификатор клиента для ограничения частоты запросов: значение заголовка
+    BET_CLIENT_ID_HEADER, если он задан и передан, иначе адрес клиента.
+    """
+    if settings.BET_CLIENT_ID_HEADER:
+        client_id = request.headers.get(settings.BET_CLIENT_ID_HEADER)
+        if client_id:
+            return client_id
+    return request.client.host if request.client else "unknown"
+
 
 @router.post("/", response_model=CreateBetResponse, status_code=201, tags=["Bets"])
-async def create_bet(bet_request: CreateBetRequest) -> CreateBetResponse:
+async def create_bet(
+    bet_request: CreateBetRequest,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(
+        None,
+        alias="Idempotency-Key",
+        min_length=1,
+        max_length=255,
+        description="A client-generated key that makes retries of the request return the original bet"
+    ),
+) -> CreateBetResponse:
     """
-    Создает новую ставку на событие.
+    Создает новую ставку на событие по текущему коэффициенту события.
+
+    Если включена отложенная запись (BET_WRITE_BEHIND_ENABLED), ставка передаётся
+    в очередь и записывается в базу вместе с другими ставками одним INSERT.
+
+    Если передан заголовок Idempotency-Key, повторный запрос с тем же ключом получает
+    исходный ответ с заголовком Idempotent-Replayed и не создаёт новую ставку.
+    Ответ ищется сначала в кэше процесса, затем в таблице ключей; событие
+    в line-provider при этом не запрашивается. Ставки с ключом записываются сразу,
+    минуя очередь отложенной записи. Ключ, ставка которого удалена по сроку хранения
+    секций, считается истёкшим, и запрос с ним создаёт новую ставку.
+
+    До обращения к line-provider и базе данных запрос проходит контроль приёма:
+    при превышении частоты запросов клиента или ставок на событие, а также лимита суммы
+    ставок на событие по счётчику процесса возвращается 429. Сумма несохранённой ставки
+    возвращается в счётчик. Лимит суммы ставок ещё раз проверяется при вставке,
+    и ставка сверх него также получает 429. Ставка на событие, результат которого уже записан в bet-maker,
+    отклоняется при вставке с ответом 400, даже если кэш событий ещё не узнал о завершении.
 
     :param bet_request: Данные для создания ставки, включая идентификатор события и сумму ставки.
+    :param request: Запрос, по которому определяется клиент.
+    :param response: Ответ, в который добавляется заголовок Idempotent-Replayed.
+    :param idempotency_key: Ключ идемпотентности запроса.
     :return: Объект CreateBetResponse с информацией о созданной ставке.
-    :raises HTTPException: Если событие не найдено, уже завершено или недоступно.
-    """
-    line_provider_url = f"http://line-provider:8001/events/{bet_request.event_id}"
-
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(line_provider_url) as response:
-                if response.status == 404:
-                    raise HTTPException(status_code=400, detail="Событие не найдено или уже завершено")
-                elif response.status != 200:
-                    raise HTTPException(status_code=500, detail="Ошибка связи с сервисом line-provider")
-                event_data = await response.json()
-        except aiohttp.ClientError as e:
-            raise HTTPException(status_code=500, detail=f"Ошибка запроса к line-provider: {str(e)}")
-
-    if event_data["state"] != "new":
-        raise HTTPException(status_code=400, detail="Событие недействительно для ставки")
-
-    query = """
-    INSERT INTO bets (event_id, amount, status)
-    VALUES (:event_id, :amount, :status)
-    RETURNING bet_id;
-    """
-
-    values = {
-        "event_id": bet_request.event_id,
-        "amount": bet_request.amount,
-        "status": BetStatus.PENDING.value
-    }
+    :raises HTTPException: Если событие не найдено, уже завершено, его дедлайн истёк,
+        line-provider недоступен, ключ идемпотентности использовался для другой ставки,
+        истёкший ключ одновременно занят другим запросом или ставка не прошла контроль приёма.
+    """
+    if idempotency_key is not None:
+        entry = idempotency_cache.get(idempotency_key)
+        if entry is not None:
+            return _replay_bet(bet_request, entry, response)
+
+    admission_control.admit_client(_client_id(request))
+    admission_control.admit_event(bet_request.event_id)
+
+    if idempotency_key is not None:
+        entry = await _load_idempotent_bet(idempotency_key)
+        if entry is not None:
+            return _replay_bet(bet_request, entry, response)
+
+    admission_control.reserve_stake(bet_request.event_id, bet_request.amount)
+    bet_id = None
+    try:
+        event = await get_open_event(bet_request.event_id)
 
-    bet_id = await database.execute(query=query, values=values)
-    return CreateBetResponse(
+        if idempotency_key is not None:
+            bet_id = await insert_idempotent_bet(bet_request, event.coefficient, idempotency_key)
+        elif settings.BET_WRITE_BEHIND_ENABLED:
+            bet_id = await bet_write_queue.submit(bet_request, event.coefficient)
+        else:
+            bet_id = await insert_bet(bet_request, event.coefficient)
+    finally:
+        if bet_id is None:
+            admission_control.release_stake(bet_request.event_id, bet_request.amount)
+
+    if bet_id is None:
+        entry = await _load_idempotent_bet(idempotency_key)
+        if entry is None:
+            raise HTTPException(
+                status_code=409, detail="Idempotency-Key is being reused concurrently, retry the request"
+            )
+        return _replay_bet(bet_request, entry, response)
+
+    created = CreateBetResponse(
         bet_id=str(bet_id),
         event_id=bet_request.event_id,
         amount=float(bet_request.amount),
-        status=BetStatus.PENDING.value
+        status=BetStatus.PENDING.value,
+        coefficient=float(event.coefficient)
     )
+    if idempotency_key is not None:
+        idempotency_cache.put(idempotency_key, bet_request.event_id, bet_request.amount, created)
+    return created
 
 
-@router.get("/", response_model=List[BetHistoryResponse], tags=["Bets"])
-async def get_bets() -> List[BetHistoryResponse]:
+@router.post("/batch", response_model=CreateBetBatchResponse, tags=["Bets"])
+async def create_bets_batch(batch_request: CreateBetBatchRequest, request: Request) -> CreateBetBatchResponse:
     """
-    Возвращает историю всех ставок.
+    Создает пакет ставок.
+
+    Все различные события пакета проверяются одним обращением к кэшу событий
+    (и не более чем одним запросом к line-provider), а принятые ставки
+    сохраняются одним многострочным INSERT. Ставки на недоступные события
+    отклоняются по отдельности, не влияя на остальные.
 
-    :return: Список объектов BetHistoryResponse, представляющих историю ставок.
+    Пакет учитывается как один запрос в ограничении частоты запросов клиента,
+    а каждая ставка до обращения к line-provider — в ограничении частоты ставок
+    на событие и в счётчике суммы ставок на событие, а при вставке — в лимите суммы
+    ставок на событие в базе данных; ставки, не прошедшие эти ограничения,
+    отклоняются по отдельности.
+
+    :param batch_request: Ставки для создания.
+    :param request: Запрос, по которому определяется клиент.
+    :return: Объект CreateBetBatchResponse с результатом по каждой ставке в порядке запроса.
+    :raises HTTPException: Если пакет превышает допустимый размер или клиент превысил
+        допустимую частоту запросов.
     """
-    query = "SELECT bet_id, event_id, amount, status FROM bets;"
-    rows = await database.fetch_all(query=query)
-    return [
-        BetHistoryResponse(
-            bet_id=str(row["bet_id"]),
-            event_id=row["event_id"],
-            amount=row["amount"],
-            status=BetStatus(row["status"])
+    bets = batch_request.bets
+    if len(bets) > settings.BET_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch size exceeds the limit of {settings.BET_BATCH_MAX_SIZE} bets"
         )
-        for row in rows
+
+    admission_control.admit_client(_client_id(request))
+
+    events, errors = await get_open_events(bet.event_id for bet in bets)
+
+    rejected: Dict[int, str] = {}
+    admitted_indexes = []
+    for index, bet in enumerate(bets):
+        rejection = (admission_control.try_admit_event(bet.event_id)
+                     or admission_control.try_reserve_stake(bet.event_id, bet.amount))
+        if rejection is None:
+            admitted_indexes.append(index)
+        else:
+            rejected[index] = rejection
+
+    created: Dict[int, int] = {}
+    try:
+        events, errors = await get_open_events(bets[index].event_id for index in admitted_indexes)
+        accepted_indexes = []
+        for index in admitted_indexes:
+            if bets[index].event_id in errors:
+                rejected[index] = errors[bets[index].event_id]
+            else:
+                accepted_indexes.append(index)
+
+        inserted = await insert_bets(
+            [bets[index] for index in accepted_indexes],
+            [events[bets[index].event_id].coefficient for index in accepted_indexes]
+        )
+        for index, result in zip(accepted_indexes, inserted):
+            if isinstance(result, HTTPException):
+                rejected[index] = result.detail
+            else:
+                created[index] = result
+    finally:
+        for index in admitted_indexes:
+            if index not in created:
+                admission_control.release_stake(bets[index].event_id, bets[index].amount)
+
+    results = [
+        BatchBetResult(
+            index=index,
+            bet_id=str(created[index]),
+            event_id=bet.event_id,
+            status=BetStatus.PENDING.value
+        )
+        if index in created else
+        BatchBetResult(index=index, event_id=bet.event_id, error=rejected[index])
+        for index, bet in enumerate(bets)
     ]
+    return CreateBetBatchResponse(
+        accepted=len(created),
+        rejected=len(bets) - len(created),
+        results=results
+    )
+
+
+@router.get("/", response_model=List[BetHistoryResponse], tags=["Bets"])
+async def get_bets(
+    limit: int = Query(
+        settings.BET_HISTORY_DEFAULT_LIMIT,
+        ge=1,
+        le=settings.BET_HISTORY_MAX_LIMIT,
+        description="The maximum number of bets in the page"
+    ),
+    cursor: Optional[int] = Query(None, description="The bet_id of the last bet of the previous page"),
+    order: SortOrder = Query(SortOrder.DESC, description="The sort order by bet_id"),
+    event_id: Optional[str] = Query(None, description="Return only bets on this event"),
+    status: Optional[BetStatus] = Query(None, description="Return only bets with this status"),
+    created_from: Optional[datetime] = Query(None, description="Return bets created at or after this time"),
+    created_to: Optional[datetime] = Query(None, description="Return bets created before this time"),
+    stream: bool = Query(False, description="Stream all matching bets as NDJSON ignoring the limit"),
+    consistent: bool = Query(False, description="Read from the primary database to see the latest writes"),
+) -> Response:
+    """
+    Возвращает историю ставок постранично.
+
+    Страницы строятся по ключу bet_id (keyset-пагинация): чтобы получить следующую
+    страницу, передайте в cursor значение из заголовка X-Next-Cursor. Заголовок
+    отсутствует на последней странице. В режиме stream все подходящие ставки
+    выгружаются в формате NDJSON через серверный курсор.
+
+    Страница сериализуется напрямую из строк базы данных, без построения
+    и повторной валидации моделей BetHistoryResponse.
+
+    Запрос выполняется на реплике базы данных, если она настроена, поэтому только что
+    созданные ставки могут появиться в истории с задержкой. Чтобы увидеть их сразу,
+    передайте consistent=true.
+
+    :param limit: Максимальное число ставок на странице.
+    :param cursor: bet_id последней ставки предыдущей страницы.
+    :param order: Порядок сортировки по bet_id.
+    :param event_id: Фильтр по событию.
+    :param status: Фильтр по статусу ставки.
+    :param created_from: Нижняя граница времени создания (включительно).
+    :param created_to: Верхняя граница времени создания (не включительно).
+    :param stream: Выгрузить все подходящие ставки в формате NDJSON.
+    :param consistent: Читать с основной базы данных.
+    :return: JSON-список ставок в формате BetHistoryResponse или поток NDJSON.
+    """
+    filters = {
+        "cursor": cursor,
+        "order": order,
+        "event_id": event_id,
+        "status": status,
+        "created_from": created_from,
+        "created_to": created_to,
+    }
+
+    if stream:
+        query, args = build_history_query(**filters)
+        return StreamingResponse(
+            stream_history_ndjson(query, args, primary=consistent), media_type="application/x-ndjson"
+        )
+
+    query, args = build_history_query(**filters, limit=limit)
+    rows = await read_database.fetch(query, *args, name="get_bets", primary=consistent)
+    headers = {"X-Next-Cursor": str(rows[-1]["bet_id"])} if len(rows) == limit else None
+
+    return ORJSONResponse([history_row_to_dict(row) for row in rows], headers=headers)
 
 
 @router.get("/{bet_id}", response_model=Bet, tags=["Bets"])
-async def get_bet(bet_id: int) -> Bet:
+async def get_bet(
+    bet_id: int,
+    consistent: bool = Query(False, description="Read from the primary database to see the latest writes"),
+) -> Bet:
     """
     Возвращает информацию о ставке по идентификатору.
 
+    Ставка читается с реплики базы данных, если она настроена. Если реплика ещё
+    не получила только что созданную ставку, ставка читается с основной базы.
+
     :param bet_id: Уникальный идентификатор ставки.
+    :param consistent: Читать с основной базы данных.
     :return: Объект Bet с информацией о ставке.
     :raises HTTPException: Если ставка с указанным идентификатором не найдена.
     """
-    query = "SELECT bet_id, event_id, amount, status FROM bets WHERE bet_id = :bet_id"
-    row = await database.fetch_one(query=query, values={"bet_id": bet_id})
+    row = await read_database.fetchrow(
+        GET_BET_QUERY, bet_id, name="get_bet", primary=consistent, primary_if_missing=True
+    )
 
     if not row:
         raise HTTPException(status_code=404, detail="Bet not found")
@@ -93,36 +360,79 @@ async def get_bet(bet_id: int) -> Bet:
         bet_id=str(row["bet_id"]),
         event_id=row["event_id"],
         amount=row["amount"],
-        status=row["status"]
+        status=row["status"],
+        coefficient=row["coefficient"],
+        payout=row["payout"]
     )
 
 
-@router.post("/update", tags=["Bets"])
-async def update_bet_status(event_update: Dict[str, str]) -> Dict[str, str]:
+def _settlement_message(event_id: str, settlement: Settlement) -> str:
     """
-    Обновляет статусы ставок, связанных с завершенным событием.
+    Возвращает описание хода расчёта ставок по событию.
+    """
+    if settlement.state == SettlementState.COMPLETED:
+        return f"Bets for event '{event_id}' updated to {settlement.bet_status.value}"
+    return f"Bets for event '{event_id}' are being updated to {settlement.bet_status.value}"
+
 
-    :param event_update: Словарь с идентификатором события и новым статусом.
-    :return: Словарь с сообщением об успешном обновлении статусов.
-    :raises HTTPException: Если новый статус недействителен или обновление не удалось.
+@router.post(
+    "/update",
+    response_model=Union[SettlementResponse, List[SettlementResponse]],
+    tags=["Bets"]
+)
+async def update_bet_status(
+    event_update: Union[EventResult, List[EventResult]]
+) -> Union[SettlementResponse, List[SettlementResponse]]:
     """
-    event_id = event_update["event_id"]
-    new_status = event_update["status"]
+    Принимает результат завершенного события и запускает расчет связанных ставок.
 
-    if new_status == "finished_win":
-        bet_status = BetStatus.WON.value
-    elif new_status == "finished_lose":
-        bet_status = BetStatus.LOST.value
-    else:
-        raise HTTPException(status_code=400, detail="Invalid event status")
+    Результат сохраняется сразу, а ожидающие ставки рассчитываются порциями
+    в коротких транзакциях: первые порции — в рамках запроса, остальные — в фоне.
+    Повторная передача того же результата безопасна.
 
-    query = """
-    UPDATE bets
-    SET status = :status
-    WHERE event_id = :event_id AND status = 'pending';
+    Вместо одного результата можно передать список результатов: они сохраняются
+    одним запросом и рассчитываются вместе, а ответ содержит ход расчёта по каждому
+    событию в порядке запроса. Событие, уже рассчитанное с другим результатом,
+    не отклоняет список, а возвращается с сообщением о конфликте.
+
+    :param event_update: Идентификатор события и новый статус или список таких результатов.
+    :return: Объект SettlementResponse с сообщением и ходом расчета или список таких объектов.
+    :raises HTTPException: Если новый статус недействителен, список превышает допустимый
+        размер или событие уже рассчитано с другим результатом.
     """
+    if isinstance(event_update, EventResult):
+        settlement = await settlement_engine.submit(event_update.event_id, event_update.status)
+        return SettlementResponse(message=_settlement_message(event_update.event_id, settlement),
+                                  settlement=settlement)
+
+    if len(event_update) > settings.SETTLEMENT_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch size exceeds the limit of {settings.SETTLEMENT_BATCH_MAX_SIZE} results"
+        )
+    outcomes = await settlement_engine.submit_many([(result.event_id, result.status) for result in event_update])
+    return [
+        SettlementResponse(
+            message=(
+                _settlement_message(result.event_id, settlement) if matched else
+                f"Event '{result.event_id}' is already settled as {settlement.event_status}"
+            ),
+            settlement=settlement
+        )
+        for result, (settlement, matched) in zip(event_update, outcomes)
+    ]
 
-    await database.execute(query=query, values={"status": str(bet_status), "event_id": event_id})
 
-    return {"message": f"Bets for event '{event_id}' updated to {bet_status}"}
+@router.get("/settlements/{event_id}", response_model=Settlement, tags=["Bets"])
+async def get_settlement_progress(event_id: str) -> Settlement:
+    """
+    Возвращает ход расчета ставок по событию.
 
+    :param event_id: Уникальный идентификатор события.
+    :return: Объект Settlement с количеством рассчитанных ставок и стадией расчета.
+    :raises HTTPException: Если результат события не поступал.
+    """
+    settlement = await get_settlement(event_id)
+    if settlement is None:
+        raise HTTPException(status_code=404, detail="Settlement not found")
+    return settlement
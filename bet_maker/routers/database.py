@@ -0,0 +1,25 @@
+from typing import List
+
+from fastapi import APIRouter
+
+from models import DatabaseStats, ReplicaStats
+from provider.database import database
+from provider.replicas import read_database
+
+router = APIRouter()
+
+
+@router.get("/stats", response_model=DatabaseStats, tags=["Database"])
+async def get_database_stats() -> DatabaseStats:
+    """
+    Возвращает состояние пула соединений с базой данных и статистику длительности запросов.
+    """
+    return database.stats()
+
+
+@router.get("/replicas", response_model=List[ReplicaStats], tags=["Database"])
+async def get_replica_stats() -> List[ReplicaStats]:
+    """
+    Возвращает состояние реплик базы данных, на которые направляются запросы на чтение.
+    """
+    return read_database.stats()
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, HTTPException, Query
+
+from models import EventStats
+from services.event_stats import get_event_stats
+
+router = APIRouter()
+
+
+@router.get("/{event_id}/stats", response_model=EventStats, tags=["Events"])
+async def get_event_bet_stats(
+    event_id: str,
+    consistent: bool = Query(False, description="Read from the primary database to see the latest writes"),
+) -> EventStats:
+    """
+    Возвращает агрегаты ставок на событие: количество и сумму ставок, сумму
+    и потенциальную выплату ожидающих ставок, итоги расчёта.
+
+    Агрегаты обновляются при создании и расчёте ставок, поэтому запрос
+    читает одну строку и не зависит от числа ставок.
+
+    :param event_id: Уникальный идентификатор события.
+    :param consistent: Читать с основной базы данных.
+    :return: Объект EventStats с агрегатами ставок.
+    :raises HTTPException: Если ставок на событие не было.
+    """
+    stats = await get_event_stats(event_id, primary=consistent)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Event stats not found")
+    return stats
@@ -1,21 +1,57 @@
 from typing import List, Any
 
-import aiohttp
 from fastapi import APIRouter, HTTPException
 
-router = APIRouter()
+from models import Event, EventCacheStats
+from provider.event_cache import event_cache
+from provider.line_provider import LineProviderError, LineProviderUnavailable
+from services.events import refresh_events
 
-LINE_PROVIDER_URL = "http://line-provider:8001"
+router = APIRouter()
 
 
 @router.get("/", tags=["Events"])
 async def get_events() -> List[Any]:
     """
-    Получает список доступных событий из line-provider.
+    Получает список доступных событий из line-provider и обновляет ими локальный кэш.
+    """
+    try:
+        return await refresh_events()
+    except LineProviderUnavailable:
+        raise HTTPException(status_code=503, detail="Line-provider is unavailable")
+    except LineProviderError:
+        raise HTTPException(status_code=500, detail="Failed to fetch events")
+
+
+@router.post("/push", status_code=204, tags=["Events"])
+async def push_event(event: Event) -> None:
+    """
+    Принимает изменение события от line-provider и обновляет локальный кэш.
+
+    line-provider вызывает этот эндпоинт при создании события и смене его статуса
+    или дедлайна.
+
+    :param event: Актуальное состояние события.
+    """
+    event_cache.put(event)
+
+
+@router.post("/push/batch", status_code=204, tags=["Events"])
+async def push_events(events: List[Event]) -> None:
+    """
+    Принимает изменения пакета событий от line-provider и обновляет локальный кэш.
+
+    line-provider вызывает этот эндпоинт при пакетном создании событий и пакетной
+    смене их статусов.
+
+    :param events: Актуальное состояние событий.
+    """
+    event_cache.put_many(events)
+
+
+@router.get("/cache", response_model=EventCacheStats, tags=["Events"])
+async def get_event_cache_stats() -> EventCacheStats:
+    """
+    Возвращает статистику попаданий и промахов локального кэша событий.
     """
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f"{LINE_PROVIDER_URL}/events") as response:
-            if response.status != 200:
-                raise HTTPException(status_code=500, detail="Failed to fetch events")
-            events = await response.json()
-    return events
+    return event_cache.stats()
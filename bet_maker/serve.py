@@ -0,0 +1,36 @@
+import uvicorn
+
+from config import settings
+
+
+def main() -> None:
+    """
+    Запускает сервис в одном рабочем процессе.
+
+    bet-maker хранит состояние в памяти процесса: кэш событий, который обновляют
+    уведомления line-provider, очередь отложенной записи ставок, кэш ключей
+    идемпотентности и ограничения частоты запросов. Уведомление line-provider
+    попадает только в один процесс, поэтому при нескольких процессах остальные
+    принимали бы ставки по устаревшему состоянию события до истечения EVENT_CACHE_TTL.
+    Пока это состояние не общее, сервис запускается в одном процессе.
+
+    Пулы соединений и фоновые задачи создаются в lifespan процесса. При остановке
+    процесс перестаёт принимать соединения и ждёт завершения начатых запросов
+    не дольше GRACEFUL_SHUTDOWN_TIMEOUT секунд.
+    """
+    uvicorn.run(
+        "main:app",
+        host=settings.APP_HOST,
+        port=settings.APP_PORT,
+        workers=1,
+        loop=settings.SERVER_LOOP,
+        http=settings.SERVER_HTTP,
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEP_ALIVE_TIMEOUT,
+        timeout_graceful_shutdown=settings.GRACEFUL_SHUTDOWN_TIMEOUT,
+        lifespan="on",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import math
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Optional
+
+from fastapi import HTTPException
+
+from config import settings
+from metrics import BETS_REJECTED
+from services.bets import STAKE_LIMIT_EXCEEDED, stake_limit_exceeded
+
+
+class TokenBucket:
+    """
+    Корзина токенов одного ключа: число доступных токенов и время последнего пополнения.
+    """
+
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float) -> None:
+        self.tokens = tokens
+        self.updated = updated
+
+
+class RateLimiter:
+    """
+    Ограничение частоты запросов по ключу алгоритмом token bucket.
+
+    Каждый ключ получает корзину на burst токенов, которая пополняется со скоростью
+    rate токенов в секунду; запрос забирает один токен. Корзины хранятся в памяти
+    процесса, и давно не использовавшиеся корзины вытесняются по LRU после max_size
+    ключей: вытесненная корзина при следующем запросе создаётся полной, как и корзина
+    ключа, простоявшего без запросов burst / rate секунд. Проверка не ждёт ввода-вывода,
+    поэтому выполняется целиком за один шаг цикла событий и не требует блокировок.
+    Нулевая скорость отключает ограничение.
+    """
+
+    def __init__(self, rate: float, burst: int, max_size: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_size = max_size
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, key: str) -> float:
+        """
+        Забирает токен из корзины ключа.
+
+        :param key: Ключ ограничения.
+        :return: 0, если токен получен, иначе время в секундах до появления токена.
+        """
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.burst, now)
+            while len(self._buckets) > self.max_size:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return 0.0
+        return (1 - bucket.tokens) / self.rate
+
+
+class StakeLimiter:
+    """
+    Счётчики суммы ставок на событие в памяти процесса для раннего отказа по лимиту.
+
+    Сумма ставки резервируется в счётчике события до обращения к line-provider
+    и базе данных и возвращается через release, если ставка не сохранена. Счётчик
+    учитывает только ставки, принятые этим процессом после запуска, поэтому он не больше
+    действительной суммы ставок на событие: ставка, не уместившаяся в него, отклоняется
+    без ввода-вывода, а точная проверка выполняется в базе данных при вставке ставки
+    (см. services.bets). Как и в RateLimiter, проверка и резервирование выполняются
+    за один шаг цикла событий и не требуют блокировок. Счётчики давно не использовавшихся
+    событий вытесняются по LRU после max_size событий. Нулевой лимит отключает ограничение.
+    """
+
+    def __init__(self, max_stake: Decimal, max_size: int) -> None:
+        self.max_stake = max_stake
+        self.max_size = max_size
+        self._stakes: "OrderedDict[str, Decimal]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._stakes)
+
+    def reserve(self, event_id: str, amount: Decimal) -> bool:
+        """
+        Резервирует сумму ставки в счётчике события.
+
+        :param event_id: Уникальный идентификатор события.
+        :param amount: Сумма ставки.
+        :return: False, если ставка превысила бы лимит суммы ставок на событие.
+        """
+        if self.max_stake <= 0:
+            return True
+        stake = self._stakes.get(event_id, Decimal(0)) + amount
+        if stake > self.max_stake:
+            return False
+        self._stakes[event_id] = stake
+        self._stakes.move_to_end(event_id)
+        while len(self._stakes) > self.max_size:
+            self._stakes.popitem(last=False)
+        return True
+
+    def release(self, event_id: str, amount: Decimal) -> None:
+        """
+        Возвращает в счётчик события сумму несохранённой ставки.
+
+        :param event_id: Уникальный идентификатор события.
+        :param amount: Сумма ставки.
+        """
+        stake = self._stakes.get(event_id)
+        if stake is not None:
+            self._stakes[event_id] = max(stake - amount, Decimal(0))
+
+
+class AdmissionControl:
+    """
+    Контроль приёма ставок до обращения к line-provider и базе данных.
+
+    Запросы на создание ставок ограничиваются по частоте для каждого клиента
+    и для каждого события, а ставки — по сумме ставок на событие. Ограничения
+    действуют в памяти процесса bet-maker. Лимит суммы ставок на событие, кроме того,
+    проверяется в базе данных при вставке ставок (см. services.bets), поэтому
+    соблюдается и для ставок, принятых до перезапуска процесса.
+    """
+
+    def __init__(self, clients: RateLimiter, events: RateLimiter, stakes: StakeLimiter) -> None:
+        self.clients = clients
+        self.events = events
+        self.stakes = stakes
+
+    @staticmethod
+    def _reject(reason: str, detail: str, retry_after: float) -> HTTPException:
+        """
+        Возвращает ответ 429 с заголовком Retry-After и учитывает отказ в метриках.
+        """
+        BETS_REJECTED.labels(reason).inc()
+        return HTTPException(
+            status_code=429, detail=detail, headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+
+    def admit_client(self, client_id: str) -> None:
+        """
+        Учитывает запрос клиента в ограничении частоты запросов.
+
+        :param client_id: Идентификатор клиента.
+        :raises HTTPException: Если клиент превысил допустимую частоту запросов.
+        """
+        retry_after = self.clients.acquire(client_id)
+        if retry_after:
+            raise self._reject("client_rate", "Слишком много запросов от клиента", retry_after)
+
+    def admit_event(self, event_id: str) -> None:
+        """
+        Учитывает ставку на событие в ограничении частоты ставок на событие.
+
+        :param event_id: Уникальный идентификатор события.
+        :raises HTTPException: Если на событие поступает слишком много ставок.
+        """
+        retry_after = self.events.acquire(event_id)
+        if retry_after:
+            raise self._reject("event_rate", "Слишком много ставок на событие", retry_after)
+
+    def try_admit_event(self, event_id: str) -> Optional[str]:
+        """
+        Учитывает ставку из пакета в ограничении частоты ставок на событие.
+
+        :param event_id: Уникальный идентификатор события.
+        :return: Причина отказа или None, если ставка принята.
+        """
+        if self.events.acquire(event_id):
+            BETS_REJECTED.labels("event_rate").inc()
+            return "Слишком много ставок на событие"
+        return None
+
+    def reserve_stake(self, event_id: str, amount: Decimal) -> None:
+        """
+        Резервирует сумму ставки в лимите суммы ставок на событие.
+
+        :param event_id: Уникальный идентификатор события.
+        :param amount: Сумма ставки.
+        :raises HTTPException: Если ставка превысила бы лимит суммы ставок на событие.
+        """
+        if not self.stakes.reserve(event_id, amount):
+            raise stake_limit_exceeded()
+
+    def try_reserve_stake(self, event_id: str, amount: Decimal) -> Optional[str]:
+        """
+        Резервирует сумму ставки из пакета в лимите суммы ставок на событие.
+
+        :param event_id: Уникальный идентификатор события.
+        :param amount: Сумма ставки.
+        :return: Причина отказа или None, если сумма зарезервирована.
+        """
+        if self.stakes.reserve(event_id, amount):
+            return None
+        BETS_REJECTED.labels("event_stake").inc()
+        return STAKE_LIMIT_EXCEEDED
+
+    def release_stake(self, event_id: str, amount: Decimal) -> None:
+        """
+        Возвращает в лимит события сумму несохранённой ставки.
+
+        :param event_id: Уникальный идентификатор события.
+        :param amount: Сумма ставки.
+        """
+        self.stakes.release(event_id, amount)
+
+
+admission_control = AdmissionControl(
+    clients=RateLimiter(
+        rate=settings.BET_CLIENT_RATE_LIMIT,
+        burst=settings.BET_CLIENT_BURST,
+        max_size=settings.BET_RATE_LIMIT_MAX_KEYS,
+    ),
+    events=RateLimiter(
+        rate=settings.BET_EVENT_RATE_LIMIT,
+        burst=settings.BET_EVENT_BURST,
+        max_size=settings.BET_RATE_LIMIT_MAX_KEYS,
+    ),
+    stakes=StakeLimiter(
+        max_stake=settings.EVENT_MAX_TOTAL_STAKE,
+        max_size=settings.BET_RATE_LIMIT_MAX_KEYS,
+    ),
+)
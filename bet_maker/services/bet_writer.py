@@ -0,0 +1,166 @@
+import asyncio
+import logging
+from decimal import Decimal
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from config import settings
+from models import CreateBetRequest
+from services.bets import insert_bets
+
+logger = logging.getLogger(__name__)
+
+_PendingBet = Tuple[CreateBetRequest, Decimal, "asyncio.Future[int]"]
+
+
+class BetWriteQueue:
+    """
+    Очередь отложенной записи ставок с группировкой в пакеты.
+
+    Обработчик запроса кладёт провалидированную ставку в очередь и ждёт,
+    пока фоновая задача запишет её вместе с другими ставками одним
+    многострочным INSERT. Пакет отправляется, как только набралось
+    ``batch_size`` ставок или истекло окно ``batch_window`` секунд с момента
+    прихода первой ставки пакета.
+
+    Число ставок, ждущих в очереди, ограничено семафором на ``max_size`` мест.
+    Проверка остановки и постановка в очередь выполняются без переключения
+    задач, поэтому после сигнала остановки в очередь не попадает ни одна ставка,
+    а запросы, ждавшие свободного места, получают отказ.
+    """
+
+    def __init__(self, batch_size: int, batch_window: float, max_size: int, enqueue_timeout: float) -> None:
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.max_size = max_size
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: Optional["asyncio.Queue[Optional[_PendingBet]]"] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._closing = False
+
+    async def start(self) -> None:
+        """
+        Создаёт очередь и запускает фоновую задачу записи.
+        """
+        if self._flusher is not None:
+            return
+        self._closing = False
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_size)
+        self._flusher = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Перестаёт принимать ставки, записывает все ставки из очереди
+        и останавливает фоновую задачу.
+        """
+        if self._flusher is None:
+            return
+        self._closing = True
+        self._queue.put_nowait(None)
+        await self._flusher
+        self._flusher = None
+
+    async def submit(self, bet: CreateBetRequest, coefficient: Decimal) -> int:
+        """
+        Ставит ставку в очередь записи и ждёт присвоения идентификатора.
+
+        :param bet: Провалидированная ставка.
+        :param coefficient: Коэффициент события, действовавший при приёме ставки.
+        :return: Идентификатор созданной ставки.
+        :raises HTTPException: Если очередь остановлена или переполнена дольше допустимого.
+        """
+        if self._flusher is None or self._closing:
+            raise HTTPException(status_code=503, detail="Приём ставок временно остановлен")
+
+        if self._slots.locked():
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                raise HTTPException(status_code=503, detail="Очередь записи ставок переполнена")
+            if self._closing:
+                self._slots.release()
+                raise HTTPException(status_code=503, detail="Приём ставок временно остановлен")
+        else:
+            await self._slots.acquire()
+
+        future: "asyncio.Future[int]" = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((bet, coefficient, future))
+        return await future
+
+    async def _run(self) -> None:
+        """
+        Собирает ставки из очереди в пакеты и записывает их до получения сигнала остановки.
+
+        Ставки, оказавшиеся в очереди после сигнала остановки, получают отказ,
+        чтобы ожидающие их запросы не зависли.
+        """
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            self._slots.release()
+            batch: List[_PendingBet] = [item]
+            window_ends_at = loop.time() + self.batch_window
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = window_ends_at - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                self._slots.release()
+                batch.append(item)
+            await self._flush(batch)
+
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None and not item[2].done():
+                item[2].set_exception(HTTPException(status_code=503, detail="Приём ставок временно остановлен"))
+
+    async def _flush(self, batch: List[_PendingBet]) -> None:
+        """
+        Записывает пакет ставок и передаёт каждому ожидающему его идентификатор ставки
+        или отказ, если ставка превысила лимит суммы ставок на событие или результат
+        события уже записан.
+
+        :param batch: Ставки и ожидающие их результата future.
+        """
+        try:
+            results = await insert_bets(
+                [bet for bet, _, _ in batch],
+                [coefficient for _, coefficient, _ in batch],
+            )
+        except Exception as e:
+            logger.exception("Failed to write a batch of %d bets", len(batch))
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, HTTPException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+bet_write_queue = BetWriteQueue(
+    batch_size=settings.BET_WRITE_BATCH_SIZE,
+    batch_window=settings.BET_WRITE_BATCH_WINDOW_MS / 1000,
+    max_size=settings.BET_WRITE_QUEUE_SIZE,
+    enqueue_timeout=settings.BET_WRITE_ENQUEUE_TIMEOUT,
+)
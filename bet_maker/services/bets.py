@@ -0,0 +1,400 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple, Union
+
+from fastapi import HTTPException
+
+from config import settings
+from metrics import BETS_REJECTED
+from models import BetStatus, CreateBetRequest, SortOrder
+from provider.database import Database, Transaction, database
+from provider.replicas import read_database
+from responses import dumps
+from services.event_stats import ADD_BETS_TO_EVENT_STATS_CTE
+
+STAKE_LIMIT_EXCEEDED = "Превышен лимит суммы ставок на событие"
+EVENT_SETTLED = "Результат события уже получен, ставки не принимаются"
+
+# Блокирует строку агрегатов события ($1), если ставка на сумму $2 укладывается в лимит
+# суммы ставок на событие $3, и создаёт её, если ставок на событие ещё не было.
+# Блокировка держится до конца транзакции вставки ставки, поэтому параллельные ставки
+# на событие из любых процессов и реплик проверяют лимит по очереди, с учётом уже принятых.
+RESERVE_EVENT_STAKE_QUERY = """
+INSERT INTO event_stats (event_id)
+SELECT $1::VARCHAR WHERE $2::NUMERIC <= $3::NUMERIC
+ON CONFLICT (event_id) DO UPDATE
+SET updated_at = event_stats.updated_at
+WHERE event_stats.total_stake + $2::NUMERIC <= $3::NUMERIC
+RETURNING event_id;
+"""
+
+# Блокирует строки агрегатов событий пакета в порядке event_id (создавая недостающие)
+# и возвращает суммы уже принятых на них ставок.
+LOCK_EVENT_STAKES_QUERY = """
+INSERT INTO event_stats (event_id)
+SELECT event_id FROM unnest($1::VARCHAR[]) AS event_id ORDER BY event_id
+ON CONFLICT (event_id) DO UPDATE
+SET updated_at = event_stats.updated_at
+RETURNING event_id, total_stake;
+"""
+
+INSERT_BET_QUERY = f"""
+WITH batch AS (
+    SELECT $1::VARCHAR AS event_id, $2::NUMERIC AS amount, $3::NUMERIC AS coefficient
+), {ADD_BETS_TO_EVENT_STATS_CTE}, inserted AS (
+    INSERT INTO bets (event_id, amount, coefficient, status)
+    SELECT batch.event_id, batch.amount, batch.coefficient, $4
+    FROM batch JOIN stats USING (event_id)
+    RETURNING bet_id
+)
+SELECT bet_id FROM inserted;
+"""
+
+# Ставка с ключом идемпотентности: идентификатор ставки сначала закрепляется за ключом,
+# и ставка вставляется, только если ключа ещё не было. Параллельный запрос с тем же
+# ключом дождётся фиксации первого и не вставит ничего: запрос не вернёт строк.
+# Если ключ закреплён, но ставка не вставлена, возвращается строка с bet_id = NULL.
+INSERT_IDEMPOTENT_BET_QUERY = f"""
+WITH idempotency_key AS (
+    INSERT INTO bet_idempotency_keys (idempotency_key, bet_id)
+    VALUES ($5, nextval(pg_get_serial_sequence('bets', 'bet_id')))
+    ON CONFLICT (idempotency_key) DO NOTHING
+    RETURNING bet_id
+), batch AS (
+    SELECT bet_id, $1::VARCHAR AS event_id, $2::NUMERIC AS amount, $3::NUMERIC AS coefficient
+    FROM idempotency_key
+), {ADD_BETS_TO_EVENT_STATS_CTE}, inserted AS (
+    INSERT INTO bets (bet_id, event_id, amount, coefficient, status)
+    SELECT batch.bet_id, batch.event_id, batch.amount, batch.coefficient, $4
+    FROM batch JOIN stats USING (event_id)
+    RETURNING bet_id
+)
+SELECT inserted.bet_id FROM idempotency_key LEFT JOIN inserted USING (bet_id);
+"""
+
+# Ключ, ставка которого удалена вместе с секцией по сроку хранения, считается истёкшим.
+# Ставка проверяется в том же запросе, поэтому ключ ставки, которая ещё есть, не удаляется.
+DELETE_EXPIRED_IDEMPOTENCY_KEY_QUERY = """
+DELETE FROM bet_idempotency_keys
+WHERE idempotency_key = $1
+  AND NOT EXISTS (SELECT 1 FROM bets WHERE bets.bet_id = bet_idempotency_keys.bet_id)
+RETURNING idempotency_key;
+"""
+
+GET_BET_BY_IDEMPOTENCY_KEY_QUERY = """
+SELECT bets.bet_id, bets.event_id, bets.amount, bets.coefficient
+FROM bet_idempotency_keys
+JOIN bets ON bets.bet_id = bet_idempotency_keys.bet_id
+WHERE bet_idempotency_keys.idempotency_key = $1;
+"""
+
+INSERT_BETS_QUERY = f"""
+WITH batch AS (
+    SELECT * FROM unnest($1::VARCHAR[], $2::NUMERIC[], $3::NUMERIC[])
+        WITH ORDINALITY AS item(event_id, amount, coefficient, position)
+), {ADD_BETS_TO_EVENT_STATS_CTE}, inserted AS (
+    INSERT INTO bets (event_id, amount, coefficient, status)
+    SELECT batch.event_id, batch.amount, batch.coefficient, $4
+    FROM batch JOIN stats USING (event_id)
+    ORDER BY batch.position
+    RETURNING bet_id, event_id
+)
+SELECT bet_id, event_id FROM inserted ORDER BY bet_id;
+"""
+
+
+def stake_limit_exceeded() -> HTTPException:
+    """
+    Возвращает ответ 429 на ставку, превышающую лимит суммы ставок на событие,
+    и учитывает отказ в метриках.
+    """
+    BETS_REJECTED.labels("event_stake").inc()
+    return HTTPException(status_code=429, detail=STAKE_LIMIT_EXCEEDED)
+
+
+def event_settled() -> HTTPException:
+    """
+    Возвращает ответ 400 на ставку на событие, результат которого уже записан.
+    """
+    return HTTPException(status_code=400, detail=EVENT_SETTLED)
+
+
+async def _reserve_stake(transaction: Transaction, bet: CreateBetRequest) -> None:
+    """
+    Проверяет ставку по лимиту суммы ставок на событие и блокирует агрегаты события
+    до конца транзакции.
+
+    :param transaction: Транзакция, в которой будет вставлена ставка.
+    :param bet: Провалидированная ставка.
+    :raises HTTPException: Если ставка превысила бы лимит суммы ставок на событие.
+    """
+    reserved = await transaction.fetchval(
+        RESERVE_EVENT_STAKE_QUERY, bet.event_id, bet.amount, settings.EVENT_MAX_TOTAL_STAKE,
+        name="reserve_event_stake",
+    )
+    if reserved is None:
+        raise stake_limit_exceeded()
+
+
+async def insert_bet(bet: CreateBetRequest, coefficient: Decimal) -> int:
+    """
+    Сохраняет ставку и добавляет её к агрегатам события.
+
+    Если задан лимит суммы ставок на событие (EVENT_MAX_TOTAL_STAKE), он проверяется
+    в той же транзакции, что и вставка ставки. Ставка на событие, результат которого
+    уже записан, не вставляется, даже если кэш событий ещё считает событие открытым.
+
+    :param bet: Провалидированная ставка.
+    :param coefficient: Коэффициент события, действовавший при приёме ставки.
+    :return: Идентификатор созданной ставки.
+    :raises HTTPException: Если ставка превысила бы лимит суммы ставок на событие
+        или результат события уже записан.
+    """
+    args = (bet.event_id, bet.amount, coefficient, BetStatus.PENDING.value)
+    if settings.EVENT_MAX_TOTAL_STAKE <= 0:
+        bet_id = await database.fetchval(INSERT_BET_QUERY, *args, name="insert_bet")
+    else:
+        async with database.transaction() as transaction:
+            await _reserve_stake(transaction, bet)
+            bet_id = await transaction.fetchval(INSERT_BET_QUERY, *args, name="insert_bet")
+    if bet_id is None:
+        raise event_settled()
+    return bet_id
+
+
+async def insert_idempotent_bet(
+    bet: CreateBetRequest, coefficient: Decimal, idempotency_key: str
+) -> Optional[int]:
+    """
+    Сохраняет ставку, если ставка с таким ключом идемпотентности ещё не создавалась.
+
+    Если ключ уже есть, но его ставка удалена вместе с секцией по сроку хранения,
+    ключ считается истёкшим: он удаляется, и ставка сохраняется как новая.
+    Лимит суммы ставок на событие и записанный результат события проверяются так же,
+    как в insert_bet; ключ отклонённой ставки не сохраняется.
+
+    :param bet: Провалидированная ставка.
+    :param coefficient: Коэффициент события, действовавший при приёме ставки.
+    :param idempotency_key: Ключ идемпотентности запроса.
+    :return: Идентификатор созданной ставки или None, если ключ уже использован.
+    :raises HTTPException: Если ставка превысила бы лимит суммы ставок на событие
+        или результат события уже записан.
+    """
+    if settings.EVENT_MAX_TOTAL_STAKE <= 0:
+        return await _insert_idempotent_bet(database, bet, coefficient, idempotency_key)
+    async with database.transaction() as transaction:
+        await _reserve_stake(transaction, bet)
+        return await _insert_idempotent_bet(transaction, bet, coefficient, idempotency_key)
+
+
+async def _insert_idempotent_bet(executor: Union[Database, Transaction], bet: CreateBetRequest,
+                                 coefficient: Decimal, idempotency_key: str) -> Optional[int]:
+    """
+    Вставляет ставку с ключом идемпотентности, удаляя истёкший ключ и повторяя вставку один раз.
+
+    Если ставка не вставлена из-за записанного результата события, закреплённый за ней ключ
+    удаляется, чтобы повторный запрос не считался повтором несуществующей ставки.
+    """
+    args = (bet.event_id, bet.amount, coefficient, BetStatus.PENDING.value, idempotency_key)
+    row = await executor.fetchrow(INSERT_IDEMPOTENT_BET_QUERY, *args, name="insert_idempotent_bet")
+    if row is None and await executor.fetchval(
+        DELETE_EXPIRED_IDEMPOTENCY_KEY_QUERY, idempotency_key, name="delete_expired_idempotency_key"
+    ):
+        row = await executor.fetchrow(INSERT_IDEMPOTENT_BET_QUERY, *args, name="insert_idempotent_bet")
+    if row is None:
+        return None
+    if row["bet_id"] is None:
+        await executor.fetchval(
+            DELETE_EXPIRED_IDEMPOTENCY_KEY_QUERY, idempotency_key, name="delete_expired_idempotency_key"
+        )
+        raise event_settled()
+    return row["bet_id"]
+
+
+async def get_bet_by_idempotency_key(idempotency_key: str) -> Optional[Any]:
+    """
+    Возвращает ставку, созданную запросом с указанным ключом идемпотентности.
+
+    :param idempotency_key: Ключ идемпотентности запроса.
+    :return: Строка с bet_id, event_id, amount и coefficient или None.
+    """
+    return await database.fetchrow(
+        GET_BET_BY_IDEMPOTENCY_KEY_QUERY, idempotency_key, name="get_bet_by_idempotency_key"
+    )
+
+
+async def _insert_bets(executor: Union[Database, Transaction], bets: Sequence[CreateBetRequest],
+                       coefficients: Sequence[Decimal]) -> List[Optional[int]]:
+    """
+    Вставляет ставки одним многострочным INSERT и возвращает их идентификаторы в порядке следования;
+    None — для ставок на события, результат которых уже записан.
+    """
+    rows = await executor.fetch(
+        INSERT_BETS_QUERY,
+        [bet.event_id for bet in bets],
+        [bet.amount for bet in bets],
+        list(coefficients),
+        BetStatus.PENDING.value,
+        name="insert_bets",
+    )
+    inserted = {row["event_id"] for row in rows}
+    bet_ids = iter(row["bet_id"] for row in rows)
+    return [next(bet_ids) if bet.event_id in inserted else None for bet in bets]
+
+
+async def insert_bets(bets: Sequence[CreateBetRequest],
+                      coefficients: Sequence[Decimal]) -> List[Union[int, HTTPException]]:
+    """
+    Сохраняет несколько ставок одним многострочным INSERT и добавляет их к агрегатам событий.
+
+    Идентификаторы ставкам выдаются последовательностью в порядке следования ставок,
+    поэтому сортировка по bet_id восстанавливает этот порядок.
+
+    Если задан лимит суммы ставок на событие (EVENT_MAX_TOTAL_STAKE), агрегаты событий
+    пакета блокируются в той же транзакции, а ставки проверяются по лимиту по порядку:
+    ставка, которая превысила бы лимит, отклоняется, а следующие ставки на то же событие
+    проверяются без неё. Ставки на события, результат которых уже записан, отклоняются.
+
+    :param bets: Провалидированные ставки.
+    :param coefficients: Коэффициенты событий, действовавшие при приёме каждой ставки.
+    :return: Идентификаторы созданных ставок в порядке следования ставок; для отклонённых
+        ставок — HTTPException с причиной отказа.
+    """
+    if not bets:
+        return []
+    if settings.EVENT_MAX_TOTAL_STAKE <= 0:
+        return [bet_id if bet_id is not None else event_settled()
+                for bet_id in await _insert_bets(database, bets, coefficients)]
+
+    async with database.transaction() as transaction:
+        rows = await transaction.fetch(
+            LOCK_EVENT_STAKES_QUERY, sorted({bet.event_id for bet in bets}), name="lock_event_stakes"
+        )
+        stakes = {row["event_id"]: row["total_stake"] for row in rows}
+        accepted = []
+        for index, bet in enumerate(bets):
+            stake = stakes[bet.event_id] + bet.amount
+            if stake <= settings.EVENT_MAX_TOTAL_STAKE:
+                stakes[bet.event_id] = stake
+                accepted.append(index)
+        bet_ids = []
+        if accepted:
+            bet_ids = await _insert_bets(
+                transaction, [bets[index] for index in accepted], [coefficients[index] for index in accepted]
+            )
+
+    if len(accepted) < len(bets):
+        BETS_REJECTED.labels("event_stake").inc(len(bets) - len(accepted))
+    result: List[Union[int, HTTPException]] = [
+        HTTPException(status_code=429, detail=STAKE_LIMIT_EXCEEDED) for _ in bets
+    ]
+    for index, bet_id in zip(accepted, bet_ids):
+        result[index] = bet_id if bet_id is not None else event_settled()
+    return result
+
+
+def _to_db_timestamp(value: datetime) -> datetime:
+    """
+    Приводит время к UTC без часового пояса, как оно хранится в колонке created_at.
+
+    :param value: Время с часовым поясом или без него.
+    :return: Время в UTC без часового пояса.
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def build_history_query(
+    cursor: Optional[int] = None,
+    order: SortOrder = SortOrder.DESC,
+    event_id: Optional[str] = None,
+    status: Optional[BetStatus] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    limit: Optional[int] = None,
+) -> Tuple[str, List[Any]]:
+    """
+    Строит запрос истории ставок с фильтрами и keyset-пагинацией по bet_id.
+
+    Вместо OFFSET следующая страница начинается после bet_id последней ставки
+    предыдущей страницы, поэтому стоимость запроса не зависит от глубины страницы.
+
+    :param cursor: bet_id последней полученной ставки.
+    :param order: Порядок сортировки по bet_id.
+    :param event_id: Фильтр по событию.
+    :param status: Фильтр по статусу ставки.
+    :param created_from: Нижняя граница времени создания (включительно).
+    :param created_to: Верхняя граница времени создания (не включительно).
+    :param limit: Максимальное число ставок или None для выборки без ограничения.
+    :return: Текст запроса с позиционными параметрами и их значения.
+    """
+    conditions = []
+    args: List[Any] = []
+
+    def bind(value: Any) -> str:
+        args.append(value)
+        return f"${len(args)}"
+
+    if cursor is not None:
+        conditions.append(f"bet_id {'>' if order == SortOrder.ASC else '<'} {bind(cursor)}")
+    if event_id is not None:
+        conditions.append(f"event_id = {bind(event_id)}")
+    if status is not None:
+        conditions.append(f"status = {bind(status.value)}")
+    if created_from is not None:
+        conditions.append(f"created_at >= {bind(_to_db_timestamp(created_from))}")
+    if created_to is not None:
+        conditions.append(f"created_at < {bind(_to_db_timestamp(created_to))}")
+
+    query = "SELECT bet_id, event_id, amount, status, coefficient, payout, created_at FROM bets"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY bet_id ASC" if order == SortOrder.ASC else " ORDER BY bet_id DESC"
+    if limit is not None:
+        query += f" LIMIT {bind(limit)}"
+    return query, args
+
+
+def history_row_to_dict(row: Any) -> Dict[str, Any]:
+    """
+    Преобразует строку истории ставок в словарь полей BetHistoryResponse.
+
+    Суммы остаются Decimal и сериализуются строкой без потери точности.
+
+    :param row: Строка результата запроса истории ставок.
+    :return: Словарь для сериализации в JSON.
+    """
+    return {
+        "bet_id": str(row["bet_id"]),
+        "event_id": row["event_id"],
+        "amount": row["amount"],
+        "status": row["status"],
+        "coefficient": row["coefficient"],
+        "payout": row["payout"],
+        "created_at": row["created_at"],
+    }
+
+
+async def stream_history_ndjson(query: str, args: Sequence[Any], primary: bool = False) -> AsyncIterator[bytes]:
+    """
+    Выгружает историю ставок в формате NDJSON через серверный курсор.
+
+    Строки читаются курсором и отдаются порциями по BET_HISTORY_STREAM_CHUNK_SIZE,
+    поэтому потребление памяти не зависит от размера выборки.
+
+    :param query: Текст запроса истории ставок.
+    :param args: Значения позиционных параметров запроса.
+    :param primary: Читать с основной базы, а не с реплики.
+    :return: Асинхронный итератор порций NDJSON.
+    """
+    chunk: List[bytes] = []
+    async for row in read_database.iterate(
+        query, *args, prefetch=settings.BET_HISTORY_STREAM_CHUNK_SIZE, name="stream_bets", primary=primary
+    ):
+        chunk.append(dumps(history_row_to_dict(row)))
+        if len(chunk) >= settings.BET_HISTORY_STREAM_CHUNK_SIZE:
+            yield b"\n".join(chunk) + b"\n"
+            chunk = []
+    if chunk:
+        yield b"\n".join(chunk) + b"\n"
@@ -0,0 +1,88 @@
+from typing import Optional
+
+from models import EventStats
+from provider.replicas import read_database
+
+EVENT_STATS_COLUMNS = (
+    "event_id, bet_count, total_stake, pending_count, pending_stake, pending_liability, "
+    "won_count, lost_count, total_payout, updated_at"
+)
+
+# Добавляет ставки из CTE batch (колонки event_id, amount, coefficient) к агрегатам их событий
+# и возвращает события, ставки на которые можно вставить. Используется в одном запросе со вставкой
+# ставок, поэтому агрегаты меняются в той же транзакции. Строки event_stats блокируются в порядке
+# event_id, так что параллельные пакеты ставок не взаимоблокируются.
+#
+# События, результат которых уже записан (settled), не учитываются и не возвращаются. Признак
+# проверяется по заблокированной строке, а запись результата выставляет его, блокируя ту же
+# строку (см. CLOSE_EVENT_STATS_CTE). Поэтому ставка, вставляемая одновременно с записью
+# результата, либо отклоняется, либо фиксируется раньше результата и попадает в расчёт.
+ADD_BETS_TO_EVENT_STATS_CTE = """
+stats AS (
+    INSERT INTO event_stats (event_id, bet_count, total_stake, pending_count, pending_stake, pending_liability)
+    SELECT event_id, count(*), SUM(amount), count(*), SUM(amount), COALESCE(SUM(ROUND(amount * coefficient, 2)), 0)
+    FROM batch
+    WHERE NOT EXISTS (SELECT 1 FROM settlements WHERE settlements.event_id = batch.event_id)
+    GROUP BY event_id
+    ORDER BY event_id
+    ON CONFLICT (event_id) DO UPDATE
+    SET bet_count = event_stats.bet_count + EXCLUDED.bet_count,
+        total_stake = event_stats.total_stake + EXCLUDED.total_stake,
+        pending_count = event_stats.pending_count + EXCLUDED.pending_count,
+        pending_stake = event_stats.pending_stake + EXCLUDED.pending_stake,
+        pending_liability = event_stats.pending_liability + EXCLUDED.pending_liability,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE NOT event_stats.settled
+    RETURNING event_id
+)
+"""
+
+# Отмечает события, результат которых записан в CTE recorded (колонка event_id), чтобы
+# на них больше не вставлялись ставки. Строки блокируются в порядке event_id, как при вставке ставок.
+CLOSE_EVENT_STATS_CTE = """
+closed AS (
+    INSERT INTO event_stats (event_id, settled)
+    SELECT event_id, TRUE FROM recorded
+    ORDER BY event_id
+    ON CONFLICT (event_id) DO UPDATE
+    SET settled = TRUE,
+        updated_at = CURRENT_TIMESTAMP
+)
+"""
+
+# Переносит ставки, рассчитанные в CTE settled (колонки amount, coefficient, payout),
+# из ожидающих в выигравшие или проигравшие. Параметры: $1 — событие, $4 — выиграли ли ставки.
+SETTLE_EVENT_STATS_CTE = """
+stats AS (
+    UPDATE event_stats
+    SET pending_count = pending_count - totals.settled,
+        pending_stake = pending_stake - totals.stake,
+        pending_liability = pending_liability - totals.liability,
+        won_count = won_count + CASE WHEN $4 THEN totals.settled ELSE 0 END,
+        lost_count = lost_count + CASE WHEN $4 THEN 0 ELSE totals.settled END,
+        total_payout = total_payout + totals.payout,
+        updated_at = CURRENT_TIMESTAMP
+    FROM (
+        SELECT count(*) AS settled,
+               COALESCE(SUM(amount), 0) AS stake,
+               COALESCE(SUM(ROUND(amount * coefficient, 2)), 0) AS liability,
+               COALESCE(SUM(payout), 0) AS payout
+        FROM settled
+    ) AS totals
+    WHERE event_stats.event_id = $1 AND totals.settled > 0
+)
+"""
+
+GET_EVENT_STATS_QUERY = f"SELECT {EVENT_STATS_COLUMNS} FROM event_stats WHERE event_id = $1;"
+
+
+async def get_event_stats(event_id: str, primary: bool = False) -> Optional[EventStats]:
+    """
+    Возвращает агрегаты ставок на событие одним чтением по первичному ключу.
+
+    :param event_id: Уникальный идентификатор события.
+    :param primary: Читать с основной базы, а не с реплики.
+    :return: Объект EventStats или None, если ставок на событие не было.
+    """
+    row = await read_database.fetchrow(GET_EVENT_STATS_QUERY, event_id, name="get_event_stats", primary=primary)
+    return EventStats(**{key: row[key] for key in EVENT_STATS_COLUMNS.split(", ")}) if row else None
@@ -0,0 +1,154 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Tuple
+
+from fastapi import HTTPException
+
+from models import Event, EventState
+from provider.event_cache import event_cache
+from provider.line_provider import (
+    EventNotFound,
+    LineProviderError,
+    LineProviderUnavailable,
+    line_provider_client,
+)
+
+_in_flight: Dict[str, "asyncio.Future[Event]"] = {}
+
+
+async def _fetch_event(event_id: str) -> Event:
+    """
+    Запрашивает событие у line-provider и кладёт его в кэш.
+
+    Если пока шёл запрос, в кэш попало более новое изменение события
+    от line-provider, возвращается оно.
+
+    :param event_id: Уникальный идентификатор события.
+    :return: Событие.
+    :raises HTTPException: Если событие не найдено или line-provider недоступен.
+    """
+    try:
+        event_data = await line_provider_client.get_event(event_id)
+    except EventNotFound:
+        raise HTTPException(status_code=400, detail="Событие не найдено или уже завершено")
+    except LineProviderUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"Сервис line-provider недоступен: {str(e)}")
+    except LineProviderError as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка запроса к line-provider: {str(e)}")
+
+    return event_cache.put(Event.model_validate(event_data))
+
+
+async def get_event(event_id: str) -> Event:
+    """
+    Возвращает событие из локального кэша, при промахе — из line-provider.
+
+    Одновременные промахи по одному событию объединяются в один запрос.
+
+    :param event_id: Уникальный идентификатор события.
+    :return: Событие.
+    :raises HTTPException: Если событие не найдено или line-provider недоступен.
+    """
+    event = event_cache.get(event_id)
+    if event is not None:
+        return event
+
+    pending = _in_flight.get(event_id)
+    if pending is not None:
+        return await asyncio.shield(pending)
+
+    pending = asyncio.ensure_future(_fetch_event(event_id))
+    _in_flight[event_id] = pending
+    pending.add_done_callback(lambda _: _in_flight.pop(event_id, None))
+    return await asyncio.shield(pending)
+
+
+def ensure_event_open(event: Event) -> None:
+    """
+    Проверяет, что на событие можно принять ставку.
+
+    :param event: Событие.
+    :raises HTTPException: Если событие завершено, закрыто или его дедлайн истёк.
+    """
+    if event.state == EventState.CLOSED:
+        raise HTTPException(status_code=400, detail="Приём ставок на событие закрыт")
+    if event.state != EventState.NEW:
+        raise HTTPException(status_code=400, detail="Событие недействительно для ставки")
+
+    deadline = event.deadline
+    if deadline.tzinfo is None:
+        deadline = deadline.replace(tzinfo=timezone.utc)
+    if deadline <= datetime.now(timezone.utc):
+        raise HTTPException(status_code=400, detail="Приём ставок на событие закрыт")
+
+
+async def get_open_event(event_id: str) -> Event:
+    """
+    Возвращает событие, открытое для приёма ставок.
+
+    :param event_id: Уникальный идентификатор события.
+    :return: Событие.
+    :raises HTTPException: Если событие не найдено, завершено или его дедлайн истёк.
+    """
+    event = await get_event(event_id)
+    ensure_event_open(event)
+    return event
+
+
+async def refresh_events() -> List[Dict[str, Any]]:
+    """
+    Загружает список активных событий из line-provider и наполняет им кэш.
+
+    :return: Список активных событий в том виде, в котором их вернул line-provider.
+    :raises LineProviderError: Если запрос к line-provider не удался.
+    """
+    events = await line_provider_client.get_events()
+    event_cache.put_many(Event.model_validate(item) for item in events)
+    return events
+
+
+async def get_open_events(event_ids: Iterable[str]) -> Tuple[Dict[str, Event], Dict[str, str]]:
+    """
+    Проверяет набор событий для пакетного приёма ставок.
+
+    События, которых нет в кэше, загружаются одним запросом списка активных
+    событий из line-provider.
+
+    :param event_ids: Идентификаторы событий.
+    :return: Словарь открытых для ставок событий и словарь причин отказа
+        для остальных идентификаторов.
+    """
+    events: Dict[str, Event] = {}
+    errors: Dict[str, str] = {}
+
+    missing = []
+    for event_id in set(event_ids):
+        event = event_cache.get(event_id)
+        if event is None:
+            missing.append(event_id)
+        else:
+            events[event_id] = event
+
+    if missing:
+        try:
+            await refresh_events()
+        except LineProviderUnavailable as e:
+            errors.update((event_id, f"Сервис line-provider недоступен: {str(e)}") for event_id in missing)
+        except LineProviderError as e:
+            errors.update((event_id, f"Ошибка запроса к line-provider: {str(e)}") for event_id in missing)
+        else:
+            for event_id in missing:
+                event = event_cache.peek(event_id)
+                if event is None:
+                    errors[event_id] = "Событие не найдено или уже завершено"
+                else:
+                    events[event_id] = event
+
+    for event_id, event in list(events.items()):
+        try:
+            ensure_event_open(event)
+        except HTTPException as e:
+            errors[event_id] = e.detail
+            del events[event_id]
+
+    return events, errors
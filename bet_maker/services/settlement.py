@@ -0,0 +1,342 @@
+import asyncio
+import logging
+from typing import List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+
+from config import settings
+from metrics import SETTLED_BETS, SETTLEMENT_DURATION
+from models import BetStatus, EventState, Settlement, SettlementState
+from provider.database import database
+from provider.event_cache import event_cache
+from services.event_stats import CLOSE_EVENT_STATS_CTE, SETTLE_EVENT_STATS_CTE
+
+logger = logging.getLogger(__name__)
+
+EVENT_STATUS_TO_BET_STATUS = {
+    "finished_win": BetStatus.WON,
+    "finished_lose": BetStatus.LOST,
+}
+
+SETTLEMENT_COLUMNS = (
+    "event_id, event_status, bet_status, state, settled_bets, total_stake, total_payout, "
+    "created_at, updated_at, completed_at"
+)
+
+# Результат события сохраняется в одном запросе с отметкой в его агрегатах, после которой
+# ставки на событие больше не вставляются (см. services.event_stats).
+RECORD_SETTLEMENT_QUERY = f"""
+WITH recorded AS (
+    INSERT INTO settlements (event_id, event_status, bet_status)
+    VALUES ($1, $2, $3)
+    ON CONFLICT (event_id) DO NOTHING
+    RETURNING {SETTLEMENT_COLUMNS}
+), {CLOSE_EVENT_STATS_CTE}
+SELECT {SETTLEMENT_COLUMNS} FROM recorded;
+"""
+
+RECORD_SETTLEMENTS_QUERY = f"""
+WITH recorded AS (
+    INSERT INTO settlements (event_id, event_status, bet_status)
+    SELECT * FROM unnest($1::varchar[], $2::varchar[], $3::varchar[])
+    ON CONFLICT (event_id) DO NOTHING
+    RETURNING event_id
+), {CLOSE_EVENT_STATS_CTE}
+SELECT count(*) FROM recorded;
+"""
+
+GET_SETTLEMENT_QUERY = f"SELECT {SETTLEMENT_COLUMNS} FROM settlements WHERE event_id = $1;"
+
+GET_SETTLEMENTS_QUERY = f"SELECT {SETTLEMENT_COLUMNS} FROM settlements WHERE event_id = ANY($1::varchar[]);"
+
+UNFINISHED_SETTLEMENTS_QUERY = """
+SELECT event_id FROM settlements WHERE state <> 'completed' ORDER BY created_at;
+"""
+
+SETTLE_CHUNK_QUERY = f"""
+WITH chunk AS (
+    SELECT bet_id, created_at FROM bets
+    WHERE event_id = $1 AND status = 'pending'
+    LIMIT $2
+    FOR UPDATE SKIP LOCKED
+), settled AS (
+    UPDATE bets
+    SET status = $3,
+        payout = CASE WHEN $4 THEN ROUND(bets.amount * bets.coefficient, 2) ELSE 0 END
+    FROM chunk
+    WHERE bets.bet_id = chunk.bet_id AND bets.created_at IS NOT DISTINCT FROM chunk.created_at
+    RETURNING bets.amount, bets.coefficient, bets.payout
+), {SETTLE_EVENT_STATS_CTE}, progress AS (
+    UPDATE settlements
+    SET settled_bets = settlements.settled_bets + totals.settled,
+        total_stake = settlements.total_stake + totals.stake,
+        total_payout = settlements.total_payout + totals.payout,
+        state = CASE WHEN settlements.state = 'completed' THEN settlements.state ELSE 'in_progress' END,
+        updated_at = CURRENT_TIMESTAMP
+    FROM (
+        SELECT count(*) AS settled, COALESCE(SUM(amount), 0) AS stake, COALESCE(SUM(payout), 0) AS payout
+        FROM settled
+    ) AS totals
+    WHERE settlements.event_id = $1 AND totals.settled > 0
+)
+SELECT count(*) AS settled FROM settled;
+"""
+
+COMPLETE_SETTLEMENT_QUERY = f"""
+UPDATE settlements
+SET state = 'completed', completed_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+WHERE event_id = $1 AND state <> 'completed'
+RETURNING {SETTLEMENT_COLUMNS};
+"""
+
+
+def _to_settlement(row) -> Settlement:
+    """
+    Преобразует строку таблицы settlements в модель Settlement.
+    """
+    return Settlement(**{key: row[key] for key in SETTLEMENT_COLUMNS.split(", ")})
+
+
+async def get_settlement(event_id: str) -> Optional[Settlement]:
+    """
+    Возвращает ход расчёта ставок по событию.
+
+    :param event_id: Уникальный идентификатор события.
+    :return: Объект Settlement или None, если результат события не поступал.
+    """
+    row = await database.fetchrow(GET_SETTLEMENT_QUERY, event_id, name="get_settlement")
+    return _to_settlement(row) if row else None
+
+
+async def settle_chunk(event_id: str, bet_status: str) -> int:
+    """
+    Рассчитывает одну порцию ожидающих ставок события в отдельной транзакции.
+
+    Выигрыш выигравших ставок вычисляется по зафиксированному в ставке коэффициенту
+    с точностью до копеек. В той же транзакции рассчитанные ставки переносятся
+    в агрегатах события из ожидающих в выигравшие или проигравшие, а выплаты
+    добавляются к итогам события. Строки, заблокированные параллельным расчётом,
+    пропускаются, поэтому порцию можно безопасно рассчитывать из нескольких
+    процессов одновременно.
+
+    :param event_id: Уникальный идентификатор события.
+    :param bet_status: Статус, присваиваемый ставкам.
+    :return: Количество рассчитанных ставок.
+    """
+    row = await database.fetchrow(
+        SETTLE_CHUNK_QUERY,
+        event_id,
+        settings.SETTLEMENT_CHUNK_SIZE,
+        bet_status,
+        bet_status == BetStatus.WON.value,
+        name="settle_chunk",
+    )
+    settled = row["settled"]
+    if settled:
+        SETTLED_BETS.labels(bet_status).inc(settled)
+    return settled
+
+
+class SettlementEngine:
+    """
+    Движок расчёта ставок по завершённым событиям.
+
+    Результат события сразу сохраняется в таблицу settlements и отмечается в кэше событий,
+    после чего новые ставки на событие не принимаются. Ожидающие ставки рассчитываются
+    порциями по SETTLEMENT_CHUNK_SIZE строк, каждая в своей короткой транзакции. Первые
+    SETTLEMENT_INLINE_CHUNKS порций рассчитываются в запросе, остальные — фоновыми задачами. Повторная передача
+    того же результата безопасна и лишь досчитывает оставшиеся ставки.
+    """
+
+    def __init__(self, workers: int, inline_chunks: int, chunk_pause: float, retry_delay: float) -> None:
+        self.workers = workers
+        self.inline_chunks = inline_chunks
+        self.chunk_pause = chunk_pause
+        self.retry_delay = retry_delay
+        self._queue: Optional["asyncio.Queue[str]"] = None
+        self._queued: Set[str] = set()
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """
+        Запускает фоновые задачи расчёта и возобновляет незавершённые расчёты.
+        """
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+        for row in await database.fetch(UNFINISHED_SETTLEMENTS_QUERY, name="unfinished_settlements"):
+            self._enqueue(row["event_id"])
+
+    async def stop(self) -> None:
+        """
+        Останавливает фоновые задачи расчёта.
+
+        Незавершённые расчёты продолжатся при следующем запуске.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queued.clear()
+
+    def _enqueue(self, event_id: str) -> None:
+        """
+        Ставит событие в очередь фонового расчёта, если его там ещё нет.
+        """
+        if self._queue is not None and event_id not in self._queued:
+            self._queued.add(event_id)
+            self._queue.put_nowait(event_id)
+
+    async def submit(self, event_id: str, event_status: str) -> Settlement:
+        """
+        Сохраняет результат события и запускает расчёт его ставок.
+
+        :param event_id: Уникальный идентификатор события.
+        :param event_status: Итоговый статус события.
+        :return: Текущий ход расчёта.
+        :raises HTTPException: Если статус события недействителен или событие
+            уже рассчитано с другим результатом.
+        """
+        bet_status = EVENT_STATUS_TO_BET_STATUS.get(event_status)
+        if bet_status is None:
+            raise HTTPException(status_code=400, detail="Invalid event status")
+
+        row = await database.fetchrow(
+            RECORD_SETTLEMENT_QUERY, event_id, event_status, bet_status.value, name="record_settlement"
+        )
+        settlement = _to_settlement(row) if row else await get_settlement(event_id)
+        event_cache.finish(event_id, EventState(settlement.event_status))
+        if settlement.bet_status != bet_status:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Event '{event_id}' is already settled as {settlement.event_status}"
+            )
+        return await self._settle_inline(settlement)
+
+    async def submit_many(self, results: List[Tuple[str, str]]) -> List[Tuple[Settlement, bool]]:
+        """
+        Сохраняет результаты пакета событий и запускает расчёт их ставок.
+
+        Результаты сохраняются одним запросом. Затем ставки событий рассчитываются
+        так же, как в submit, но одновременно для SETTLEMENT_BATCH_CONCURRENCY событий.
+        Событие, уже рассчитанное с другим результатом, не отклоняет весь пакет:
+        для него возвращается имеющийся расчёт с признаком конфликта.
+
+        :param results: Идентификаторы событий и их итоговые статусы.
+        :return: Ход расчёта и признак совпадения с сохранённым результатом для каждого
+            события в порядке запроса.
+        :raises HTTPException: Если статус хотя бы одного события недействителен.
+        """
+        invalid = sorted({event_id for event_id, event_status in results
+                          if event_status not in EVENT_STATUS_TO_BET_STATUS})
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Invalid event status for events: {', '.join(invalid)}")
+        if not results:
+            return []
+
+        await database.execute(
+            RECORD_SETTLEMENTS_QUERY,
+            [event_id for event_id, _ in results],
+            [event_status for _, event_status in results],
+            [EVENT_STATUS_TO_BET_STATUS[event_status].value for _, event_status in results],
+            name="record_settlements",
+        )
+        rows = await database.fetch(
+            GET_SETTLEMENTS_QUERY, list({event_id for event_id, _ in results}), name="get_settlements"
+        )
+        settlements = {row["event_id"]: _to_settlement(row) for row in rows}
+        for settlement in settlements.values():
+            event_cache.finish(settlement.event_id, EventState(settlement.event_status))
+
+        matched = {
+            event_id for event_id, event_status in results
+            if settlements[event_id].bet_status == EVENT_STATUS_TO_BET_STATUS[event_status]
+        }
+        semaphore = asyncio.Semaphore(settings.SETTLEMENT_BATCH_CONCURRENCY)
+
+        async def settle(event_id: str) -> None:
+            async with semaphore:
+                settlements[event_id] = await self._settle_inline(settlements[event_id])
+
+        await asyncio.gather(*(settle(event_id) for event_id in matched))
+        return [
+            (settlements[event_id], settlements[event_id].bet_status == EVENT_STATUS_TO_BET_STATUS[event_status])
+            for event_id, event_status in results
+        ]
+
+    async def _settle_inline(self, settlement: Settlement) -> Settlement:
+        """
+        Рассчитывает в рамках запроса первые SETTLEMENT_INLINE_CHUNKS порций ставок
+        события, а оставшиеся ставки передаёт фоновому расчёту.
+
+        Если расчёт уже завершён и новых ставок не нашлось (например, при повторной
+        передаче результата), возвращается сохранённый расчёт без изменений.
+        """
+        event_id = settlement.event_id
+        total = 0
+        for _ in range(self.inline_chunks):
+            settled = await settle_chunk(event_id, settlement.bet_status.value)
+            total += settled
+            if settled < settings.SETTLEMENT_CHUNK_SIZE:
+                if total == 0 and settlement.state == SettlementState.COMPLETED:
+                    return settlement
+                return await self._complete(event_id)
+
+        self._enqueue(event_id)
+        return await get_settlement(event_id)
+
+    async def _complete(self, event_id: str) -> Settlement:
+        """
+        Отмечает расчёт события завершённым и записывает в метрики его длительность.
+
+        Время завершения уже завершённого расчёта (например, при повторной передаче
+        результата) не меняется.
+        """
+        row = await database.fetchrow(COMPLETE_SETTLEMENT_QUERY, event_id, name="complete_settlement")
+        if row is None:
+            return await get_settlement(event_id)
+        settlement = _to_settlement(row)
+        SETTLEMENT_DURATION.observe((settlement.completed_at - settlement.created_at).total_seconds())
+        return settlement
+
+    async def _settle(self, event_id: str) -> None:
+        """
+        Рассчитывает порциями все ожидающие ставки события.
+        """
+        settlement = await get_settlement(event_id)
+        if settlement is None:
+            return
+        total = 0
+        while True:
+            settled = await settle_chunk(event_id, settlement.bet_status.value)
+            total += settled
+            if settled < settings.SETTLEMENT_CHUNK_SIZE:
+                break
+            await asyncio.sleep(self.chunk_pause)
+        if total or settlement.state != SettlementState.COMPLETED:
+            await self._complete(event_id)
+
+    async def _run(self) -> None:
+        """
+        Обрабатывает очередь событий, ожидающих расчёта.
+        """
+        while True:
+            event_id = await self._queue.get()
+            self._queued.discard(event_id)
+            try:
+                await self._settle(event_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Settlement of event '%s' failed, retrying", event_id)
+                await asyncio.sleep(self.retry_delay)
+                self._enqueue(event_id)
+
+
+settlement_engine = SettlementEngine(
+    workers=settings.SETTLEMENT_WORKERS,
+    inline_chunks=settings.SETTLEMENT_INLINE_CHUNKS,
+    chunk_pause=settings.SETTLEMENT_CHUNK_PAUSE,
+    retry_delay=settings.SETTLEMENT_RETRY_DELAY,
+)
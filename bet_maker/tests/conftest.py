@@ -0,0 +1,10 @@
+import os
+
+# Модульные тесты не подключаются к базе данных, но настройки bet-maker требуют
+# параметры подключения. Заглушки подставляются до импорта config и не заменяют
+# значения, уже заданные в окружении.
+os.environ.setdefault("POSTGRES_USER", "test")
+os.environ.setdefault("POSTGRES_PASSWORD", "test")
+os.environ.setdefault("POSTGRES_HOST", "localhost")
+os.environ.setdefault("POSTGRES_PORT", "5432")
+os.environ.setdefault("POSTGRES_DB", "test")
@@ -0,0 +1,37 @@
+from decimal import Decimal
+
+from services.admission import StakeLimiter
+
+
+def test_stake_limiter_rejects_over_limit() -> None:
+    """
+    Проверяет, что ставка, не умещающаяся в лимит события, отклоняется, а другие события не затрагиваются.
+    """
+    limiter = StakeLimiter(max_stake=Decimal("100"), max_size=10)
+    assert limiter.reserve("1", Decimal("60"))
+    assert not limiter.reserve("1", Decimal("50"))
+    assert limiter.reserve("1", Decimal("40"))
+    assert limiter.reserve("2", Decimal("100"))
+
+
+def test_stake_limiter_release_returns_stake() -> None:
+    """
+    Проверяет, что сумма несохранённой ставки возвращается в лимит события.
+    """
+    limiter = StakeLimiter(max_stake=Decimal("100"), max_size=10)
+    assert limiter.reserve("1", Decimal("80"))
+    limiter.release("1", Decimal("80"))
+    assert limiter.reserve("1", Decimal("100"))
+
+
+def test_stake_limiter_disabled_and_evicted() -> None:
+    """
+    Проверяет, что нулевой лимит отключает ограничение, а счётчики вытесняются по LRU.
+    """
+    assert StakeLimiter(max_stake=Decimal(0), max_size=1).reserve("1", Decimal("1000000"))
+
+    limiter = StakeLimiter(max_stake=Decimal("100"), max_size=1)
+    assert limiter.reserve("1", Decimal("100"))
+    assert limiter.reserve("2", Decimal("100"))
+    assert len(limiter) == 1
+    assert limiter.reserve("1", Decimal("100"))
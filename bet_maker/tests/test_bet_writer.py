@@ -0,0 +1,196 @@
+import asyncio
+from decimal import Decimal
+from typing import List, Optional, Sequence, Union
+
+import pytest
+from fastapi import HTTPException
+
+import services.bet_writer
+from models import CreateBetRequest
+from services.bet_writer import BetWriteQueue
+from services.bets import STAKE_LIMIT_EXCEEDED
+
+
+class FakeInsert:
+    """
+    Замена insert_bets: запоминает пакеты и выдаёт последовательные идентификаторы.
+
+    Пока не установлен gate, запись пакета не завершается.
+    """
+
+    def __init__(self) -> None:
+        self.batches: List[List[str]] = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.started = asyncio.Event()
+        self.rejected_amount: Optional[Decimal] = None
+        self.error: Optional[Exception] = None
+        self._next_id = 0
+
+    async def __call__(self, bets: Sequence[CreateBetRequest],
+                       coefficients: Sequence[Decimal]) -> List[Union[int, HTTPException]]:
+        self.batches.append([bet.event_id for bet in bets])
+        self.started.set()
+        await self.gate.wait()
+        if self.error is not None:
+            raise self.error
+        bet_ids: List[Union[int, HTTPException]] = []
+        for bet in bets:
+            if bet.amount == self.rejected_amount:
+                bet_ids.append(HTTPException(status_code=429, detail=STAKE_LIMIT_EXCEEDED))
+                continue
+            self._next_id += 1
+            bet_ids.append(self._next_id)
+        return bet_ids
+
+
+@pytest.fixture
+def fake_insert(monkeypatch: pytest.MonkeyPatch) -> FakeInsert:
+    """
+    Подменяет запись ставок в базу в очереди отложенной записи.
+    """
+    fake = FakeInsert()
+    monkeypatch.setattr(services.bet_writer, "insert_bets", fake)
+    return fake
+
+
+def make_bet(event_id: str, amount: str = "10.00") -> CreateBetRequest:
+    """
+    Создаёт провалидированную ставку.
+
+    :param event_id: Идентификатор события.
+    :param amount: Сумма ставки.
+    """
+    return CreateBetRequest(event_id=event_id, amount=Decimal(amount))
+
+
+@pytest.mark.asyncio
+async def test_bets_written_in_batches(fake_insert: FakeInsert) -> None:
+    """
+    Проверяет, что ставки записываются пакетами не больше batch_size.
+    """
+    queue = BetWriteQueue(batch_size=2, batch_window=0.05, max_size=10, enqueue_timeout=1)
+    await queue.start()
+    try:
+        bet_ids = await asyncio.gather(*(queue.submit(make_bet(str(i)), Decimal("1.5")) for i in range(3)))
+    finally:
+        await queue.stop()
+
+    assert sorted(bet_ids) == [1, 2, 3]
+    assert fake_insert.batches == [["0", "1"], ["2"]]
+
+
+@pytest.mark.asyncio
+async def test_stop_flushes_queued_bets(fake_insert: FakeInsert) -> None:
+    """
+    Проверяет, что остановка записывает все ставки, уже поставленные в очередь.
+    """
+    queue = BetWriteQueue(batch_size=100, batch_window=10, max_size=10, enqueue_timeout=1)
+    await queue.start()
+    submits = [asyncio.create_task(queue.submit(make_bet(str(i)), Decimal("1.5"))) for i in range(5)]
+    await asyncio.sleep(0)
+
+    await asyncio.wait_for(queue.stop(), 1)
+
+    assert sorted(await asyncio.gather(*submits)) == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.asyncio
+async def test_submit_refused_after_stop(fake_insert: FakeInsert) -> None:
+    """
+    Проверяет, что после начала остановки новые ставки получают отказ 503.
+    """
+    queue = BetWriteQueue(batch_size=10, batch_window=0.01, max_size=10, enqueue_timeout=1)
+    await queue.start()
+    fake_insert.gate.clear()
+    first = asyncio.create_task(queue.submit(make_bet("1"), Decimal("1.5")))
+    await fake_insert.started.wait()
+
+    stopping = asyncio.create_task(queue.stop())
+    await asyncio.sleep(0)
+    with pytest.raises(HTTPException) as error:
+        await queue.submit(make_bet("2"), Decimal("1.5"))
+    assert error.value.status_code == 503
+
+    fake_insert.gate.set()
+    await asyncio.wait_for(stopping, 1)
+    assert await first == 1
+
+
+@pytest.mark.asyncio
+async def test_stop_releases_submits_waiting_for_space(fake_insert: FakeInsert) -> None:
+    """
+    Проверяет, что ставка, ждавшая места в переполненной очереди во время остановки,
+    получает отказ, а не зависает.
+    """
+    queue = BetWriteQueue(batch_size=1, batch_window=0.01, max_size=1, enqueue_timeout=5)
+    await queue.start()
+    fake_insert.gate.clear()
+    first = asyncio.create_task(queue.submit(make_bet("1"), Decimal("1.5")))
+    await fake_insert.started.wait()
+    queued = asyncio.create_task(queue.submit(make_bet("2"), Decimal("1.5")))
+    await asyncio.sleep(0)
+    waiting = asyncio.create_task(queue.submit(make_bet("3"), Decimal("1.5")))
+    await asyncio.sleep(0)
+
+    stopping = asyncio.create_task(queue.stop())
+    await asyncio.sleep(0)
+    fake_insert.gate.set()
+    await asyncio.wait_for(stopping, 1)
+
+    assert await asyncio.wait_for(first, 1) == 1
+    assert await asyncio.wait_for(queued, 1) == 2
+    with pytest.raises(HTTPException) as error:
+        await asyncio.wait_for(waiting, 1)
+    assert error.value.status_code == 503
+    assert fake_insert.batches == [["1"], ["2"]]
+
+
+@pytest.mark.asyncio
+async def test_full_queue_times_out(fake_insert: FakeInsert) -> None:
+    """
+    Проверяет, что ставка получает 503, если место в очереди не освободилось за enqueue_timeout.
+    """
+    queue = BetWriteQueue(batch_size=1, batch_window=0.01, max_size=1, enqueue_timeout=0.05)
+    await queue.start()
+    fake_insert.gate.clear()
+    first = asyncio.create_task(queue.submit(make_bet("1"), Decimal("1.5")))
+    await fake_insert.started.wait()
+    queued = asyncio.create_task(queue.submit(make_bet("2"), Decimal("1.5")))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as error:
+        await queue.submit(make_bet("3"), Decimal("1.5"))
+    assert error.value.status_code == 503
+
+    fake_insert.gate.set()
+    await queue.stop()
+    assert [await first, await queued] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_stake_limit_and_write_errors(fake_insert: FakeInsert) -> None:
+    """
+    Проверяет, что ставка сверх лимита получает 429, а ошибка записи передаётся всем ставкам пакета.
+    """
+    queue = BetWriteQueue(batch_size=10, batch_window=0.01, max_size=10, enqueue_timeout=1)
+    await queue.start()
+    try:
+        fake_insert.rejected_amount = Decimal("500.00")
+        accepted, rejected = await asyncio.gather(
+            queue.submit(make_bet("1"), Decimal("1.5")),
+            queue.submit(make_bet("2", "500.00"), Decimal("1.5")),
+            return_exceptions=True,
+        )
+        assert accepted == 1
+        assert isinstance(rejected, HTTPException) and rejected.status_code == 429
+
+        fake_insert.error = RuntimeError("database is down")
+        results = await asyncio.gather(
+            queue.submit(make_bet("3"), Decimal("1.5")),
+            queue.submit(make_bet("4"), Decimal("1.5")),
+            return_exceptions=True,
+        )
+        assert all(isinstance(result, RuntimeError) for result in results)
+    finally:
+        await queue.stop()
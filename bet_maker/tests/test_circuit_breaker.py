@@ -0,0 +1,194 @@
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from provider.line_provider import CircuitBreaker, LineProviderClient, LineProviderUnavailable
+
+
+def open_breaker(breaker: CircuitBreaker) -> None:
+    """
+    Размыкает цепь, регистрируя подряд нужное число ошибок.
+
+    :param breaker: Circuit breaker.
+    """
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+
+def expire_open_state(breaker: CircuitBreaker) -> None:
+    """
+    Сдвигает момент размыкания цепи так, чтобы истёк reset_timeout.
+
+    :param breaker: Circuit breaker.
+    """
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout
+
+
+def test_breaker_opens_after_threshold() -> None:
+    """
+    Проверяет, что цепь размыкается только после failure_threshold ошибок подряд.
+    """
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_success_resets_failures() -> None:
+    """
+    Проверяет, что успешный вызов сбрасывает счётчик ошибок.
+    """
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_half_open_allows_single_trial() -> None:
+    """
+    Проверяет, что после reset_timeout пропускается ровно один пробный вызов.
+    """
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    open_breaker(breaker)
+    expire_open_state(breaker)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_breaker_trial_success_closes() -> None:
+    """
+    Проверяет, что успешный пробный вызов замыкает цепь.
+    """
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    open_breaker(breaker)
+    expire_open_state(breaker)
+    assert breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+    assert breaker.allow()
+
+
+def test_breaker_trial_failure_reopens() -> None:
+    """
+    Проверяет, что неудачный пробный вызов снова размыкает цепь на reset_timeout.
+    """
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    open_breaker(breaker)
+    expire_open_state(breaker)
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_release_frees_trial() -> None:
+    """
+    Проверяет, что освобождённый слот пробного вызова можно занять снова.
+    """
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    open_breaker(breaker)
+    expire_open_state(breaker)
+    assert breaker.allow()
+
+    breaker.release()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+
+async def start_client(handler, breaker: CircuitBreaker):
+    """
+    Запускает тестовый line-provider с одним обработчиком GET /events/{event_id}
+    и клиент к нему без повторов.
+
+    :param handler: Обработчик запроса.
+    :param breaker: Circuit breaker клиента.
+    :return: Тестовый сервер и запущенный клиент.
+    """
+    app = web.Application()
+    app.router.add_get("/events/{event_id}", handler)
+    server = TestServer(app)
+    await server.start_server()
+    client = LineProviderClient(
+        base_url=str(server.make_url("")),
+        pool_size=1,
+        keepalive_timeout=1,
+        connect_timeout=1,
+        timeout=5,
+        retries=0,
+        retry_backoff=0,
+        breaker=breaker,
+    )
+    await client.start()
+    return server, client
+
+
+@pytest.mark.asyncio
+async def test_trial_released_on_unexpected_error() -> None:
+    """
+    Проверяет, что пробный вызов, упавший с ошибкой разбора ответа,
+    не оставляет цепь разомкнутой навсегда.
+    """
+    async def handler(request: web.Request) -> web.Response:
+        return web.Response(text="not json", content_type="application/json")
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    server, client = await start_client(handler, breaker)
+    try:
+        open_breaker(breaker)
+        expire_open_state(breaker)
+
+        with pytest.raises(ValueError):
+            await client.get_event("1")
+
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow()
+    finally:
+        await client.close()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_trial_released_on_cancel() -> None:
+    """
+    Проверяет, что отменённый пробный вызов освобождает слот пробного вызова.
+    """
+    requested = asyncio.Event()
+
+    async def handler(request: web.Request) -> web.Response:
+        requested.set()
+        await asyncio.sleep(10)
+        return web.json_response({})
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    server, client = await start_client(handler, breaker)
+    try:
+        open_breaker(breaker)
+        expire_open_state(breaker)
+
+        task = asyncio.create_task(client.get_event("1"))
+        await requested.wait()
+        with pytest.raises(LineProviderUnavailable):
+            await client.get_event("1")
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow()
+    finally:
+        await client.close()
+        await server.close()
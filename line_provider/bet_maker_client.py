@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import time
+from typing import Any, Coroutine, List, Optional, Set, Tuple, Union
+
+import aiohttp
+
+from config import settings
+from metrics import BET_MAKER_REQUEST_DURATION
+from models import Event
+
+logger = logging.getLogger(__name__)
+
+
+def _error_status(error: BaseException) -> str:
+    """
+    Возвращает значение метки status для запроса, не получившего ответа.
+    """
+    return "timeout" if isinstance(error, asyncio.TimeoutError) else "connection"
+
+
+class BetMakerClient:
+    """
+    Клиент сервиса bet-maker с общим пулом соединений.
+
+    Используется для отправки изменений событий в локальный кэш bet-maker
+    и уведомлений о результатах событий. Изменения событий отправляются в фоне
+    и не задерживают ответ line-provider: потерянное уведомление компенсируется
+    TTL кэша на стороне bet-maker. Доставку результатов событий гарантирует
+    очередь SettlementOutbox.
+    """
+
+    def __init__(self, base_url: str, pool_size: int, push_timeout: float, settlement_timeout: float) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.push_timeout = aiohttp.ClientTimeout(total=push_timeout)
+        self.settlement_timeout = aiohttp.ClientTimeout(total=settlement_timeout)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        """
+        Создаёт HTTP-сессию с пулом соединений.
+        """
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                base_url=self.base_url,
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+            )
+
+    async def close(self) -> None:
+        """
+        Дожидается отправки начатых уведомлений и закрывает HTTP-сессию.
+        """
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _push(self, operation: str, path: str, payload: Any, subject: str) -> None:
+        """
+        Отправляет состояние событий в bet-maker.
+
+        :param operation: Название операции для метрик.
+        :param path: Путь эндпоинта bet-maker.
+        :param payload: Сериализованное событие или список событий.
+        :param subject: Описание отправляемых событий для журнала.
+        """
+        started = time.perf_counter()
+        try:
+            async with self._session.post(path, json=payload, timeout=self.push_timeout) as response:
+                BET_MAKER_REQUEST_DURATION.labels(operation, str(response.status)).observe(
+                    time.perf_counter() - started
+                )
+                if response.status >= 400:
+                    logger.warning("Event push for %s rejected: %s", subject, response.status)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            BET_MAKER_REQUEST_DURATION.labels(operation, _error_status(e)).observe(time.perf_counter() - started)
+            logger.warning("Event push for %s failed: %r", subject, e)
+
+    def _schedule(self, coroutine: Coroutine[Any, Any, None]) -> None:
+        """
+        Запускает отправку в фоне и запоминает задачу до её завершения.
+        """
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def push_event(self, event: Event) -> None:
+        """
+        Ставит в очередь отправку изменения события в bet-maker.
+
+        :param event: Созданное или изменённое событие.
+        """
+        if self._session is None:
+            return
+        self._schedule(self._push("push_event", "/get_events/push", event.model_dump(mode="json"),
+                                  f"'{event.event_id}'"))
+
+    def push_events(self, events: List[Event]) -> None:
+        """
+        Ставит в очередь отправку изменений пакета событий в bet-maker одним запросом.
+
+        :param events: Созданные или изменённые события.
+        """
+        if self._session is None or not events:
+            return
+        payload = [event.model_dump(mode="json") for event in events]
+        self._schedule(self._push("push_events", "/get_events/push/batch", payload, f"{len(events)} events"))
+
+    async def notify_settlement(self, payload: Union[dict, List[dict]]) -> Tuple[int, str]:
+        """
+        Передаёт в bet-maker результат события для расчёта ставок.
+
+        :param payload: Идентификатор события и его итоговый статус или список таких результатов.
+        :return: HTTP-статус и тело ответа bet-maker.
+        :raises aiohttp.ClientError: Если запрос не удалось выполнить.
+        :raises asyncio.TimeoutError: Если bet-maker не ответил вовремя.
+        """
+        if self._session is None:
+            raise aiohttp.ClientConnectionError("Bet-maker client is not started")
+        started = time.perf_counter()
+        try:
+            async with self._session.post("/bets/update", json=payload, timeout=self.settlement_timeout) as response:
+                text = await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            BET_MAKER_REQUEST_DURATION.labels("notify_settlement", _error_status(e)).observe(
+                time.perf_counter() - started
+            )
+            raise
+        BET_MAKER_REQUEST_DURATION.labels("notify_settlement", str(response.status)).observe(
+            time.perf_counter() - started
+        )
+        return response.status, text
+
+
+bet_maker_client = BetMakerClient(
+    base_url=settings.BET_MAKER_URL,
+    pool_size=settings.BET_MAKER_POOL_SIZE,
+    push_timeout=settings.BET_MAKER_PUSH_TIMEOUT,
+    settlement_timeout=settings.BET_MAKER_SETTLEMENT_TIMEOUT,
+)
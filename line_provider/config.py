@@ -0,0 +1,58 @@
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+
+class Settings(BaseSettings):
+    """
+    Настройки приложения, включая адрес сервиса bet-maker
+    и конфигурацию хоста приложения.
+    """
+
+    APP_HOST: str = Field(default="0.0.0.0", env="APP_HOST")
+    APP_PORT: int = Field(default=8001, env="APP_PORT")
+    WEB_CONCURRENCY: int = Field(default=1, ge=0, env="WEB_CONCURRENCY")
+    SERVER_LOOP: str = Field(default="auto", env="SERVER_LOOP")
+    SERVER_HTTP: str = Field(default="auto", env="SERVER_HTTP")
+    SERVER_BACKLOG: int = Field(default=2048, gt=0, env="SERVER_BACKLOG")
+    SERVER_KEEP_ALIVE_TIMEOUT: int = Field(default=75, gt=0, env="SERVER_KEEP_ALIVE_TIMEOUT")
+    GRACEFUL_SHUTDOWN_TIMEOUT: int = Field(default=10, gt=0, env="GRACEFUL_SHUTDOWN_TIMEOUT")
+    STARTUP_BUDGET: float = Field(default=10.0, gt=0, env="STARTUP_BUDGET")
+
+    BET_MAKER_URL: str = Field(default="http://bet-maker:8000", env="BET_MAKER_URL")
+    BET_MAKER_POOL_SIZE: int = Field(default=20, gt=0, env="BET_MAKER_POOL_SIZE")
+    BET_MAKER_PUSH_TIMEOUT: float = Field(default=1.0, gt=0, env="BET_MAKER_PUSH_TIMEOUT")
+    BET_MAKER_SETTLEMENT_TIMEOUT: float = Field(default=10.0, gt=0, env="BET_MAKER_SETTLEMENT_TIMEOUT")
+
+    OUTBOX_BATCH_SIZE: int = Field(default=50, gt=0, env="OUTBOX_BATCH_SIZE")
+    OUTBOX_POLL_INTERVAL: float = Field(default=1.0, gt=0, env="OUTBOX_POLL_INTERVAL")
+    OUTBOX_RETRY_BASE_DELAY: float = Field(default=0.5, gt=0, env="OUTBOX_RETRY_BASE_DELAY")
+    OUTBOX_RETRY_MAX_DELAY: float = Field(default=60.0, gt=0, env="OUTBOX_RETRY_MAX_DELAY")
+    OUTBOX_LEASE_TIMEOUT: float = Field(default=30.0, gt=0, env="OUTBOX_LEASE_TIMEOUT")
+
+    EVENT_STORAGE_URL: str = Field(default="memory://", env="EVENT_STORAGE_URL")
+    EVENT_STORAGE_POOL_SIZE: int = Field(default=10, gt=0, env="EVENT_STORAGE_POOL_SIZE")
+    EVENT_OUTBOX_PATH: str = Field(default="outbox.sqlite3", env="EVENT_OUTBOX_PATH")
+    EVENT_STORAGE_SYNC_INTERVAL: float = Field(default=0.5, gt=0, env="EVENT_STORAGE_SYNC_INTERVAL")
+    EVENT_CHANGE_LOG_RETENTION: float = Field(default=3600.0, gt=0, env="EVENT_CHANGE_LOG_RETENTION")
+    EVENT_BATCH_MAX_SIZE: int = Field(default=1000, gt=0, env="EVENT_BATCH_MAX_SIZE")
+    EVENT_CLOSE_RETRY_INTERVAL: float = Field(default=1.0, gt=0, env="EVENT_CLOSE_RETRY_INTERVAL")
+
+    STREAM_HISTORY_SIZE: int = Field(default=10000, gt=0, env="STREAM_HISTORY_SIZE")
+    STREAM_CLIENT_BUFFER_SIZE: int = Field(default=256, gt=0, env="STREAM_CLIENT_BUFFER_SIZE")
+    STREAM_HEARTBEAT_INTERVAL: float = Field(default=15.0, gt=0, env="STREAM_HEARTBEAT_INTERVAL")
+
+    PROFILING_ENABLED: bool = Field(default=False, env="PROFILING_ENABLED")
+    PROFILING_SAMPLE_RATE: float = Field(default=0.01, ge=0, le=1, env="PROFILING_SAMPLE_RATE")
+    PROFILING_SLOW_REQUEST_MS: float = Field(default=500.0, gt=0, env="PROFILING_SLOW_REQUEST_MS")
+    PROFILING_TRACE_BUFFER_SIZE: int = Field(default=200, gt=0, env="PROFILING_TRACE_BUFFER_SIZE")
+    PROFILING_MAX_SECONDS: float = Field(default=60.0, gt=0, env="PROFILING_MAX_SECONDS")
+
+    class Config:
+        """
+        Конфигурация для загрузки переменных окружения из файла.
+        """
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+
+
+settings = Settings()
@@ -1,14 +1,73 @@
-from fastapi import FastAPI
-from routers.events import router
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from fastapi import FastAPI, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+from bet_maker_client import bet_maker_client
+from config import settings
+from metrics import STARTUP_DURATION, MetricsMiddleware, render_metrics
+from outbox import settlement_outbox
+from profiling import ProfilingMiddleware
+from responses import ORJSONResponse
+from routers.debug import router as debug_router
+from routers.events import events, router, seed_events
+from scheduler import deadline_scheduler
+from stream import event_stream
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Загрузка событий из хранилища, создание пула соединений к bet-maker,
+    запуск отправки уведомлений из очереди, потока изменений событий и закрытия
+    событий по дедлайну при запуске приложения; остановка закрытия событий по дедлайну,
+    завершение потоков подписчиков, остановка отправки
+    уведомлений, закрытие пула соединений к bet-maker и хранилища событий при остановке.
+
+    Выполняется в каждом рабочем процессе после его запуска. Длительность запуска
+    попадает в метрику app_startup_duration_seconds, а запуск дольше STARTUP_BUDGET
+    секунд записывается в журнал.
+    """
+    started = time.perf_counter()
+    await events.start(seed_events())
+    await bet_maker_client.start()
+    await settlement_outbox.start(events.backend)
+    await event_stream.start(events)
+    await deadline_scheduler.start(events)
+    elapsed = time.perf_counter() - started
+    STARTUP_DURATION.set(elapsed)
+    if elapsed > settings.STARTUP_BUDGET:
+        logger.warning("Startup took %.2f s, over the budget of %.2f s", elapsed, settings.STARTUP_BUDGET)
+
+    yield
+
+    await deadline_scheduler.stop()
+    await event_stream.stop()
+    await settlement_outbox.stop()
+    await bet_maker_client.close()
+    await events.close()
+
 
 app = FastAPI(
     title="Line Provider Service",
     description="Сервис для работы с линиями событий",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(router, prefix="/events", tags=["events"])
 
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+    app.include_router(debug_router, prefix="/debug", tags=["Debug"])
+
 
 @app.get("/", tags=["Root"])
 async def read_root() -> dict:
@@ -17,3 +76,10 @@ async def read_root() -> dict:
     """
     return {"message": "Welcome to the Line Provider Service!"}
 
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """
+    Возвращает метрики приложения в текстовом формате Prometheus.
+    """
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,116 @@
+import os
+import time
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Границы корзин гистограмм длительности: от половины миллисекунды до десяти секунд.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+BET_MAKER_REQUEST_DURATION = Histogram(
+    "bet_maker_request_duration_seconds",
+    "Latency of requests to bet-maker by operation and response status or error",
+    ["operation", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+OUTBOX_DELIVERIES = Counter(
+    "outbox_deliveries_total",
+    "Settlement notification delivery attempts by outcome",
+    ["outcome"],
+)
+
+EVENT_STORAGE_DURATION = Histogram(
+    "event_storage_duration_seconds",
+    "Latency of event storage operations",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+EVENTS_SNAPSHOT_REQUESTS = Counter(
+    "events_snapshot_requests_total",
+    "Requests for the serialized list of active events served from the snapshot or by rebuilding it",
+    ["result"],
+)
+
+STREAM_SUBSCRIBERS = Gauge(
+    "event_stream_subscribers",
+    "Connected event stream subscribers",
+    multiprocess_mode="livesum",
+)
+
+STREAM_DROPPED_SUBSCRIBERS = Counter(
+    "event_stream_dropped_subscribers_total",
+    "Event stream subscribers disconnected for reading too slowly",
+)
+
+EVENTS_CLOSED = Counter(
+    "events_closed_total",
+    "Events closed for betting when their deadline passed",
+)
+
+STARTUP_DURATION = Gauge(
+    "app_startup_duration_seconds",
+    "Time taken by application startup in the slowest worker process",
+    multiprocess_mode="max",
+)
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware, измеряющее длительность обработки HTTP-запросов.
+
+    Запрос учитывается по шаблону маршрута (например, /events/{event_id}), а не по
+    фактическому пути, чтобы число временных рядов не зависело от идентификаторов
+    в URL. Запросы, не попавшие ни в один маршрут, учитываются под маршрутом unmatched.
+    Для потоковых ответов (например, /events/stream) учитывается время до отправки
+    последней порции тела, то есть длительность подписки.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status)
+            ).observe(time.perf_counter() - started)
+
+
+def render_metrics() -> bytes:
+    """
+    Возвращает метрики в текстовом формате Prometheus.
+
+    Если задана переменная PROMETHEUS_MULTIPROC_DIR, метрики суммируются
+    по всем процессам приложения.
+
+    :return: Текст метрик.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
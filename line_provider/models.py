@@ -1,5 +1,7 @@
 from enum import Enum
 from datetime import datetime
+from typing import Dict, List
+
 from pydantic import BaseModel, Field
 
 
@@ -8,6 +10,7 @@ class EventState(Enum):
     Enum, представляющий возможные статусы события.
     """
     NEW = "new"
+    CLOSED = "closed"
     FINISHED_WIN = "finished_win"
     FINISHED_LOSE = "finished_lose"
 
@@ -26,4 +29,55 @@ class Event(BaseModel):
     )
     deadline: datetime = Field(..., description="The deadline for accepting bets on the event")
     state: EventState = Field(EventState.NEW, description="The current status of the event")
+    version: int = Field(
+        0,
+        ge=0,
+        description="The version of the event record in storage, increasing with every change; set by the service"
+    )
+
+
+class EventBatchRequest(BaseModel):
+    """
+    Модель запроса для пакетного создания событий.
+    """
+    events: List[Event] = Field(..., min_length=1, description="The events to create")
+
+
+class EventStatusUpdate(BaseModel):
+    """
+    Модель нового статуса одного события из пакета.
+    """
+    event_id: str = Field(..., description="The unique identifier of the event")
+    state: EventState = Field(..., description="The new status of the event")
+
 
+class EventStatusBatchRequest(BaseModel):
+    """
+    Модель запроса для пакетного обновления статусов событий.
+    """
+    updates: List[EventStatusUpdate] = Field(..., min_length=1, description="The status updates to apply")
+
+
+class StageTiming(BaseModel):
+    """
+    Модель длительности одного этапа обработки запроса.
+    """
+    count: int = Field(..., description="The number of calls made during the request")
+    total_ms: float = Field(..., description="The total duration of the calls in milliseconds")
+
+
+class RequestTrace(BaseModel):
+    """
+    Модель разбивки времени обработки запроса по этапам.
+    """
+    method: str = Field(..., description="The HTTP method of the request")
+    route: str = Field(..., description="The route template of the request")
+    status: int = Field(..., description="The response status code")
+    reason: str = Field(..., description="Why the request was recorded: slow or sampled")
+    started_at: datetime = Field(..., description="The time the request was received")
+    duration_ms: float = Field(..., description="The total duration of the request in milliseconds")
+    stages: Dict[str, StageTiming] = Field(..., description="The time spent in each stage by stage name")
+    other_ms: float = Field(
+        ...,
+        description="The time not attributed to any stage, such as handler code and response model validation",
+    )
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Optional
+
+import aiohttp
+
+from bet_maker_client import bet_maker_client
+from config import settings
+from metrics import OUTBOX_DELIVERIES
+from storage import EventBackend, SettlementMessage
+
+logger = logging.getLogger(__name__)
+
+
+class SettlementOutbox:
+    """
+    Надёжная очередь уведомлений bet-maker о завершении событий.
+
+    Уведомление записывается в таблицу settlement_outbox хранилища событий
+    в одной транзакции со сменой статуса события, и только потом PATCH-запрос
+    смены статуса получает ответ. Фоновая задача забирает накопившиеся
+    уведомления пакетами, отправляет их в bet-maker через общий пул соединений
+    и удаляет после подтверждения. При ошибке сети или ответе 5xx отправка
+    повторяется с экспоненциальной задержкой. Расчёт ставок в bet-maker
+    идемпотентен, поэтому повторная доставка безопасна.
+
+    Выбранные для отправки записи «арендуются» на OUTBOX_LEASE_TIMEOUT секунд,
+    поэтому несколько процессов line-provider могут разбирать одну очередь.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        poll_interval: float,
+        retry_base_delay: float,
+        retry_max_delay: float,
+        lease_timeout: float,
+    ) -> None:
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.lease_timeout = lease_timeout
+        self._backend: Optional[EventBackend] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    async def start(self, backend: EventBackend) -> None:
+        """
+        Запускает фоновую отправку уведомлений из очереди хранилища событий.
+
+        :param backend: Подключённое хранилище событий.
+        """
+        if self._dispatcher is not None:
+            return
+        self._backend = backend
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Останавливает фоновую отправку.
+
+        Неотправленные уведомления будут отправлены после следующего запуска.
+        """
+        if self._dispatcher is None:
+            return
+        self._dispatcher.cancel()
+        try:
+            await self._dispatcher
+        except asyncio.CancelledError:
+            pass
+        self._dispatcher = None
+
+    def wake(self) -> None:
+        """
+        Будит фоновую отправку после записи нового уведомления в очередь.
+        """
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _retry_delay(self, attempts: int) -> float:
+        """
+        Возвращает задержку перед очередной попыткой с экспоненциальным ростом и случайным разбросом.
+        """
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** attempts)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _deliver(self, message: SettlementMessage) -> None:
+        """
+        Отправляет одно уведомление и фиксирует результат в очереди.
+        """
+        message_id, event_id, payload, attempts = message
+        try:
+            status, text = await bet_maker_client.notify_settlement(payload)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            status, text = None, repr(e)
+        error = text if status is None else f"{status}: {text}"
+
+        if status is not None and status < 300:
+            await self._backend.delete_settlement(message_id)
+            OUTBOX_DELIVERIES.labels("delivered").inc()
+            return
+
+        if status is not None and 400 <= status < 500 and status not in (408, 429):
+            logger.error("Settlement notification %s for '%s' rejected: %s", message_id, event_id, error)
+            OUTBOX_DELIVERIES.labels("rejected").inc()
+            await self._backend.fail_settlement(message_id, attempts + 1, error)
+            return
+
+        logger.warning("Settlement notification %s for '%s' failed: %s", message_id, event_id, error)
+        OUTBOX_DELIVERIES.labels("retry").inc()
+        await self._backend.retry_settlement(
+            message_id, attempts + 1, time.time() + self._retry_delay(attempts), error
+        )
+
+    async def _next_due_in(self) -> float:
+        """
+        Возвращает время в секундах до ближайшей запланированной попытки.
+        """
+        due = await self._backend.next_settlement_due()
+        if due is None:
+            return self.poll_interval
+        return min(self.poll_interval, max(0.0, due - time.time()))
+
+    async def _run(self) -> None:
+        """
+        Отправляет накопившиеся уведомления пакетами, пока задача не будет остановлена.
+        """
+        while True:
+            self._wakeup.clear()
+            try:
+                now = time.time()
+                messages = await self._backend.claim_settlements(now, now + self.lease_timeout, self.batch_size)
+                if messages:
+                    await asyncio.gather(*(self._deliver(message) for message in messages))
+                    continue
+                timeout = await self._next_due_in()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Settlement outbox dispatch failed")
+                timeout = self.poll_interval
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+settlement_outbox = SettlementOutbox(
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    poll_interval=settings.OUTBOX_POLL_INTERVAL,
+    retry_base_delay=settings.OUTBOX_RETRY_BASE_DELAY,
+    retry_max_delay=settings.OUTBOX_RETRY_MAX_DELAY,
+    lease_timeout=settings.OUTBOX_LEASE_TIMEOUT,
+)
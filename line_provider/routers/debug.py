@@ -0,0 +1,60 @@
+# Модуль повторяет bet_maker/routers/debug.py: у сервисов нет общего пакета,
+# поэтому изменения этого модуля вносятся в оба сервиса.
+import asyncio
+import threading
+from typing import List
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from config import settings
+from models import RequestTrace
+from profiling import stack_sampler, trace_recorder
+
+router = APIRouter()
+
+
+@router.get("/traces", response_model=List[RequestTrace], tags=["Debug"])
+async def get_traces(
+    limit: int = Query(50, gt=0, description="The maximum number of traces to return"),
+    min_duration_ms: float = Query(0.0, ge=0, description="Only return requests at least this slow"),
+) -> List[RequestTrace]:
+    """
+    Возвращает последние медленные и попавшие в выборку запросы этого процесса
+    с разбивкой времени по этапам: обращения к хранилищу событий (storage)
+    и сериализация ответа (serialization).
+
+    :param limit: Максимальное количество запросов.
+    :param min_duration_ms: Минимальная длительность запроса в миллисекундах.
+    :return: Разбивки запросов от новых к старым.
+    """
+    return trace_recorder.traces(limit, min_duration_ms)
+
+
+@router.get("/profile", response_class=PlainTextResponse, tags=["Debug"])
+async def get_cpu_profile(
+    seconds: float = Query(5.0, gt=0, description="How long to profile, in seconds"),
+    interval: float = Query(0.005, ge=0.001, le=1, description="The interval between stack samples, in seconds"),
+) -> PlainTextResponse:
+    """
+    Снимает статистический профиль CPU цикла событий этого процесса.
+
+    Пока профиль снимается, сервис продолжает обрабатывать запросы, и они попадают в профиль.
+
+    :param seconds: Длительность профилирования в секундах.
+    :param interval: Интервал между снимками стека в секундах.
+    :return: Стеки в формате collapsed stacks для flamegraph.pl или speedscope.
+    :raises HTTPException: Если длительность превышает PROFILING_MAX_SECONDS или профиль уже снимается.
+    """
+    if seconds > settings.PROFILING_MAX_SECONDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Profile duration exceeds the limit of {settings.PROFILING_MAX_SECONDS} seconds"
+        )
+    if stack_sampler.busy:
+        raise HTTPException(status_code=409, detail="A profile is already being collected")
+    try:
+        stacks = await asyncio.to_thread(stack_sampler.profile, threading.get_ident(), seconds, interval)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(stacks)
@@ -1,45 +1,84 @@
 from datetime import datetime, timedelta, timezone
-from typing import List
+from typing import List, Optional
 
-from aiohttp import ClientSession
-from fastapi import APIRouter, HTTPException, Path
+from fastapi import APIRouter, Header, HTTPException, Path, Query, Response
+from fastapi.responses import StreamingResponse
 
-from models import Event, EventState
-from utils import is_deadline_valid, get_event_or_404
+from bet_maker_client import bet_maker_client
+from models import Event, EventBatchRequest, EventState, EventStatusBatchRequest
+from config import settings
+from outbox import settlement_outbox
+from scheduler import deadline_scheduler
+from storage import create_backend
+from store import EventStore
+from stream import event_stream
+from utils import is_deadline_valid, get_event_or_404, etag_matches, validate_batch
 
 router = APIRouter()
 
-BET_MAKER_URL = "http://bet-maker:8000"
 
-events = {
-    '1': Event(event_id='1',
-               coefficient=1.2,
-               deadline=datetime.now(timezone.utc) + timedelta(minutes=10),
-               state=EventState.NEW),
+def _on_expire(expired: List[Event]) -> None:
+    """
+    Публикует события, дедлайн которых истёк, и ставит их в очередь на закрытие.
+
+    :param expired: События, покинувшие активный набор.
+    """
+    event_stream.publish_expired(expired)
+    deadline_scheduler.schedule(expired)
+
+
+events = EventStore(
+    create_backend(settings.EVENT_STORAGE_URL, settings.EVENT_STORAGE_POOL_SIZE, settings.EVENT_OUTBOX_PATH),
+    sync_interval=settings.EVENT_STORAGE_SYNC_INTERVAL,
+    change_log_retention=settings.EVENT_CHANGE_LOG_RETENTION,
+    on_change=event_stream.publish,
+    on_expire=_on_expire,
+    on_schedule=deadline_scheduler.wake,
+)
+
+
+def seed_events() -> List[Event]:
+    """
+    Возвращает начальные события, добавляемые в хранилище при первом запуске.
 
-    '2': Event(event_id='2',
-               coefficient=1.15,
-               deadline=datetime.now(timezone.utc) + timedelta(minutes=5),
-               state=EventState.NEW),
+    :return: Список событий.
+    """
+    return [
+        Event(event_id='1',
+              coefficient=1.2,
+              deadline=datetime.now(timezone.utc) + timedelta(minutes=10),
+              state=EventState.NEW),
+
+        Event(event_id='2',
+              coefficient=1.15,
+              deadline=datetime.now(timezone.utc) + timedelta(minutes=5),
+              state=EventState.NEW),
 
-    '3': Event(event_id='3',
-               coefficient=1.67,
-               deadline=datetime.now(timezone.utc) + timedelta(minutes=15),
-               state=EventState.NEW),
-}
+        Event(event_id='3',
+              coefficient=1.67,
+              deadline=datetime.now(timezone.utc) + timedelta(minutes=15),
+              state=EventState.NEW),
+    ]
 
 
 @router.get("/", response_model=List[Event])
-async def get_events() -> List[Event]:
+async def get_events(if_none_match: Optional[str] = Header(None)) -> Response:
     """
     Возвращает список всех активных событий.
 
-    Событие считается активным, если его дедлайн не истёк.
+    Событие считается активным, если его дедлайн не истёк. События с истёкшим
+    дедлайном исключаются из активного набора по индексу дедлайнов,
+    без обхода всех событий. Список отдаётся из заранее сериализованного снимка,
+    который перестраивается только при изменении активных событий. Если клиент
+    передал в If-None-Match актуальный ETag, возвращается ответ 304 без тела.
 
+    :param if_none_match: ETag списка событий, уже имеющегося у клиента.
     :return: Список активных событий.
     """
-    current_time = datetime.now(timezone.utc)
-    return [event for event in events.values() if event.deadline > current_time]
+    etag, body = events.active_snapshot()
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
 
 @router.post("/", response_model=Event, status_code=201)
@@ -52,15 +91,113 @@ async def create_event(event: Event) -> Event:
     :param event: Данные события, включая идентификатор, коэффициент, дедлайн и статус.
     :return: Созданное событие.
     """
-    if event.event_id in events:
-        raise HTTPException(status_code=400, detail="Event with this id already exists")
     if not is_deadline_valid(event.deadline):
         raise HTTPException(status_code=400, detail="Deadline must be in the future")
+    event = await events.create(event)
+    if event is None:
+        raise HTTPException(status_code=400, detail="Event with this id already exists")
 
-    events[event.event_id] = event
+    bet_maker_client.push_event(event)
     return event
 
 
+@router.post("/batch", response_model=List[Event], status_code=201)
+async def create_events_batch(batch_request: EventBatchRequest) -> List[Event]:
+    """
+    Создает пакет событий.
+
+    Дедлайны всех событий проверяются до записи, а события сохраняются в одной
+    транзакции хранилища: если хотя бы одно событие не прошло проверку или уже
+    существует, не создаётся ни одно. Кэш событий bet-maker получает все события
+    пакета одним запросом.
+
+    :param batch_request: События для создания.
+    :return: Созданные события в порядке запроса.
+    :raises HTTPException: Если пакет превышает допустимый размер, идентификаторы повторяются,
+        дедлайн события истёк или событие уже существует.
+    """
+    new_events = batch_request.events
+    validate_batch([event.event_id for event in new_events])
+
+    expired = [event.event_id for event in new_events if not is_deadline_valid(event.deadline)]
+    if expired:
+        raise HTTPException(status_code=400, detail=f"Deadline must be in the future: {', '.join(expired)}")
+
+    created = await events.create_many(new_events)
+    if created is None:
+        existing = [event.event_id for event in new_events if await events.fetch(event.event_id) is not None]
+        raise HTTPException(status_code=400, detail=f"Events with these ids already exist: {', '.join(existing)}")
+
+    bet_maker_client.push_events(created)
+    return created
+
+
+@router.patch("/status/batch", response_model=List[Event])
+async def update_events_status_batch(batch_request: EventStatusBatchRequest) -> List[Event]:
+    """
+    Обновляет статусы пакета событий.
+
+    Новые статусы сохраняются в одной транзакции хранилища: если хотя бы одно
+    событие не найдено, не изменяется ни одно. Результаты всех завершённых событий
+    пакета сохраняются в очередь хранилища одним уведомлением в той же транзакции
+    и доставляются в bet-maker одним запросом.
+
+    :param batch_request: Идентификаторы событий и их новые статусы.
+    :return: Обновлённые события в порядке запроса.
+    :raises HTTPException: Если пакет превышает допустимый размер, идентификаторы повторяются
+        или событие не найдено.
+    """
+    updates = batch_request.updates
+    validate_batch([update.event_id for update in updates])
+
+    current = [await events.fetch(update.event_id) for update in updates]
+    missing = [update.event_id for update, event in zip(updates, current) if event is None]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Events not found: {', '.join(missing)}")
+
+    results = [
+        {"event_id": update.event_id, "status": update.state.value}
+        for update in updates if update.state in {EventState.FINISHED_WIN, EventState.FINISHED_LOSE}
+    ]
+    updated = await events.update_many(
+        [event.model_copy(update={"state": update.state}) for update, event in zip(updates, current)],
+        settlement=results or None,
+    )
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Events not found")
+    bet_maker_client.push_events(updated)
+    if results:
+        settlement_outbox.wake()
+
+    return updated
+
+
+@router.get("/stream")
+async def stream_events(
+        last_event_id: Optional[int] = Query(None, description="Sequence number of the last received update"),
+        last_event_id_header: Optional[int] = Header(None, alias="Last-Event-ID"),
+) -> StreamingResponse:
+    """
+    Возвращает поток изменений событий в формате server-sent events.
+
+    Каждое изменение (created, updated, closed, settled, expired) передаётся отдельным кадром
+    с порядковым номером в поле id. Чтобы продолжить поток после переподключения,
+    клиент передаёт номер последнего полученного кадра в заголовке Last-Event-ID
+    или параметре last_event_id. Если пропущенные изменения уже недоступны,
+    первым приходит кадр reset, и список событий нужно запросить заново.
+
+    :param last_event_id: Номер последнего полученного кадра.
+    :param last_event_id_header: Номер последнего полученного кадра из заголовка Last-Event-ID.
+    :return: Поток кадров server-sent events.
+    """
+    last_seq = last_event_id_header if last_event_id_header is not None else last_event_id
+    return StreamingResponse(
+        event_stream.subscribe(last_seq),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/{event_id}", response_model=Event)
 async def get_event(event_id: str = Path(..., description="Event ID")) -> Event:
     """
@@ -69,7 +206,7 @@ async def get_event(event_id: str = Path(..., description="Event ID")) -> Event:
     :param event_id: Уникальный идентификатор события.
     :return: Событие с указанным ID.
     """
-    event = get_event_or_404(events, event_id)
+    event = await get_event_or_404(events, event_id)
     return event
 
 
@@ -78,28 +215,25 @@ async def update_event_status(event_id: str, state: EventState) -> Event:
     """
     Обновляет статус события.
 
-    Проверяет существование события, обновляет его статус и отправляет запрос
-    на обновление статусов связанных ставок.
+    Проверяет существование события, сохраняет новый статус в хранилище событий
+    и передаёт изменение в кэш событий bet-maker. Результат завершённого события сохраняется
+    в очередь уведомлений хранилища в одной транзакции с новым статусом, откуда он
+    доставляется в bet-maker в фоне с повторами, поэтому ответ не ждёт расчёта связанных ставок.
 
     :param event_id: Уникальный идентификатор события.
     :param state: Новый статус события.
     :return: Обновлённое событие.
     """
-    event = get_event_or_404(events, event_id)
-    event.state = state
-    events[event_id] = event
-
-    if state in {EventState.FINISHED_WIN, EventState.FINISHED_LOSE}:
-        async with ClientSession() as session:
-            update_payload = {
-                "event_id": event_id,
-                "status": state.value
-            }
-            async with session.post(f"{BET_MAKER_URL}/bets/update", json=update_payload) as response:
-                if response.status != 200:
-                    raise HTTPException(
-                        status_code=500,
-                        detail=f"Failed to update bets for event '{event_id}': {await response.text()}"
-                    )
+    finished = state in {EventState.FINISHED_WIN, EventState.FINISHED_LOSE}
+    event = await get_event_or_404(events, event_id)
+    event = await events.update(
+        event.model_copy(update={"state": state}),
+        settlement={"event_id": event_id, "status": state.value} if finished else None,
+    )
+    if event is None:
+        raise HTTPException(status_code=404, detail=f"Event with ID '{event_id}' not found")
+    bet_maker_client.push_event(event)
+    if finished:
+        settlement_outbox.wake()
 
     return event
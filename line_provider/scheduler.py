@@ -0,0 +1,120 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Dict, List, Optional
+
+from bet_maker_client import bet_maker_client
+from config import settings
+from metrics import EVENTS_CLOSED
+from models import Event, EventState
+from store import EventStore
+from utils import is_deadline_valid
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineScheduler:
+    """
+    Закрытие приёма ставок на события по истечении дедлайна.
+
+    Таймер спит до ближайшего дедлайна из кучи дедлайнов хранилища событий
+    и просыпается раньше, если ближайшим стал дедлайн нового или изменённого события,
+    поэтому обхода всех событий нет: каждое событие покидает активный набор за O(log N).
+    События в статусе new, покинувшие активный набор (в том числе при запросе списка
+    активных событий), переводятся в статус closed пакетами по batch_size: изменение
+    сохраняется в хранилище, публикуется в поток изменений и передаётся в кэш событий
+    bet-maker. Если записать изменение не удалось, попытка повторяется через
+    retry_interval секунд.
+
+    При запуске закрываются события, дедлайн которых истёк, пока сервис не работал.
+    """
+
+    def __init__(self, batch_size: int, retry_interval: float) -> None:
+        self.batch_size = batch_size
+        self.retry_interval = retry_interval
+        self._pending: Dict[str, Event] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, store: EventStore) -> None:
+        """
+        Запускает таймер дедлайнов.
+
+        :param store: Хранилище событий, дедлайны которых отслеживаются.
+        """
+        if self._task is not None:
+            return
+        self.schedule([event for event in store if not is_deadline_valid(event.deadline)])
+        self._task = asyncio.create_task(self._run(store))
+
+    async def stop(self) -> None:
+        """
+        Останавливает таймер дедлайнов.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self) -> None:
+        """
+        Будит таймер, чтобы он пересчитал время до ближайшего дедлайна.
+        """
+        self._wakeup.set()
+
+    def schedule(self, events: List[Event]) -> None:
+        """
+        Ставит события с истёкшим дедлайном в очередь на закрытие.
+
+        :param events: События, покинувшие активный набор.
+        """
+        for event in events:
+            if event.state == EventState.NEW and event.event_id not in self._pending:
+                self._pending[event.event_id] = event
+                self._wakeup.set()
+
+    async def _run(self, store: EventStore) -> None:
+        """
+        Исключает события с истёкшим дедлайном из активного набора, закрывает их
+        и ждёт следующего дедлайна.
+        """
+        while True:
+            self._wakeup.clear()
+            timeout = None
+            try:
+                store.expire()
+                await self._close(store)
+            except Exception:
+                logger.exception("Closing expired events failed")
+                timeout = self.retry_interval
+            deadline = store.next_deadline()
+            if deadline is not None:
+                delay = max(0.0, (deadline - datetime.now(timezone.utc)).total_seconds())
+                timeout = delay if timeout is None else min(timeout, delay)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _close(self, store: EventStore) -> None:
+        """
+        Закрывает события из очереди пакетами и передаёт закрытые события в bet-maker.
+        """
+        while self._pending:
+            batch = list(islice(self._pending.values(), self.batch_size))
+            closed = await store.close_expired(batch)
+            for event in batch:
+                self._pending.pop(event.event_id, None)
+            if closed:
+                EVENTS_CLOSED.inc(len(closed))
+                bet_maker_client.push_events(closed)
+
+
+deadline_scheduler = DeadlineScheduler(
+    batch_size=settings.EVENT_BATCH_MAX_SIZE,
+    retry_interval=settings.EVENT_CLOSE_RETRY_INTERVAL,
+)
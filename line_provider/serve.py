@@ -0,0 +1,59 @@
+import os
+import shutil
+
+import uvicorn
+
+from config import settings
+
+
+def worker_count() -> int:
+    """
+    Возвращает число рабочих процессов: WEB_CONCURRENCY или, если он равен 0,
+    число доступных процессу ядер.
+    """
+    if settings.WEB_CONCURRENCY:
+        return settings.WEB_CONCURRENCY
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def reset_metrics_dir() -> None:
+    """
+    Очищает каталог PROMETHEUS_MULTIPROC_DIR, если он задан.
+
+    Выполняется до запуска рабочих процессов: иначе счётчики продолжат значения
+    процессов прошлого запуска.
+    """
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+
+
+def main() -> None:
+    """
+    Запускает сервис в WEB_CONCURRENCY рабочих процессах.
+
+    Приложение импортируется в каждом рабочем процессе заново, поэтому пулы
+    соединений и фоновые задачи создаются в lifespan каждого процесса после
+    его запуска. При остановке процесс перестаёт принимать соединения и ждёт
+    завершения начатых запросов не дольше GRACEFUL_SHUTDOWN_TIMEOUT секунд.
+    """
+    reset_metrics_dir()
+    uvicorn.run(
+        "main:app",
+        host=settings.APP_HOST,
+        port=settings.APP_PORT,
+        workers=worker_count(),
+        loop=settings.SERVER_LOOP,
+        http=settings.SERVER_HTTP,
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEP_ALIVE_TIMEOUT,
+        timeout_graceful_shutdown=settings.GRACEFUL_SHUTDOWN_TIMEOUT,
+        lifespan="on",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,977 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import asyncpg
+
+from models import Event, EventState
+
+VersionedEvent = Tuple[Event, int]
+EventChange = Tuple[int, str, Event]
+SettlementPayload = Union[Dict[str, Any], List[Dict[str, Any]]]
+SettlementMessage = Tuple[int, str, SettlementPayload, int]
+
+EVENTS_SCHEMA_LOCK_ID = 7_240_101
+EVENTS_WRITE_LOCK_ID = 7_240_102
+
+
+def _settlement_label(payload: SettlementPayload) -> str:
+    """
+    Возвращает идентификатор события уведомления (для пакета — идентификаторы через запятую).
+    """
+    if isinstance(payload, list):
+        return ",".join(result["event_id"] for result in payload)
+    return payload["event_id"]
+
+
+def _is_expired(event: Event, now: datetime) -> bool:
+    """
+    Проверяет, истёк ли дедлайн события; дедлайн без часового пояса считается UTC.
+    """
+    deadline = event.deadline if event.deadline.tzinfo is not None else event.deadline.replace(tzinfo=timezone.utc)
+    return deadline <= now
+
+
+class EventBackend:
+    """
+    Базовый класс постоянного хранилища событий.
+
+    Каждая запись события получает версию из общей для хранилища возрастающей
+    последовательности и дублируется в журнал изменений с типом изменения.
+    По журналу процессы line-provider забирают только изменения, появившиеся
+    после последней синхронизации.
+
+    Уведомление bet-maker о результате события записывается в очередь уведомлений
+    того же хранилища в одной транзакции со сменой статуса, поэтому статус
+    не может измениться без уведомления, а уведомление — появиться без статуса.
+    Выбранные для отправки уведомления «арендуются» до указанного времени,
+    поэтому несколько процессов line-provider могут разбирать одну очередь.
+    """
+
+    shared = True
+
+    async def start(self) -> None:
+        """
+        Подключается к хранилищу и создаёт таблицы событий, если их нет.
+        """
+
+    async def close(self) -> None:
+        """
+        Закрывает подключение к хранилищу.
+        """
+
+    async def insert(self, event: Event) -> Optional[int]:
+        """
+        Добавляет новое событие и запись created в журнал изменений.
+
+        :param event: Событие.
+        :return: Версия записи или None, если событие с таким идентификатором уже есть.
+        """
+        raise NotImplementedError
+
+    async def update(self, event: Event, change: str,
+                     settlement: Optional[SettlementPayload] = None) -> Optional[int]:
+        """
+        Сохраняет изменения существующего события и запись в журнал изменений.
+
+        :param event: Событие.
+        :param change: Тип изменения для журнала.
+        :param settlement: Уведомление bet-maker, сохраняемое в очередь в той же транзакции.
+        :return: Версия записи или None, если событие не найдено.
+        """
+        raise NotImplementedError
+
+    async def insert_many(self, events: List[Event]) -> Optional[List[int]]:
+        """
+        Добавляет пакет новых событий и записи created в журнал изменений в одной транзакции.
+
+        :param events: События с различными идентификаторами.
+        :return: Версии записей в порядке событий или None, если хотя бы одно событие
+            уже есть; в этом случае не добавляется ни одно событие.
+        """
+        raise NotImplementedError
+
+    async def update_many(self, events: List[Event], changes: List[str],
+                          settlement: Optional[SettlementPayload] = None) -> Optional[List[int]]:
+        """
+        Сохраняет изменения пакета существующих событий и записи в журнал в одной транзакции.
+
+        :param events: События с различными идентификаторами.
+        :param changes: Типы изменений для журнала в порядке событий.
+        :param settlement: Уведомление bet-maker, сохраняемое в очередь в той же транзакции.
+        :return: Версии записей в порядке событий или None, если хотя бы одно событие
+            не найдено; в этом случае не изменяется ни одно событие.
+        """
+        raise NotImplementedError
+
+    async def close_expired(self, event_ids: List[str], now: datetime) -> List[VersionedEvent]:
+        """
+        Закрывает приём ставок на события с истёкшим дедлайном и добавляет записи closed
+        в журнал изменений в одной транзакции.
+
+        Условие проверяется при записи: событие, которое уже закрыто, завершено
+        или дедлайн которого ещё не наступил, не изменяется. Поэтому несколько процессов
+        могут закрывать одни и те же события, и изменение запишет только один из них.
+
+        :param event_ids: Идентификаторы событий, дедлайн которых истёк.
+        :param now: Текущее время с часовым поясом.
+        :return: Закрытые события с версиями их записей в порядке версий.
+        """
+        raise NotImplementedError
+
+    async def get(self, event_id: str) -> Optional[VersionedEvent]:
+        """
+        Возвращает событие по идентификатору.
+
+        :param event_id: Уникальный идентификатор события.
+        :return: Событие и версия его записи или None, если событие не найдено.
+        """
+        raise NotImplementedError
+
+    async def snapshot(self) -> Tuple[int, List[VersionedEvent]]:
+        """
+        Возвращает все события и последнюю версию журнала на момент чтения.
+
+        :return: Последняя версия и события с версиями их записей.
+        """
+        raise NotImplementedError
+
+    async def changes(self, since: int) -> List[EventChange]:
+        """
+        Возвращает изменения из журнала после указанной версии в порядке версий.
+
+        :param since: Последняя уже полученная версия.
+        :return: Версии, типы изменений и события после изменения.
+        """
+        raise NotImplementedError
+
+    async def prune(self, older_than: float) -> None:
+        """
+        Удаляет из журнала изменения старше указанного возраста.
+
+        :param older_than: Возраст записи журнала в секундах.
+        """
+        raise NotImplementedError
+
+    async def claim_settlements(self, now: float, lease_until: float, limit: int) -> List[SettlementMessage]:
+        """
+        Выбирает уведомления, время отправки которых наступило, и продлевает их аренду.
+
+        :param now: Текущее время в секундах с начала эпохи.
+        :param lease_until: Время, до которого выбранные уведомления не выдаются снова.
+        :param limit: Наибольшее число уведомлений.
+        :return: Идентификаторы, события, тела и число попыток уведомлений в порядке постановки.
+        """
+        raise NotImplementedError
+
+    async def delete_settlement(self, message_id: int) -> None:
+        """
+        Удаляет доставленное уведомление из очереди.
+
+        :param message_id: Идентификатор уведомления.
+        """
+        raise NotImplementedError
+
+    async def retry_settlement(self, message_id: int, attempts: int, next_attempt_at: float, error: str) -> None:
+        """
+        Откладывает отправку уведомления до следующей попытки.
+
+        :param message_id: Идентификатор уведомления.
+        :param attempts: Число сделанных попыток.
+        :param next_attempt_at: Время следующей попытки в секундах с начала эпохи.
+        :param error: Описание последней ошибки.
+        """
+        raise NotImplementedError
+
+    async def fail_settlement(self, message_id: int, attempts: int, error: str) -> None:
+        """
+        Помечает уведомление как ошибочное; оно больше не отправляется.
+
+        :param message_id: Идентификатор уведомления.
+        :param attempts: Число сделанных попыток.
+        :param error: Описание последней ошибки.
+        """
+        raise NotImplementedError
+
+    async def next_settlement_due(self) -> Optional[float]:
+        """
+        Возвращает время ближайшей запланированной отправки уведомления.
+
+        :return: Время в секундах с начала эпохи или None, если очередь пуста.
+        """
+        raise NotImplementedError
+
+
+class MemoryEventBackend(EventBackend):
+    """
+    Хранилище событий в памяти процесса.
+
+    События не переживают перезапуск и не видны другим процессам, поэтому
+    этот вариант подходит только для одного процесса line-provider. Журнал
+    изменений не ведётся: все изменения вносит этот же процесс. Очередь
+    уведомлений хранится в файле SQLite: уведомление сохраняется до смены
+    статуса в памяти, и неотправленные уведомления доставляются после перезапуска.
+    """
+
+    shared = False
+
+    def __init__(self, outbox_path: str) -> None:
+        self._rows: Dict[str, VersionedEvent] = {}
+        self._version = 0
+        self._outbox = SQLiteSettlementOutbox(outbox_path)
+
+    def _write(self, event: Event) -> int:
+        """
+        Записывает событие со следующей версией.
+        """
+        self._version += 1
+        self._rows[event.event_id] = (event.model_copy(), self._version)
+        return self._version
+
+    async def start(self) -> None:
+        await self._outbox.start()
+
+    async def close(self) -> None:
+        await self._outbox.close()
+
+    async def insert(self, event: Event) -> Optional[int]:
+        if event.event_id in self._rows:
+            return None
+        return self._write(event)
+
+    async def update(self, event: Event, change: str,
+                     settlement: Optional[SettlementPayload] = None) -> Optional[int]:
+        if event.event_id not in self._rows:
+            return None
+        if settlement is not None:
+            await self._outbox.add_settlement(settlement)
+        return self._write(event)
+
+    async def insert_many(self, events: List[Event]) -> Optional[List[int]]:
+        if any(event.event_id in self._rows for event in events):
+            return None
+        return [self._write(event) for event in events]
+
+    async def update_many(self, events: List[Event], changes: List[str],
+                          settlement: Optional[SettlementPayload] = None) -> Optional[List[int]]:
+        if any(event.event_id not in self._rows for event in events):
+            return None
+        if settlement is not None:
+            await self._outbox.add_settlement(settlement)
+        return [self._write(event) for event in events]
+
+    async def close_expired(self, event_ids: List[str], now: datetime) -> List[VersionedEvent]:
+        closed = []
+        for event_id in event_ids:
+            row = self._rows.get(event_id)
+            if row is None or row[0].state != EventState.NEW or not _is_expired(row[0], now):
+                continue
+            event = row[0].model_copy(update={"state": EventState.CLOSED})
+            closed.append((event, self._write(event)))
+        return closed
+
+    async def get(self, event_id: str) -> Optional[VersionedEvent]:
+        row = self._rows.get(event_id)
+        return (row[0].model_copy(), row[1]) if row else None
+
+    async def snapshot(self) -> Tuple[int, List[VersionedEvent]]:
+        return self._version, [(event.model_copy(), version) for event, version in self._rows.values()]
+
+    async def changes(self, since: int) -> List[EventChange]:
+        return []
+
+    async def prune(self, older_than: float) -> None:
+        pass
+
+    async def claim_settlements(self, now: float, lease_until: float, limit: int) -> List[SettlementMessage]:
+        return await self._outbox.claim_settlements(now, lease_until, limit)
+
+    async def delete_settlement(self, message_id: int) -> None:
+        await self._outbox.delete_settlement(message_id)
+
+    async def retry_settlement(self, message_id: int, attempts: int, next_attempt_at: float, error: str) -> None:
+        await self._outbox.retry_settlement(message_id, attempts, next_attempt_at, error)
+
+    async def fail_settlement(self, message_id: int, attempts: int, error: str) -> None:
+        await self._outbox.fail_settlement(message_id, attempts, error)
+
+    async def next_settlement_due(self) -> Optional[float]:
+        return await self._outbox.next_settlement_due()
+
+
+SQLITE_CREATE_TABLES = (
+    """
+    CREATE TABLE IF NOT EXISTS events (
+        event_id TEXT PRIMARY KEY,
+        coefficient REAL NOT NULL,
+        deadline TEXT NOT NULL,
+        state TEXT NOT NULL,
+        version INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS event_changes (
+        version INTEGER PRIMARY KEY,
+        change TEXT NOT NULL,
+        event_id TEXT NOT NULL,
+        coefficient REAL NOT NULL,
+        deadline TEXT NOT NULL,
+        state TEXT NOT NULL,
+        created_at REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS events_version_idx ON events (version)",
+)
+
+SQLITE_CREATE_OUTBOX = (
+    """
+    CREATE TABLE IF NOT EXISTS settlement_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        event_id TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at REAL NOT NULL,
+        created_at REAL NOT NULL,
+        failed_at REAL,
+        last_error TEXT
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS settlement_outbox_due_idx
+    ON settlement_outbox (next_attempt_at) WHERE failed_at IS NULL
+    """,
+)
+
+SQLITE_INSERT_EVENT = """
+INSERT INTO events (event_id, coefficient, deadline, state, version)
+VALUES (?, ?, ?, ?, (SELECT COALESCE(MAX(version), 0) + 1 FROM events))
+ON CONFLICT (event_id) DO NOTHING
+RETURNING version
+"""
+
+SQLITE_UPDATE_EVENT = """
+UPDATE events
+SET coefficient = ?, deadline = ?, state = ?, version = (SELECT MAX(version) + 1 FROM events)
+WHERE event_id = ?
+RETURNING version
+"""
+
+SQLITE_LOG_CHANGE = """
+INSERT INTO event_changes (version, change, event_id, coefficient, deadline, state, created_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+SQLITE_GET_EVENT = "SELECT event_id, coefficient, deadline, state, version FROM events WHERE event_id = ?"
+
+SQLITE_ALL_EVENTS = "SELECT event_id, coefficient, deadline, state, version FROM events"
+
+SQLITE_MAX_VERSION = "SELECT COALESCE(MAX(version), 0) AS version FROM events"
+
+SQLITE_EVENT_CHANGES = """
+SELECT version, change, event_id, coefficient, deadline, state FROM event_changes
+WHERE version > ? ORDER BY version
+"""
+
+SQLITE_PRUNE_CHANGES = "DELETE FROM event_changes WHERE created_at < ?"
+
+SQLITE_ADD_SETTLEMENT = """
+INSERT INTO settlement_outbox (event_id, payload, next_attempt_at, created_at) VALUES (?, ?, ?, ?)
+"""
+
+SQLITE_CLAIM_SETTLEMENTS = """
+UPDATE settlement_outbox SET next_attempt_at = :lease_until
+WHERE id IN (
+    SELECT id FROM settlement_outbox
+    WHERE failed_at IS NULL AND next_attempt_at <= :now
+    ORDER BY id
+    LIMIT :limit
+)
+RETURNING id, event_id, payload, attempts
+"""
+
+SQLITE_DELETE_SETTLEMENT = "DELETE FROM settlement_outbox WHERE id = ?"
+
+SQLITE_RETRY_SETTLEMENT = """
+UPDATE settlement_outbox SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?
+"""
+
+SQLITE_FAIL_SETTLEMENT = """
+UPDATE settlement_outbox SET attempts = ?, failed_at = ?, last_error = ? WHERE id = ?
+"""
+
+SQLITE_NEXT_SETTLEMENT_DUE = """
+SELECT MIN(next_attempt_at) AS due FROM settlement_outbox WHERE failed_at IS NULL
+"""
+
+
+def _sqlite_row_to_event(row: sqlite3.Row) -> Event:
+    """
+    Преобразует строку таблицы SQLite в событие.
+    """
+    return Event(
+        event_id=row["event_id"],
+        coefficient=row["coefficient"],
+        deadline=datetime.fromisoformat(row["deadline"]),
+        state=EventState(row["state"]),
+    )
+
+
+class SQLiteSettlementOutbox:
+    """
+    Очередь уведомлений о результатах событий в файле SQLite.
+
+    Хранилище событий в SQLite держит очередь в том же файле, а хранилище
+    в памяти — в отдельном, чтобы неотправленные уведомления переживали
+    перезапуск line-provider.
+    """
+
+    create_tables = SQLITE_CREATE_OUTBOX
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _open(self) -> None:
+        """
+        Открывает файл базы и создаёт таблицы, если их нет.
+        """
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA busy_timeout=5000")
+        for statement in self.create_tables:
+            connection.execute(statement)
+        self._connection = connection
+
+    def _execute(self, query: str, parameters: Sequence = ()) -> List[sqlite3.Row]:
+        """
+        Выполняет запрос под блокировкой соединения.
+        """
+        with self._lock:
+            return self._connection.execute(query, parameters).fetchall()
+
+    def _insert_settlement(self, payload: SettlementPayload) -> None:
+        """
+        Добавляет уведомление в очередь в текущей транзакции.
+        """
+        now = time.time()
+        self._connection.execute(SQLITE_ADD_SETTLEMENT, (_settlement_label(payload), json.dumps(payload), now, now))
+
+    def _add_settlement(self, payload: SettlementPayload) -> None:
+        """
+        Добавляет уведомление в очередь под блокировкой соединения.
+        """
+        with self._lock:
+            self._insert_settlement(payload)
+
+    async def start(self) -> None:
+        if self._connection is None:
+            await asyncio.to_thread(self._open)
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            with self._lock:
+                self._connection.close()
+            self._connection = None
+
+    async def add_settlement(self, payload: SettlementPayload) -> None:
+        """
+        Сохраняет уведомление в очередь отдельной транзакцией.
+
+        :param payload: Тело запроса POST /bets/update.
+        """
+        await asyncio.to_thread(self._add_settlement, payload)
+
+    async def claim_settlements(self, now: float, lease_until: float, limit: int) -> List[SettlementMessage]:
+        rows = await asyncio.to_thread(
+            self._execute, SQLITE_CLAIM_SETTLEMENTS, {"now": now, "lease_until": lease_until, "limit": limit}
+        )
+        rows.sort(key=lambda row: row["id"])
+        return [(row["id"], row["event_id"], json.loads(row["payload"]), row["attempts"]) for row in rows]
+
+    async def delete_settlement(self, message_id: int) -> None:
+        await asyncio.to_thread(self._execute, SQLITE_DELETE_SETTLEMENT, (message_id,))
+
+    async def retry_settlement(self, message_id: int, attempts: int, next_attempt_at: float, error: str) -> None:
+        await asyncio.to_thread(self._execute, SQLITE_RETRY_SETTLEMENT, (attempts, next_attempt_at, error, message_id))
+
+    async def fail_settlement(self, message_id: int, attempts: int, error: str) -> None:
+        await asyncio.to_thread(self._execute, SQLITE_FAIL_SETTLEMENT, (attempts, time.time(), error, message_id))
+
+    async def next_settlement_due(self) -> Optional[float]:
+        rows = await asyncio.to_thread(self._execute, SQLITE_NEXT_SETTLEMENT_DUE)
+        return rows[0]["due"]
+
+
+class SQLiteEventBackend(SQLiteSettlementOutbox, EventBackend):
+    """
+    Хранилище событий в файле SQLite.
+
+    Подходит для нескольких процессов line-provider на одной машине: запись
+    выполняется в транзакции BEGIN IMMEDIATE, поэтому версии записей всегда
+    фиксируются в порядке возрастания. Модуль sqlite3 кэширует скомпилированные
+    запросы на соединении, и повторные запросы не разбираются заново.
+    """
+
+    create_tables = SQLITE_CREATE_TABLES + SQLITE_CREATE_OUTBOX
+
+    def _write(self, query: str, parameters: Sequence, event: Event, change: str,
+               settlement: Optional[SettlementPayload] = None) -> Optional[int]:
+        """
+        Записывает событие, изменение в журнал и уведомление в очередь в одной транзакции.
+        """
+        versions = self._write_many(query, [parameters], [event], [change], settlement)
+        return versions[0] if versions else None
+
+    def _write_many(self, query: str, parameters: List[Sequence], events: List[Event],
+                    changes: List[str], settlement: Optional[SettlementPayload] = None) -> Optional[List[int]]:
+        """
+        Записывает пакет событий, изменения в журнал и уведомление в очередь в одной транзакции.
+
+        Если запрос не затронул хотя бы одно событие, транзакция откатывается.
+        """
+        versions = []
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                for event_parameters, event, change in zip(parameters, events, changes):
+                    rows = self._connection.execute(query, event_parameters).fetchall()
+                    if not rows:
+                        self._connection.execute("ROLLBACK")
+                        return None
+                    version = rows[0]["version"]
+                    self._log_change(version, change, event)
+                    versions.append(version)
+                if settlement is not None:
+                    self._insert_settlement(settlement)
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        return versions
+
+    def _log_change(self, version: int, change: str, event: Event) -> None:
+        """
+        Добавляет запись в журнал изменений в текущей транзакции.
+        """
+        self._connection.execute(SQLITE_LOG_CHANGE, (
+            version, change, event.event_id, event.coefficient,
+            event.deadline.isoformat(), event.state.value, time.time(),
+        ))
+
+    def _close_expired(self, event_ids: List[str], now: datetime) -> List[VersionedEvent]:
+        """
+        Закрывает события с истёкшим дедлайном в одной транзакции.
+
+        Дедлайн хранится строкой, поэтому статус и дедлайн проверяются после чтения
+        строки внутри той же транзакции BEGIN IMMEDIATE.
+        """
+        closed = []
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                for event_id in event_ids:
+                    row = self._connection.execute(SQLITE_GET_EVENT, (event_id,)).fetchone()
+                    if row is None:
+                        continue
+                    event = _sqlite_row_to_event(row)
+                    if event.state != EventState.NEW or not _is_expired(event, now):
+                        continue
+                    event = event.model_copy(update={"state": EventState.CLOSED})
+                    version = self._connection.execute(
+                        SQLITE_UPDATE_EVENT, (event.coefficient, row["deadline"], event.state.value, event_id)
+                    ).fetchone()["version"]
+                    self._log_change(version, "closed", event)
+                    closed.append((event, version))
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        return closed
+
+    def _read_snapshot(self) -> Tuple[int, List[VersionedEvent]]:
+        """
+        Читает все события и последнюю версию в одной транзакции.
+        """
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                version = self._connection.execute(SQLITE_MAX_VERSION).fetchone()["version"]
+                rows = self._connection.execute(SQLITE_ALL_EVENTS).fetchall()
+            finally:
+                self._connection.execute("COMMIT")
+        return version, [(_sqlite_row_to_event(row), row["version"]) for row in rows]
+
+    async def insert(self, event: Event) -> Optional[int]:
+        parameters = (event.event_id, event.coefficient, event.deadline.isoformat(), event.state.value)
+        return await asyncio.to_thread(self._write, SQLITE_INSERT_EVENT, parameters, event, "created")
+
+    async def update(self, event: Event, change: str,
+                     settlement: Optional[SettlementPayload] = None) -> Optional[int]:
+        parameters = (event.coefficient, event.deadline.isoformat(), event.state.value, event.event_id)
+        return await asyncio.to_thread(self._write, SQLITE_UPDATE_EVENT, parameters, event, change, settlement)
+
+    async def insert_many(self, events: List[Event]) -> Optional[List[int]]:
+        parameters = [
+            (event.event_id, event.coefficient, event.deadline.isoformat(), event.state.value) for event in events
+        ]
+        return await asyncio.to_thread(
+            self._write_many, SQLITE_INSERT_EVENT, parameters, events, ["created"] * len(events)
+        )
+
+    async def update_many(self, events: List[Event], changes: List[str],
+                          settlement: Optional[SettlementPayload] = None) -> Optional[List[int]]:
+        parameters = [
+            (event.coefficient, event.deadline.isoformat(), event.state.value, event.event_id) for event in events
+        ]
+        return await asyncio.to_thread(
+            self._write_many, SQLITE_UPDATE_EVENT, parameters, events, changes, settlement
+        )
+
+    async def close_expired(self, event_ids: List[str], now: datetime) -> List[VersionedEvent]:
+        return await asyncio.to_thread(self._close_expired, event_ids, now)
+
+    async def get(self, event_id: str) -> Optional[VersionedEvent]:
+        rows = await asyncio.to_thread(self._execute, SQLITE_GET_EVENT, (event_id,))
+        return (_sqlite_row_to_event(rows[0]), rows[0]["version"]) if rows else None
+
+    async def snapshot(self) -> Tuple[int, List[VersionedEvent]]:
+        return await asyncio.to_thread(self._read_snapshot)
+
+    async def changes(self, since: int) -> List[EventChange]:
+        rows = await asyncio.to_thread(self._execute, SQLITE_EVENT_CHANGES, (since,))
+        return [(row["version"], row["change"], _sqlite_row_to_event(row)) for row in rows]
+
+    async def prune(self, older_than: float) -> None:
+        await asyncio.to_thread(self._execute, SQLITE_PRUNE_CHANGES, (time.time() - older_than,))
+
+
+POSTGRES_CREATE_TABLES = """
+CREATE TABLE IF NOT EXISTS events (
+    event_id VARCHAR(255) PRIMARY KEY,
+    coefficient DOUBLE PRECISION NOT NULL,
+    deadline TIMESTAMPTZ NOT NULL,
+    state VARCHAR(20) NOT NULL,
+    version BIGINT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS event_changes (
+    version BIGINT PRIMARY KEY,
+    change VARCHAR(20) NOT NULL,
+    event_id VARCHAR(255) NOT NULL,
+    coefficient DOUBLE PRECISION NOT NULL,
+    deadline TIMESTAMPTZ NOT NULL,
+    state VARCHAR(20) NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE SEQUENCE IF NOT EXISTS event_version_seq;
+CREATE INDEX IF NOT EXISTS event_changes_created_at_idx ON event_changes (created_at);
+CREATE TABLE IF NOT EXISTS settlement_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    event_id TEXT NOT NULL,
+    payload JSONB NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at DOUBLE PRECISION NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    failed_at TIMESTAMPTZ,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS settlement_outbox_due_idx
+ON settlement_outbox (next_attempt_at) WHERE failed_at IS NULL;
+"""
+
+_POSTGRES_LOG_WRITTEN = """
+INSERT INTO event_changes (version, change, event_id, coefficient, deadline, state)
+SELECT version, $5, event_id, coefficient, deadline, state FROM written
+RETURNING version
+"""
+
+POSTGRES_INSERT_EVENT = """
+WITH written AS (
+    INSERT INTO events (event_id, coefficient, deadline, state, version)
+    VALUES ($1, $2, $3, $4, nextval('event_version_seq'))
+    ON CONFLICT (event_id) DO NOTHING
+    RETURNING event_id, coefficient, deadline, state, version
+)
+""" + _POSTGRES_LOG_WRITTEN
+
+POSTGRES_UPDATE_EVENT = """
+WITH written AS (
+    UPDATE events
+    SET coefficient = $2, deadline = $3, state = $4, version = nextval('event_version_seq')
+    WHERE event_id = $1
+    RETURNING event_id, coefficient, deadline, state, version
+)
+""" + _POSTGRES_LOG_WRITTEN
+
+_POSTGRES_LOG_WRITTEN_BATCH = """
+INSERT INTO event_changes (version, change, event_id, coefficient, deadline, state)
+SELECT version, change, event_id, coefficient, deadline, state FROM written
+RETURNING event_id, version
+"""
+
+# Пакетные запросы получают колонки событий массивами ($1 — идентификаторы, $2 — коэффициенты,
+# $3 — дедлайны, $4 — статусы, $5 — типы изменений) и записывают весь пакет одним запросом.
+POSTGRES_INSERT_EVENTS = """
+WITH written AS (
+    INSERT INTO events (event_id, coefficient, deadline, state, version)
+    SELECT event_id, coefficient, deadline, state, nextval('event_version_seq')
+    FROM unnest($1::varchar[], $2::float8[], $3::timestamptz[], $4::varchar[]) WITH ORDINALITY
+        AS batch (event_id, coefficient, deadline, state, position)
+    ORDER BY position
+    ON CONFLICT (event_id) DO NOTHING
+    RETURNING event_id, coefficient, deadline, state, version, $5::varchar AS change
+)
+""" + _POSTGRES_LOG_WRITTEN_BATCH
+
+POSTGRES_UPDATE_EVENTS = """
+WITH written AS (
+    UPDATE events
+    SET coefficient = batch.coefficient, deadline = batch.deadline, state = batch.state,
+        version = nextval('event_version_seq')
+    FROM unnest($1::varchar[], $2::float8[], $3::timestamptz[], $4::varchar[], $5::varchar[])
+        AS batch (event_id, coefficient, deadline, state, change)
+    WHERE events.event_id = batch.event_id
+    RETURNING events.event_id, events.coefficient, events.deadline, events.state, events.version, batch.change
+)
+""" + _POSTGRES_LOG_WRITTEN_BATCH
+
+# $1 — идентификаторы событий, $2 — текущее время, $3 — статус закрытого события, $4 — статус нового события.
+POSTGRES_CLOSE_EXPIRED_EVENTS = """
+WITH written AS (
+    UPDATE events
+    SET state = $3, version = nextval('event_version_seq')
+    WHERE event_id = ANY($1::varchar[]) AND state = $4 AND deadline <= $2
+    RETURNING event_id, coefficient, deadline, state, version
+), logged AS (
+    INSERT INTO event_changes (version, change, event_id, coefficient, deadline, state)
+    SELECT version, 'closed', event_id, coefficient, deadline, state FROM written
+)
+SELECT event_id, coefficient, deadline, state, version FROM written ORDER BY version
+"""
+
+POSTGRES_GET_EVENT = "SELECT event_id, coefficient, deadline, state, version FROM events WHERE event_id = $1"
+
+POSTGRES_ALL_EVENTS = "SELECT event_id, coefficient, deadline, state, version FROM events"
+
+POSTGRES_MAX_VERSION = "SELECT COALESCE(MAX(version), 0) FROM events"
+
+POSTGRES_EVENT_CHANGES = """
+SELECT version, change, event_id, coefficient, deadline, state FROM event_changes
+WHERE version > $1 ORDER BY version
+"""
+
+POSTGRES_PRUNE_CHANGES = "DELETE FROM event_changes WHERE created_at < CURRENT_TIMESTAMP - make_interval(secs => $1)"
+
+POSTGRES_ADD_SETTLEMENT = """
+INSERT INTO settlement_outbox (event_id, payload, next_attempt_at) VALUES ($1, $2::jsonb, $3)
+"""
+
+# Выбранные строки блокируются с SKIP LOCKED, поэтому процессы, одновременно
+# разбирающие очередь, не получают одно и то же уведомление.
+POSTGRES_CLAIM_SETTLEMENTS = """
+UPDATE settlement_outbox SET next_attempt_at = $2
+WHERE id IN (
+    SELECT id FROM settlement_outbox
+    WHERE failed_at IS NULL AND next_attempt_at <= $1
+    ORDER BY id
+    LIMIT $3
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING id, event_id, payload::text AS payload, attempts
+"""
+
+POSTGRES_DELETE_SETTLEMENT = "DELETE FROM settlement_outbox WHERE id = $1"
+
+POSTGRES_RETRY_SETTLEMENT = """
+UPDATE settlement_outbox SET attempts = $2, next_attempt_at = $3, last_error = $4 WHERE id = $1
+"""
+
+POSTGRES_FAIL_SETTLEMENT = """
+UPDATE settlement_outbox SET attempts = $2, failed_at = CURRENT_TIMESTAMP, last_error = $3 WHERE id = $1
+"""
+
+POSTGRES_NEXT_SETTLEMENT_DUE = "SELECT MIN(next_attempt_at) FROM settlement_outbox WHERE failed_at IS NULL"
+
+
+def _postgres_row_to_event(row: asyncpg.Record) -> Event:
+    """
+    Преобразует строку таблицы PostgreSQL в событие.
+    """
+    return Event(
+        event_id=row["event_id"],
+        coefficient=row["coefficient"],
+        deadline=row["deadline"],
+        state=EventState(row["state"]),
+    )
+
+
+class PostgresEventBackend(EventBackend):
+    """
+    Хранилище событий в PostgreSQL.
+
+    Подходит для любого числа процессов и машин. Запись события выполняется
+    под транзакционной advisory-блокировкой, поэтому версии из последовательности
+    фиксируются строго по порядку и синхронизация по условию version > N не
+    пропускает изменения. asyncpg подготавливает каждый запрос один раз
+    на соединение пула и затем переиспользует подготовленный оператор.
+    """
+
+    def __init__(self, dsn: str, pool_size: int) -> None:
+        self.dsn = dsn
+        self.pool_size = pool_size
+        self._pool: Optional[asyncpg.Pool] = None
+
+    async def start(self) -> None:
+        if self._pool is not None:
+            return
+        self._pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=self.pool_size)
+        async with self._pool.acquire() as connection:
+            async with connection.transaction():
+                await connection.execute("SELECT pg_advisory_xact_lock($1)", EVENTS_SCHEMA_LOCK_ID)
+                await connection.execute(POSTGRES_CREATE_TABLES)
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    @staticmethod
+    async def _add_settlement(connection: asyncpg.Connection, settlement: Optional[SettlementPayload]) -> None:
+        """
+        Добавляет уведомление в очередь в текущей транзакции.
+        """
+        if settlement is not None:
+            await connection.execute(
+                POSTGRES_ADD_SETTLEMENT, _settlement_label(settlement), json.dumps(settlement), time.time()
+            )
+
+    async def _write(self, query: str, event: Event, change: str,
+                     settlement: Optional[SettlementPayload] = None) -> Optional[int]:
+        """
+        Записывает событие, изменение в журнал и уведомление в очередь
+        под транзакционной advisory-блокировкой.
+        """
+        async with self._pool.acquire() as connection:
+            async with connection.transaction():
+                await connection.execute("SELECT pg_advisory_xact_lock($1)", EVENTS_WRITE_LOCK_ID)
+                version = await connection.fetchval(
+                    query, event.event_id, event.coefficient, event.deadline, event.state.value, change
+                )
+                if version is not None:
+                    await self._add_settlement(connection, settlement)
+                return version
+
+    async def _write_many(self, query: str, events: List[Event], change: Union[str, List[str]],
+                          settlement: Optional[SettlementPayload] = None) -> Optional[List[int]]:
+        """
+        Записывает пакет событий и изменения в журнал одним запросом, а уведомление — в очередь,
+        под транзакционной advisory-блокировкой. Если запрос затронул не все события,
+        транзакция откатывается.
+        """
+        async with self._pool.acquire() as connection:
+            transaction = connection.transaction()
+            await transaction.start()
+            try:
+                await connection.execute("SELECT pg_advisory_xact_lock($1)", EVENTS_WRITE_LOCK_ID)
+                rows = await connection.fetch(
+                    query,
+                    [event.event_id for event in events],
+                    [event.coefficient for event in events],
+                    [event.deadline for event in events],
+                    [event.state.value for event in events],
+                    change,
+                )
+                if len(rows) == len(events):
+                    await self._add_settlement(connection, settlement)
+            except BaseException:
+                await transaction.rollback()
+                raise
+            if len(rows) != len(events):
+                await transaction.rollback()
+                return None
+            await transaction.commit()
+        versions = {row["event_id"]: row["version"] for row in rows}
+        return [versions[event.event_id] for event in events]
+
+    async def insert(self, event: Event) -> Optional[int]:
+        return await self._write(POSTGRES_INSERT_EVENT, event, "created")
+
+    async def update(self, event: Event, change: str,
+                     settlement: Optional[SettlementPayload] = None) -> Optional[int]:
+        return await self._write(POSTGRES_UPDATE_EVENT, event, change, settlement)
+
+    async def insert_many(self, events: List[Event]) -> Optional[List[int]]:
+        return await self._write_many(POSTGRES_INSERT_EVENTS, events, "created")
+
+    async def update_many(self, events: List[Event], changes: List[str],
+                          settlement: Optional[SettlementPayload] = None) -> Optional[List[int]]:
+        return await self._write_many(POSTGRES_UPDATE_EVENTS, events, changes, settlement)
+
+    async def close_expired(self, event_ids: List[str], now: datetime) -> List[VersionedEvent]:
+        async with self._pool.acquire() as connection:
+            async with connection.transaction():
+                await connection.execute("SELECT pg_advisory_xact_lock($1)", EVENTS_WRITE_LOCK_ID)
+                rows = await connection.fetch(
+                    POSTGRES_CLOSE_EXPIRED_EVENTS, event_ids, now, EventState.CLOSED.value, EventState.NEW.value
+                )
+        return [(_postgres_row_to_event(row), row["version"]) for row in rows]
+
+    async def get(self, event_id: str) -> Optional[VersionedEvent]:
+        row = await self._pool.fetchrow(POSTGRES_GET_EVENT, event_id)
+        return (_postgres_row_to_event(row), row["version"]) if row else None
+
+    async def snapshot(self) -> Tuple[int, List[VersionedEvent]]:
+        async with self._pool.acquire() as connection:
+            async with connection.transaction(isolation="repeatable_read", readonly=True):
+                version = await connection.fetchval(POSTGRES_MAX_VERSION)
+                rows = await connection.fetch(POSTGRES_ALL_EVENTS)
+        return version, [(_postgres_row_to_event(row), row["version"]) for row in rows]
+
+    async def changes(self, since: int) -> List[EventChange]:
+        rows = await self._pool.fetch(POSTGRES_EVENT_CHANGES, since)
+        return [(row["version"], row["change"], _postgres_row_to_event(row)) for row in rows]
+
+    async def prune(self, older_than: float) -> None:
+        await self._pool.execute(POSTGRES_PRUNE_CHANGES, older_than)
+
+    async def claim_settlements(self, now: float, lease_until: float, limit: int) -> List[SettlementMessage]:
+        rows = await self._pool.fetch(POSTGRES_CLAIM_SETTLEMENTS, now, lease_until, limit)
+        rows = sorted(rows, key=lambda row: row["id"])
+        return [(row["id"], row["event_id"], json.loads(row["payload"]), row["attempts"]) for row in rows]
+
+    async def delete_settlement(self, message_id: int) -> None:
+        await self._pool.execute(POSTGRES_DELETE_SETTLEMENT, message_id)
+
+    async def retry_settlement(self, message_id: int, attempts: int, next_attempt_at: float, error: str) -> None:
+        await self._pool.execute(POSTGRES_RETRY_SETTLEMENT, message_id, attempts, next_attempt_at, error)
+
+    async def fail_settlement(self, message_id: int, attempts: int, error: str) -> None:
+        await self._pool.execute(POSTGRES_FAIL_SETTLEMENT, message_id, attempts, error)
+
+    async def next_settlement_due(self) -> Optional[float]:
+        return await self._pool.fetchval(POSTGRES_NEXT_SETTLEMENT_DUE)
+
+
+def create_backend(url: str, pool_size: int, outbox_path: str) -> EventBackend:
+    """
+    Создаёт хранилище событий по адресу из настроек.
+
+    :param url: memory://, sqlite:///путь/к/файлу или postgresql://пользователь:пароль@хост/база.
+    :param pool_size: Размер пула соединений PostgreSQL.
+    :param outbox_path: Файл SQLite с очередью уведомлений для хранилища в памяти.
+    :return: Хранилище событий.
+    :raises ValueError: Если схема адреса не поддерживается.
+    """
+    scheme, _, location = url.partition("://")
+    if scheme == "memory":
+        return MemoryEventBackend(outbox_path)
+    if scheme == "sqlite":
+        return SQLiteEventBackend(location.removeprefix("/"))
+    if scheme in ("postgres", "postgresql"):
+        return PostgresEventBackend(url, pool_size)
+    raise ValueError(f"Unsupported event storage: {url}")
@@ -0,0 +1,433 @@
+import asyncio
+import hashlib
+import heapq
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import TypeAdapter
+
+from metrics import EVENT_STORAGE_DURATION, EVENTS_SNAPSHOT_REQUESTS
+from models import Event, EventState
+from profiling import record_stage
+from storage import EventBackend, SettlementPayload
+
+logger = logging.getLogger(__name__)
+
+_events_adapter = TypeAdapter(List[Event])
+
+FINISHED_STATES = {EventState.FINISHED_WIN, EventState.FINISHED_LOSE}
+
+CHANGE_LOG_PRUNE_INTERVAL = 60.0
+
+
+def _change_type(event: Event) -> str:
+    """
+    Возвращает тип изменения для журнала по новому статусу события.
+
+    :param event: Событие после изменения.
+    :return: settled, closed или updated.
+    """
+    if event.state in FINISHED_STATES:
+        return "settled"
+    if event.state == EventState.CLOSED:
+        return "closed"
+    return "updated"
+
+
+@contextmanager
+def _storage_call(operation: str) -> Iterator[None]:
+    """
+    Учитывает длительность обращения к хранилищу в метриках и в разбивке запроса по этапам.
+
+    :param operation: Имя операции хранилища.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        EVENT_STORAGE_DURATION.labels(operation).observe(elapsed)
+        record_stage("storage", elapsed)
+
+
+def _deadline_key(deadline: datetime) -> datetime:
+    """
+    Приводит дедлайн к сравнимому виду: дедлайн без часового пояса считается UTC.
+
+    :param deadline: Дедлайн события.
+    :return: Дедлайн с часовым поясом.
+    """
+    return deadline if deadline.tzinfo is not None else deadline.replace(tzinfo=timezone.utc)
+
+
+class EventStore:
+    """
+    Кэш событий в памяти процесса поверх постоянного хранилища.
+
+    События доступны по идентификатору за O(1). Активные события (дедлайн
+    которых ещё не истёк) хранятся отдельно, а куча дедлайнов позволяет
+    исключать истёкшие события лениво, при обращении к списку активных:
+    каждое событие покидает активный набор за O(log N) один раз, без обхода
+    всех событий на каждом запросе.
+
+    Каждое изменение активного набора увеличивает версию кэша. Сериализованный
+    в JSON список активных событий строится заново только при смене версии.
+
+    Изменения сначала записываются в хранилище, а затем применяются к кэшу.
+    Если хранилище общее для нескольких процессов, кэш раз в sync_interval
+    секунд забирает из журнала изменений записи с версией больше последней
+    полученной, а событие, которого нет в кэше, читается из хранилища при обращении.
+    Запись применяется к кэшу, только если её версия новее уже имеющейся; версия записи
+    сохраняется в поле version события, чтобы получатели изменений могли упорядочить их.
+    Записи журнала старше change_log_retention секунд удаляются.
+
+    Обработчик on_change вызывается с типом изменения (created, updated, closed или settled),
+    событием и версией записи. Для общего хранилища он вызывается при синхронизации
+    для всех изменений, включая сделанные этим процессом, поэтому все процессы
+    сообщают об изменениях в одном порядке — по возрастанию версий. Обработчик
+    on_expire вызывается с событиями, покинувшими активный набор из-за истечения дедлайна,
+    а on_schedule — когда ближайшим дедлайном становится дедлайн добавленного или изменённого события.
+    """
+
+    def __init__(self, backend: EventBackend, sync_interval: float, change_log_retention: float,
+                 on_change: Optional[Callable[[str, Event, int], None]] = None,
+                 on_expire: Optional[Callable[[List[Event]], None]] = None,
+                 on_schedule: Optional[Callable[[], None]] = None) -> None:
+        self.backend = backend
+        self.sync_interval = sync_interval
+        self.change_log_retention = change_log_retention
+        self._on_change = on_change
+        self._on_expire = on_expire
+        self._on_schedule = on_schedule
+        self._events: Dict[str, Event] = {}
+        self._active: Dict[str, Event] = {}
+        self._deadlines: List[Tuple[datetime, str]] = []
+        self._indexed: Dict[str, datetime] = {}
+        self._version = 0
+        self._synced_version = 0
+        self._snapshot: Optional[Tuple[int, str, bytes]] = None
+        self._sync_task: Optional[asyncio.Task] = None
+
+    def __contains__(self, event_id: str) -> bool:
+        return event_id in self._events
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __iter__(self) -> Iterator[Event]:
+        return iter(self._events.values())
+
+    async def start(self, seed: Iterable[Event] = ()) -> None:
+        """
+        Подключается к хранилищу, добавляет начальные события, которых в нём ещё нет,
+        загружает все события в кэш и запускает периодическую синхронизацию.
+
+        :param seed: Начальные события.
+        """
+        await self.backend.start()
+        for event in seed:
+            await self.backend.insert(event)
+        version, rows = await self.backend.snapshot()
+        for event, event_version in rows:
+            self._apply(event, event_version)
+        self._synced_version = version
+        if self.backend.shared and self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync_loop())
+
+    async def close(self) -> None:
+        """
+        Останавливает синхронизацию и закрывает подключение к хранилищу.
+        """
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
+        await self.backend.close()
+
+    def get(self, event_id: str) -> Optional[Event]:
+        """
+        Возвращает событие из кэша по идентификатору.
+
+        :param event_id: Уникальный идентификатор события.
+        :return: Событие или None, если его нет в кэше.
+        """
+        return self._events.get(event_id)
+
+    async def fetch(self, event_id: str) -> Optional[Event]:
+        """
+        Возвращает событие по идентификатору, читая его из хранилища при промахе кэша.
+
+        :param event_id: Уникальный идентификатор события.
+        :return: Событие или None, если оно не найдено.
+        """
+        event = self._events.get(event_id)
+        if event is None:
+            with _storage_call("get"):
+                row = await self.backend.get(event_id)
+            if row is not None:
+                self._apply(*row)
+                event = self._events.get(event_id)
+        return event
+
+    async def create(self, event: Event) -> Optional[Event]:
+        """
+        Сохраняет новое событие.
+
+        :param event: Событие.
+        :return: Сохранённое событие с версией записи или None, если событие
+            с таким идентификатором уже существует.
+        """
+        with _storage_call("insert"):
+            version = await self.backend.insert(event)
+        if version is None:
+            return None
+        event = self._apply(event, version)
+        if not self.backend.shared:
+            self._notify("created", event, version)
+        return event
+
+    async def update(self, event: Event, settlement: Optional[SettlementPayload] = None) -> Optional[Event]:
+        """
+        Сохраняет изменения существующего события.
+
+        :param event: Событие.
+        :param settlement: Уведомление bet-maker о результате события, сохраняемое в очередь
+            хранилища в одной транзакции с изменением.
+        :return: Сохранённое событие с версией записи или None, если событие не найдено.
+        """
+        change = _change_type(event)
+        with _storage_call("update"):
+            version = await self.backend.update(event, change, settlement)
+        if version is None:
+            return None
+        event = self._apply(event, version)
+        if not self.backend.shared:
+            self._notify(change, event, version)
+        return event
+
+    async def create_many(self, events: List[Event]) -> Optional[List[Event]]:
+        """
+        Сохраняет пакет новых событий в одной транзакции хранилища.
+
+        :param events: События с различными идентификаторами.
+        :return: Сохранённые события с версиями записей или None, если хотя бы одно
+            событие уже существует; тогда не сохраняется ни одно.
+        """
+        with _storage_call("insert_many"):
+            versions = await self.backend.insert_many(events)
+        if versions is None:
+            return None
+        created = []
+        for event, version in zip(events, versions):
+            event = self._apply(event, version)
+            if not self.backend.shared:
+                self._notify("created", event, version)
+            created.append(event)
+        return created
+
+    async def update_many(self, events: List[Event],
+                          settlement: Optional[SettlementPayload] = None) -> Optional[List[Event]]:
+        """
+        Сохраняет изменения пакета существующих событий в одной транзакции хранилища.
+
+        :param events: События с различными идентификаторами.
+        :param settlement: Уведомление bet-maker о результатах событий пакета, сохраняемое
+            в очередь хранилища в той же транзакции.
+        :return: Сохранённые события с версиями записей или None, если хотя бы одно
+            событие не найдено; тогда не изменяется ни одно.
+        """
+        changes = [_change_type(event) for event in events]
+        with _storage_call("update_many"):
+            versions = await self.backend.update_many(events, changes, settlement)
+        if versions is None:
+            return None
+        updated = []
+        for event, change, version in zip(events, changes, versions):
+            event = self._apply(event, version)
+            if not self.backend.shared:
+                self._notify(change, event, version)
+            updated.append(event)
+        return updated
+
+    async def close_expired(self, events: List[Event]) -> List[Event]:
+        """
+        Закрывает приём ставок на события, дедлайн которых истёк.
+
+        Событие закрывается, только если к моменту записи оно всё ещё в статусе new
+        и его дедлайн не перенесён, поэтому процессы с общим хранилищем могут закрывать
+        одни и те же события: изменение запишет один из них.
+
+        :param events: События с истёкшим дедлайном.
+        :return: События, закрытые этим вызовом.
+        """
+        with _storage_call("close_expired"):
+            rows = await self.backend.close_expired(
+                [event.event_id for event in events], datetime.now(timezone.utc)
+            )
+        closed = []
+        for event, version in rows:
+            event = self._apply(event, version)
+            if not self.backend.shared:
+                self._notify("closed", event, version)
+            closed.append(event)
+        return closed
+
+    async def sync(self) -> None:
+        """
+        Применяет к кэшу изменения, записанные в журнал хранилища после последней синхронизации.
+        """
+        with _storage_call("changes"):
+            changes = await self.backend.changes(self._synced_version)
+        for version, change, event in changes:
+            self._notify(change, self._apply(event, version), version)
+            self._synced_version = version
+
+    @property
+    def synced_version(self) -> int:
+        """
+        Возвращает последнюю версию записи, полученную из хранилища при синхронизации.
+        """
+        return self._synced_version
+
+    async def _sync_loop(self) -> None:
+        """
+        Периодически синхронизирует кэш с хранилищем и очищает журнал изменений.
+        """
+        pruned_at = time.monotonic()
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+                if time.monotonic() - pruned_at >= CHANGE_LOG_PRUNE_INTERVAL:
+                    await self.backend.prune(self.change_log_retention)
+                    pruned_at = time.monotonic()
+            except Exception:
+                logger.exception("Event storage sync failed")
+
+    def _apply(self, event: Event, version: int) -> Event:
+        """
+        Применяет к кэшу запись события, если она новее уже имеющейся.
+
+        Запись в кучу дедлайнов добавляется, только если дедлайн изменился
+        или событие возвращается в активный набор. Событие с истёкшим дедлайном
+        в активный набор не возвращается. Если добавленная запись стала ближайшим
+        дедлайном, вызывается обработчик on_schedule.
+
+        :param event: Событие.
+        :param version: Версия записи события в хранилище.
+        :return: Событие с версией записи в поле version.
+        """
+        if event.version != version:
+            event = event.model_copy(update={"version": version})
+        event_id = event.event_id
+        cached = self._events.get(event_id)
+        if cached is not None and cached.version >= version:
+            return event
+        self._events[event_id] = event
+
+        deadline = _deadline_key(event.deadline)
+        if deadline > datetime.now(timezone.utc):
+            if self._indexed.get(event_id) != deadline or event_id not in self._active:
+                self._indexed[event_id] = deadline
+                heapq.heappush(self._deadlines, (deadline, event_id))
+                if self._on_schedule is not None and self._deadlines[0] == (deadline, event_id):
+                    self._on_schedule()
+            self._active[event_id] = event
+            self._version += 1
+        elif self._active.pop(event_id, None) is not None:
+            self._version += 1
+        return event
+
+    def _notify(self, change: str, event: Event, version: int) -> None:
+        """
+        Сообщает обработчику on_change об изменении события.
+
+        :param change: Тип изменения.
+        :param event: Событие после изменения.
+        :param version: Версия записи события в хранилище.
+        """
+        if self._on_change is not None:
+            self._on_change(change, event, version)
+
+    def expire(self, now: Optional[datetime] = None) -> List[Event]:
+        """
+        Исключает из активного набора события, дедлайн которых истёк.
+
+        Записи кучи, не совпадающие с текущим дедлайном события (устаревшие
+        после изменения дедлайна), пропускаются.
+
+        :param now: Текущее время (по умолчанию — текущее время UTC).
+        :return: События, покинувшие активный набор.
+        """
+        now = now or datetime.now(timezone.utc)
+        expired = []
+        while self._deadlines and self._deadlines[0][0] <= now:
+            deadline, event_id = heapq.heappop(self._deadlines)
+            if event_id in self._active and self._indexed.get(event_id) == deadline:
+                expired.append(self._active.pop(event_id))
+        if expired:
+            self._version += 1
+            if self._on_expire is not None:
+                self._on_expire(expired)
+        return expired
+
+    def active(self, now: Optional[datetime] = None) -> List[Event]:
+        """
+        Возвращает список активных событий.
+
+        :param now: Текущее время (по умолчанию — текущее время UTC).
+        :return: События, дедлайн которых ещё не истёк.
+        """
+        self.expire(now)
+        return list(self._active.values())
+
+    def next_deadline(self) -> Optional[datetime]:
+        """
+        Возвращает ближайший дедлайн среди активных событий.
+
+        :return: Дедлайн или None, если активных событий нет.
+        """
+        while self._deadlines:
+            deadline, event_id = self._deadlines[0]
+            if event_id in self._active and self._indexed.get(event_id) == deadline:
+                return deadline
+            heapq.heappop(self._deadlines)
+        return None
+
+    @property
+    def version(self) -> int:
+        """
+        Возвращает версию кэша, увеличивающуюся при каждом изменении активного набора.
+        """
+        return self._version
+
+    def active_snapshot(self, now: Optional[datetime] = None) -> Tuple[str, bytes]:
+        """
+        Возвращает сериализованный в JSON список активных событий и его ETag.
+
+        Сериализация выполняется только при смене версии кэша, в остальных
+        случаях возвращаются ранее построенные байты. События упорядочены
+        по идентификатору, поэтому у всех процессов с одинаковым набором активных
+        событий совпадают и тело ответа, и ETag.
+
+        :param now: Текущее время (по умолчанию — текущее время UTC).
+        :return: ETag и JSON-представление списка активных событий.
+        """
+        self.expire(now)
+        if self._snapshot is None or self._snapshot[0] != self._version:
+            EVENTS_SNAPSHOT_REQUESTS.labels("rebuild").inc()
+            started = time.perf_counter()
+            active = sorted(self._active.values(), key=lambda event: event.event_id)
+            body = _events_adapter.dump_json(active)
+            record_stage("serialization", time.perf_counter() - started)
+            etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+            self._snapshot = (self._version, etag, body)
+        else:
+            EVENTS_SNAPSHOT_REQUESTS.labels("hit").inc()
+        return self._snapshot[1], self._snapshot[2]
@@ -0,0 +1,225 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import AsyncIterator, Deque, List, Optional, Set, Tuple
+
+from config import settings
+from metrics import STREAM_DROPPED_SUBSCRIBERS, STREAM_SUBSCRIBERS
+from models import Event
+from store import EventStore
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_FRAME = b": keep-alive\n\n"
+
+_Frame = Tuple[Optional[int], bytes]
+
+
+class Subscriber:
+    """
+    Подписчик потока изменений событий с собственным ограниченным буфером кадров.
+    """
+
+    __slots__ = ("queue", "dropped")
+
+    def __init__(self, buffer_size: int) -> None:
+        self.queue: "asyncio.Queue[Optional[_Frame]]" = asyncio.Queue(maxsize=buffer_size)
+        self.dropped = False
+
+    def offer(self, frame: _Frame) -> bool:
+        """
+        Кладёт кадр в буфер подписчика без ожидания.
+
+        :param frame: Номер кадра (или None для кадров без номера) и готовый к отправке кадр SSE.
+        :return: False, если буфер переполнен.
+        """
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def close(self) -> None:
+        """
+        Отбрасывает неотправленные кадры и завершает поток подписчика.
+        """
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class EventStream:
+    """
+    Рассылка изменений событий подписчикам в формате server-sent events.
+
+    Номером кадра служит версия записи события в хранилище, поэтому номера
+    возрастают и совпадают у всех процессов, работающих с общим хранилищем.
+    Каждое изменение сериализуется в кадр один раз, после чего кадр
+    раскладывается по буферам всех подписчиков. Буфер каждого подписчика
+    ограничен: подписчик, не успевающий читать поток, отключается и не задерживает
+    остальных. Последние STREAM_HISTORY_SIZE кадров хранятся в памяти, поэтому
+    переподключившийся клиент получает пропущенные изменения, передав номер
+    последнего полученного кадра в заголовке Last-Event-ID.
+
+    Кадры expired вычисляются каждым процессом по дедлайнам, передаются без номера
+    и при переподключении не повторяются. Если клиент переподключился к процессу,
+    который ещё не получил из хранилища последние изменения, кадры с номером
+    не больше переданного клиентом пропускаются.
+    """
+
+    def __init__(self, history_size: int, buffer_size: int, heartbeat_interval: float) -> None:
+        self.buffer_size = buffer_size
+        self.heartbeat_interval = heartbeat_interval
+        self._seq = 0
+        self._floor = 0
+        self._history: Deque[Tuple[int, bytes]] = deque(maxlen=history_size)
+        self._subscribers: Set[Subscriber] = set()
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def seq(self) -> int:
+        """
+        Возвращает номер последнего опубликованного изменения.
+        """
+        return self._seq
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    async def start(self, store: EventStore) -> None:
+        """
+        Запускает рассылку keep-alive кадров.
+
+        :param store: Хранилище событий, изменения которого публикуются.
+        """
+        if self._tasks:
+            return
+        self._seq = self._floor = max(self._seq, store.synced_version)
+        self._tasks = [asyncio.create_task(self._heartbeat())]
+
+    async def stop(self) -> None:
+        """
+        Останавливает фоновые задачи и завершает потоки всех подписчиков.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for subscriber in list(self._subscribers):
+            self._drop(subscriber)
+
+    def publish(self, change: str, event: Event, version: int) -> None:
+        """
+        Публикует изменение события всем подписчикам.
+
+        :param change: Тип изменения: created, updated, closed или settled.
+        :param event: Событие после изменения.
+        :param version: Версия записи события в хранилище.
+        """
+        self._seq = version
+        frame = f"id: {version}\nevent: {change}\ndata: {event.model_dump_json()}\n\n".encode()
+        if len(self._history) == self._history.maxlen:
+            self._floor = self._history[0][0]
+        self._history.append((version, frame))
+        self._fan_out((version, frame))
+
+    def publish_expired(self, events: List[Event]) -> None:
+        """
+        Публикует события, дедлайн которых истёк.
+
+        :param events: События, покинувшие активный набор.
+        """
+        for event in events:
+            self._fan_out((None, f"event: expired\ndata: {event.model_dump_json()}\n\n".encode()))
+
+    def _fan_out(self, frame: _Frame) -> None:
+        """
+        Раскладывает кадр по буферам подписчиков и отключает переполненных.
+        """
+        for subscriber in list(self._subscribers):
+            if not subscriber.offer(frame):
+                logger.warning("Event stream subscriber is too slow, disconnecting")
+                STREAM_DROPPED_SUBSCRIBERS.inc()
+                self._drop(subscriber)
+
+    def _drop(self, subscriber: Subscriber) -> None:
+        """
+        Отключает подписчика от рассылки.
+        """
+        self._remove(subscriber)
+        if not subscriber.dropped:
+            subscriber.dropped = True
+            subscriber.close()
+
+    def _remove(self, subscriber: Subscriber) -> None:
+        """
+        Исключает подписчика из рассылки.
+        """
+        if subscriber in self._subscribers:
+            self._subscribers.discard(subscriber)
+            STREAM_SUBSCRIBERS.dec()
+
+    def _backlog(self, last_seq: Optional[int]) -> List[bytes]:
+        """
+        Возвращает кадры, опубликованные после кадра с номером last_seq.
+
+        Если нужные кадры уже вытеснены из истории или получены до запуска процесса,
+        возвращается кадр reset: клиенту нужно заново запросить список событий.
+        """
+        if last_seq is None or last_seq >= self._seq:
+            return []
+        if last_seq < self._floor:
+            data = json.dumps({"seq": self._seq})
+            return [f"id: {self._seq}\nevent: reset\ndata: {data}\n\n".encode()]
+        return [frame for seq, frame in self._history if seq > last_seq]
+
+    def subscribe(self, last_seq: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        Подписывает клиента на изменения событий.
+
+        :param last_seq: Номер последнего полученного клиентом кадра, начиная
+            с которого нужно продолжить поток.
+        :return: Асинхронный итератор кадров SSE.
+        """
+        subscriber = Subscriber(self.buffer_size)
+        backlog = self._backlog(last_seq)
+        self._subscribers.add(subscriber)
+        STREAM_SUBSCRIBERS.inc()
+        return self._iterate(subscriber, backlog, last_seq if last_seq is not None else self._seq)
+
+    async def _iterate(self, subscriber: Subscriber, backlog: List[bytes], after: int) -> AsyncIterator[bytes]:
+        """
+        Отдаёт пропущенные кадры, а затем кадры из буфера подписчика до его отключения.
+
+        Кадры с номером не больше after, уже полученные клиентом, пропускаются.
+        """
+        try:
+            yield b"retry: 1000\n\n"
+            for frame in backlog:
+                yield frame
+            while True:
+                item = await subscriber.queue.get()
+                if item is None:
+                    return
+                seq, frame = item
+                if seq is None or seq > after:
+                    yield frame
+        finally:
+            self._remove(subscriber)
+
+    async def _heartbeat(self) -> None:
+        """
+        Периодически отправляет подписчикам keep-alive кадры, чтобы простаивающие
+        соединения не закрывались прокси.
+        """
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            self._fan_out((None, HEARTBEAT_FRAME))
+
+
+event_stream = EventStream(
+    history_size=settings.STREAM_HISTORY_SIZE,
+    buffer_size=settings.STREAM_CLIENT_BUFFER_SIZE,
+    heartbeat_interval=settings.STREAM_HEARTBEAT_INTERVAL,
+)
@@ -1,7 +1,13 @@
+from collections import Counter
 from datetime import datetime, timezone
-from typing import Dict
+from typing import List, Optional
+
 from fastapi import HTTPException
 
+from config import settings
+from models import Event
+from store import EventStore
+
 
 def is_deadline_valid(deadline: datetime) -> bool:
     """
@@ -14,17 +20,52 @@ def is_deadline_valid(deadline: datetime) -> bool:
     return deadline > current_time
 
 
-def get_event_or_404(events: Dict[str, dict], event_id: str) -> dict:
+async def get_event_or_404(events: EventStore, event_id: str) -> Event:
     """
     Проверяет существование события с указанным идентификатором.
 
-    :param events: Словарь всех событий (хранится в памяти).
+    Событие, которого ещё нет в кэше процесса, читается из хранилища.
+
+    :param events: Хранилище всех событий.
     :param event_id: Уникальный идентификатор события.
     :return: Событие, если оно найдено.
     :raises HTTPException: Если событие не найдено.
     """
-    event = events.get(event_id)
+    event = await events.fetch(event_id)
     if not event:
         raise HTTPException(status_code=404, detail=f"Event with ID '{event_id}' not found")
     return event
 
+
+def validate_batch(event_ids: List[str]) -> None:
+    """
+    Проверяет размер пакета и уникальность идентификаторов событий в нём.
+
+    :param event_ids: Идентификаторы событий пакета в порядке запроса.
+    :raises HTTPException: Если пакет превышает допустимый размер или идентификаторы повторяются.
+    """
+    if len(event_ids) > settings.EVENT_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch size exceeds the limit of {settings.EVENT_BATCH_MAX_SIZE} events"
+        )
+    duplicates = sorted(event_id for event_id, count in Counter(event_ids).items() if count > 1)
+    if duplicates:
+        raise HTTPException(status_code=400, detail=f"Duplicate event ids in the batch: {', '.join(duplicates)}")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Проверяет, совпадает ли ETag ресурса с одним из значений заголовка If-None-Match.
+
+    :param if_none_match: Значение заголовка If-None-Match.
+    :param etag: Текущий ETag ресурса.
+    :return: True, если клиент уже располагает актуальной версией ресурса.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
@@ -0,0 +1,5 @@
+#!/bin/bash
+# Разрешает подключения для потоковой репликации (сервис postgres-replica).
+# Выполняется образом postgres только при инициализации пустого каталога данных.
+set -e
+echo "host replication all all ${POSTGRES_HOST_AUTH_METHOD:-md5}" >> "$PGDATA/pg_hba.conf"
@@ -0,0 +1,15 @@
+#!/bin/bash
+# Создаёт реплику основной базы через pg_basebackup при первом запуске
+# и запускает PostgreSQL в режиме hot standby.
+set -e
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+    until PGPASSWORD="$POSTGRES_PASSWORD" pg_basebackup -h "$PRIMARY_HOST" -p "${PRIMARY_PORT:-5432}" \
+            -U "$POSTGRES_USER" -D "$PGDATA" -R -X stream; do
+        echo "Waiting for primary $PRIMARY_HOST..."
+        rm -rf "${PGDATA:?}"/*
+        sleep 2
+    done
+    chown -R postgres:postgres "$PGDATA"
+    chmod 700 "$PGDATA"
+fi
+exec docker-entrypoint.sh postgres
@@ -1,6 +1,10 @@
+import os
+
 import pytest
 from aiohttp import ClientSession
 from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from uuid import uuid4
 
 
 async def create_event_if_not_exists(event_id: str, base_url: str, test_event_data: dict = None) -> None:
@@ -69,7 +73,7 @@ async def test_bet_maker_workflow(anyio_backend: str) -> None:
 
     :param anyio_backend: Бэкенд для асинхронного тестирования (например, asyncio).
     """
-    test_event_id = "3"
+    test_event_id = f"workflow_event_{uuid4().hex[:8]}"
 
     await create_event_if_not_exists(test_event_id, base_url="http://line-provider:8001")
 
@@ -87,5 +91,298 @@ async def test_bet_maker_workflow(anyio_backend: str) -> None:
         update_response = await make_request(session, "POST", "/bets/update", json=update_data)
         assert "updated" in update_response["message"]
 
-        bets = await make_request(session, "GET", "/bets")
+        settlement = await make_request(session, "GET", f"/bets/settlements/{test_event_id}")
+        assert settlement["bet_status"] == "won"
+        assert settlement["state"] == "completed"
+
+        bets = await make_request(session, "GET", "/bets", params={"consistent": "true"})
         assert any(bet["status"] == "won" for bet in bets if bet["bet_id"] == bet_id)
+
+
+@pytest.mark.parametrize('anyio_backend', ['asyncio'])
+async def test_bet_maker_batch(anyio_backend: str) -> None:
+    """
+    Тестирует пакетное создание ставок с частичным отказом.
+
+    :param anyio_backend: Бэкенд для асинхронного тестирования (например, asyncio).
+    """
+    test_event_id = f"batch_event_{uuid4().hex[:8]}"
+
+    await create_event_if_not_exists(test_event_id, base_url="http://line-provider:8001")
+
+    batch = {
+        "bets": [
+            {"event_id": test_event_id, "amount": 10.25},
+            {"event_id": "missing_batch_event", "amount": 5},
+            {"event_id": test_event_id, "amount": 20},
+        ]
+    }
+    async with ClientSession(base_url="http://bet-maker:8000") as session:
+        response = await make_request(session, "POST", "/bets/batch", json=batch)
+        assert response["accepted"] == 2
+        assert response["rejected"] == 1
+
+        results = response["results"]
+        assert [result["index"] for result in results] == [0, 1, 2]
+        assert results[1]["bet_id"] is None and results[1]["error"]
+
+        for result, expected_bet in zip((results[0], results[2]), (batch["bets"][0], batch["bets"][2])):
+            bet = await make_request(session, "GET", f"/bets/{result['bet_id']}")
+            validate_bet(bet, expected_bet)
+
+
+@pytest.mark.parametrize('anyio_backend', ['asyncio'])
+async def test_bet_history_pagination(anyio_backend: str) -> None:
+    """
+    Тестирует постраничную выдачу истории ставок и выгрузку в формате NDJSON.
+
+    :param anyio_backend: Бэкенд для асинхронного тестирования (например, asyncio).
+    """
+    test_event_id = f"history_event_{int(datetime.now(timezone.utc).timestamp() * 1000)}"
+
+    await create_event_if_not_exists(test_event_id, base_url="http://line-provider:8001")
+
+    batch = {"bets": [{"event_id": test_event_id, "amount": amount} for amount in (1, 2, 3)]}
+    async with ClientSession(base_url="http://bet-maker:8000") as session:
+        created = await make_request(session, "POST", "/bets/batch", json=batch)
+        bet_ids = [result["bet_id"] for result in created["results"]]
+
+        params = {"event_id": test_event_id, "limit": 2, "order": "asc", "consistent": "true"}
+        async with session.get("/bets", params=params) as response:
+            assert response.status == 200
+            first_page = await response.json()
+            next_cursor = response.headers["X-Next-Cursor"]
+
+        params["cursor"] = next_cursor
+        async with session.get("/bets", params=params) as response:
+            assert response.status == 200
+            second_page = await response.json()
+            assert "X-Next-Cursor" not in response.headers
+
+        assert [bet["bet_id"] for bet in first_page + second_page] == bet_ids
+
+        exported = await make_request(
+            session, "GET", "/bets", return_json=False,
+            params={"event_id": test_event_id, "stream": "true", "consistent": "true"}
+        )
+        lines = [line for line in exported.splitlines() if line]
+        assert len(lines) == len(bet_ids)
+
+
+@pytest.mark.parametrize('anyio_backend', ['asyncio'])
+async def test_event_stats(anyio_backend: str) -> None:
+    """
+    Тестирует агрегаты ставок на событие при создании и расчёте ставок.
+
+    :param anyio_backend: Бэкенд для асинхронного тестирования (например, asyncio).
+    """
+    test_event_id = f"stats_event_{uuid4().hex[:8]}"
+
+    await create_event_if_not_exists(test_event_id, base_url="http://line-provider:8001")
+
+    async with ClientSession(base_url="http://bet-maker:8000") as session:
+        await make_request(
+            session, "GET", f"/events/{test_event_id}/stats", expected_status=404, params={"consistent": "true"}
+        )
+
+        await make_request(
+            session, "POST", "/bets", json={"event_id": test_event_id, "amount": 10}, expected_status=201
+        )
+        batch = {"bets": [{"event_id": test_event_id, "amount": amount} for amount in (2.5, 7.5)]}
+        await make_request(session, "POST", "/bets/batch", json=batch)
+
+        stats = await make_request(
+            session, "GET", f"/events/{test_event_id}/stats", params={"consistent": "true"}
+        )
+        assert stats["bet_count"] == 3 and stats["pending_count"] == 3
+        assert float(stats["total_stake"]) == 20.0
+        assert float(stats["pending_stake"]) == 20.0
+        assert float(stats["pending_liability"]) == 30.0
+
+        await make_request(session, "POST", "/bets/update", json={"event_id": test_event_id, "status": "finished_win"})
+
+        stats = await make_request(
+            session, "GET", f"/events/{test_event_id}/stats", params={"consistent": "true"}
+        )
+        assert stats["bet_count"] == 3 and stats["pending_count"] == 0 and stats["won_count"] == 3
+        assert float(stats["pending_stake"]) == 0.0 and float(stats["pending_liability"]) == 0.0
+        assert float(stats["total_payout"]) == 30.0
+
+
+@pytest.mark.parametrize('anyio_backend', ['asyncio'])
+async def test_bet_idempotency_key(anyio_backend: str) -> None:
+    """
+    Тестирует повтор создания ставки с ключом идемпотентности.
+
+    :param anyio_backend: Бэкенд для асинхронного тестирования (например, asyncio).
+    """
+    test_event_id = f"idempotent_event_{uuid4().hex[:8]}"
+
+    await create_event_if_not_exists(test_event_id, base_url="http://line-provider:8001")
+
+    test_bet = {"event_id": test_event_id, "amount": 15}
+    headers = {"Idempotency-Key": uuid4().hex}
+    async with ClientSession(base_url="http://bet-maker:8000") as session:
+        async with session.post("/bets", json=test_bet, headers=headers) as response:
+            assert response.status == 201
+            assert "Idempotent-Replayed" not in response.headers
+            created_bet = await response.json()
+
+        async with session.post("/bets", json=test_bet, headers=headers) as response:
+            assert response.status == 201
+            assert response.headers["Idempotent-Replayed"] == "true"
+            assert await response.json() == created_bet
+
+        await make_request(
+            session, "POST", "/bets", json={**test_bet, "amount": 16}, headers=headers, expected_status=422
+        )
+
+        stats = await make_request(
+            session, "GET", f"/events/{test_event_id}/stats", params={"consistent": "true"}
+        )
+        assert stats["bet_count"] == 1
+
+
+@pytest.mark.parametrize('anyio_backend', ['asyncio'])
+async def test_settlement_redelivery(anyio_backend: str) -> None:
+    """
+    Тестирует, что повторная передача результата события не меняет завершённый расчёт.
+
+    :param anyio_backend: Бэкенд для асинхронного тестирования (например, asyncio).
+    """
+    test_event_id = f"redelivery_event_{uuid4().hex[:8]}"
+
+    await create_event_if_not_exists(test_event_id, base_url="http://line-provider:8001")
+
+    update_data = {"event_id": test_event_id, "status": "finished_lose"}
+    async with ClientSession(base_url="http://bet-maker:8000") as session:
+        await make_request(
+            session, "POST", "/bets", json={"event_id": test_event_id, "amount": 5}, expected_status=201
+        )
+        await make_request(session, "POST", "/bets/update", json=update_data)
+        settlement = await make_request(session, "GET", f"/bets/settlements/{test_event_id}")
+        assert settlement["state"] == "completed" and settlement["settled_bets"] == 1
+
+        await make_request(session, "POST", "/bets/update", json=update_data)
+        redelivered = await make_request(session, "GET", f"/bets/settlements/{test_event_id}")
+        assert redelivered["state"] == "completed"
+        assert redelivered["completed_at"] == settlement["completed_at"]
+        assert redelivered["updated_at"] == settlement["updated_at"]
+        assert redelivered["settled_bets"] == 1
+
+
+@pytest.mark.parametrize('anyio_backend', ['asyncio'])
+async def test_event_push_order(anyio_backend: str) -> None:
+    """
+    Тестирует, что устаревшее изменение события не заменяет в кэше bet-maker более новое.
+
+    :param anyio_backend: Бэкенд для асинхронного тестирования (например, asyncio).
+    """
+    test_event_id = f"push_order_event_{uuid4().hex[:8]}"
+
+    await create_event_if_not_exists(test_event_id, base_url="http://line-provider:8001")
+
+    async with ClientSession(base_url="http://line-provider:8001") as session:
+        event = await make_request(session, "GET", f"/events/{test_event_id}")
+    assert event["version"] > 0
+
+    async with ClientSession(base_url="http://bet-maker:8000") as session:
+        finished = {**event, "state": "finished_win", "version": event["version"] + 2}
+        stale = {**event, "version": event["version"] + 1}
+        await make_request(session, "POST", "/get_events/push", json=finished, expected_status=204, return_json=False)
+        await make_request(session, "POST", "/get_events/push", json=stale, expected_status=204, return_json=False)
+
+        await make_request(
+            session, "POST", "/bets", json={"event_id": test_event_id, "amount": 5}, expected_status=400
+        )
+
+
+@pytest.mark.parametrize('anyio_backend', ['asyncio'])
+async def test_event_stake_limit(anyio_backend: str) -> None:
+    """
+    Тестирует отказ в ставках сверх лимита суммы ставок на событие.
+
+    Лимит задаётся переменной EVENT_MAX_TOTAL_STAKE и по умолчанию выключен. Тест
+    выполняется, если тот же лимит передан и bet-maker, и тестам, например
+    EVENT_MAX_TOTAL_STAKE=1000000 docker-compose up.
+
+    :param anyio_backend: Бэкенд для асинхронного тестирования (например, asyncio).
+    """
+    max_stake = Decimal(os.environ.get("EVENT_MAX_TOTAL_STAKE", "0"))
+    if max_stake <= 0:
+        pytest.skip("EVENT_MAX_TOTAL_STAKE is not set")
+
+    def share(fraction: str) -> float:
+        """
+        Возвращает долю лимита суммы ставок на событие, округлённую до копеек.
+        """
+        return float((max_stake * Decimal(fraction)).quantize(Decimal("0.01")))
+
+    test_event_id = f"stake_limit_event_{uuid4().hex[:8]}"
+
+    await create_event_if_not_exists(test_event_id, base_url="http://line-provider:8001")
+
+    async with ClientSession(base_url="http://bet-maker:8000") as session:
+        await make_request(
+            session, "POST", "/bets", json={"event_id": f"missing_{uuid4().hex[:8]}", "amount": share("1.1")},
+            expected_status=429
+        )
+
+        await make_request(
+            session, "POST", "/bets", json={"event_id": test_event_id, "amount": share("0.6")}, expected_status=201
+        )
+        await make_request(
+            session, "POST", "/bets", json={"event_id": test_event_id, "amount": share("0.6")}, expected_status=429
+        )
+
+        batch = {"bets": [{"event_id": test_event_id, "amount": share(fraction)}
+                          for fraction in ("0.5", "0.4", "0.0001")]}
+        response = await make_request(session, "POST", "/bets/batch", json=batch)
+        assert [result["bet_id"] is not None for result in response["results"]] == [False, True, False]
+
+        stats = await make_request(
+            session, "GET", f"/events/{test_event_id}/stats", params={"consistent": "true"}
+        )
+        assert stats["bet_count"] == 2
+        assert float(stats["total_stake"]) == share("1")
+
+
+@pytest.mark.parametrize('anyio_backend', ['asyncio'])
+async def test_bets_rejected_after_settlement(anyio_backend: str) -> None:
+    """
+    Тестирует, что после получения результата события ставки на него не принимаются,
+    даже если кэш событий bet-maker всё ещё считает событие открытым.
+
+    :param anyio_backend: Бэкенд для асинхронного тестирования (например, asyncio).
+    """
+    test_event_id = f"settled_event_{uuid4().hex[:8]}"
+    bet_data = {"event_id": test_event_id, "amount": 5}
+
+    await create_event_if_not_exists(test_event_id, base_url="http://line-provider:8001")
+
+    async with ClientSession(base_url="http://line-provider:8001") as session:
+        event = await make_request(session, "GET", f"/events/{test_event_id}")
+
+    async with ClientSession(base_url="http://bet-maker:8000") as session:
+        await make_request(session, "POST", "/bets", json=bet_data, expected_status=201)
+        await make_request(
+            session, "POST", "/bets/update", json={"event_id": test_event_id, "status": "finished_win"}
+        )
+        await make_request(session, "POST", "/bets", json=bet_data, expected_status=400)
+
+        stale = {**event, "version": event["version"] + 10}
+        await make_request(session, "POST", "/get_events/push", json=stale, expected_status=204, return_json=False)
+
+        await make_request(session, "POST", "/bets", json=bet_data, expected_status=400)
+        headers = {"Idempotency-Key": f"settled-{uuid4().hex}"}
+        for _ in range(2):
+            await make_request(session, "POST", "/bets", json=bet_data, headers=headers, expected_status=400)
+        response = await make_request(session, "POST", "/bets/batch", json={"bets": [bet_data, bet_data]})
+        assert response["accepted"] == 0
+
+        stats = await make_request(
+            session, "GET", f"/events/{test_event_id}/stats", params={"consistent": "true"}
+        )
+        assert stats["bet_count"] == 1
+        assert stats["pending_count"] == 0
+        assert stats["won_count"] == 1
@@ -1,4 +1,8 @@
+import asyncio
+import json
 from datetime import datetime, timezone, timedelta
+from typing import Optional
+from uuid import uuid4
 import pytest
 from aiohttp import ClientSession
 
@@ -62,7 +66,7 @@ async def test_line_provider_workflow(anyio_backend: str) -> None:
 
     :param anyio_backend: Бэкенд для асинхронного тестирования (например, asyncio).
     """
-    test_event_id = "test_event_1"
+    test_event_id = f"test_event_{uuid4().hex[:8]}"
     test_deadline = (datetime.now(timezone.utc) + timedelta(minutes=10)).isoformat()
     test_coefficient = 1.5
     test_state = "new"
@@ -92,3 +96,128 @@ async def test_line_provider_workflow(anyio_backend: str) -> None:
 
         updated_event = await get_event(session, test_event_id)
         assert updated_event["state"] == new_status
+
+
+async def read_stream_frames(session: ClientSession, last_event_id: int, count: int,
+                             event_id: Optional[str] = None) -> list:
+    """
+    Читает кадры потока изменений событий, начиная после указанного номера.
+
+    :param session: Экземпляр ClientSession для выполнения запросов.
+    :param last_event_id: Номер последнего полученного кадра.
+    :param count: Количество кадров изменений, которое нужно прочитать.
+    :param event_id: Если указан, учитываются только кадры этого события.
+    :return: Список кадров в виде словарей с полями id, event и data.
+    """
+    frames = []
+    buffer = b""
+    headers = {"Last-Event-ID": str(last_event_id)}
+    async with session.get("/events/stream", headers=headers) as response:
+        assert response.status == 200, f"Failed to open event stream: {await response.text()}"
+        async for chunk in response.content.iter_any():
+            buffer += chunk
+            while b"\n\n" in buffer:
+                raw_frame, buffer = buffer.split(b"\n\n", 1)
+                fields = dict(
+                    line.split(": ", 1) for line in raw_frame.decode().splitlines() if not line.startswith(":")
+                )
+                if "id" in fields and (event_id is None or json.loads(fields["data"]).get("event_id") == event_id):
+                    frames.append(fields)
+                if len(frames) == count:
+                    return frames
+    return frames
+
+
+@pytest.mark.parametrize('anyio_backend', ['asyncio'])
+async def test_event_stream_resume(anyio_backend: str) -> None:
+    """
+    Тестирует получение пропущенных изменений событий из потока по номеру последнего кадра.
+
+    :param anyio_backend: Бэкенд для асинхронного тестирования (например, asyncio).
+    """
+    test_event_id = f"test_stream_event_{uuid4().hex[:8]}"
+    test_deadline = (datetime.now(timezone.utc) + timedelta(minutes=10)).isoformat()
+
+    async with ClientSession(base_url="http://line-provider:8001") as session:
+        last_frames = await asyncio.wait_for(read_stream_frames(session, -1, 1), timeout=5)
+        assert last_frames[0]["event"] == "reset"
+        last_seq = int(last_frames[0]["id"])
+
+        await create_event(session, test_event_id, 2.5, test_deadline, "new")
+        await update_event_status(session, test_event_id, "finished_lose")
+
+        frames = await asyncio.wait_for(read_stream_frames(session, last_seq, 2, test_event_id), timeout=5)
+        assert last_seq < int(frames[0]["id"]) < int(frames[1]["id"])
+        assert [frame["event"] for frame in frames] == ["created", "settled"]
+        assert json.loads(frames[1]["data"])["state"] == "finished_lose"
+
+
+@pytest.mark.parametrize('anyio_backend', ['asyncio'])
+async def test_events_batch(anyio_backend: str) -> None:
+    """
+    Тестирует пакетное создание событий и пакетное обновление их статусов.
+
+    :param anyio_backend: Бэкенд для асинхронного тестирования (например, asyncio).
+    """
+    prefix = f"test_batch_event_{uuid4().hex[:8]}"
+    event_ids = [f"{prefix}_{index}" for index in range(3)]
+    test_deadline = (datetime.now(timezone.utc) + timedelta(minutes=10)).isoformat()
+    test_events = [
+        {"event_id": event_id, "coefficient": 1.5, "deadline": test_deadline, "state": "new"}
+        for event_id in event_ids
+    ]
+
+    async with ClientSession(base_url="http://line-provider:8001") as session:
+        async with session.post("/events/batch", json={"events": test_events}) as response:
+            assert response.status == 201, f"Failed to create events: {await response.text()}"
+            assert [event["event_id"] for event in await response.json()] == event_ids
+
+        conflicting = [{**test_events[0], "event_id": f"{prefix}_new"}, test_events[0]]
+        async with session.post("/events/batch", json={"events": conflicting}) as response:
+            assert response.status == 400
+        async with session.get(f"/events/{prefix}_new") as response:
+            assert response.status == 404, "Batch with an existing event was partially applied"
+
+        updates = [
+            {"event_id": event_ids[0], "state": "finished_win"},
+            {"event_id": f"{prefix}_missing", "state": "finished_win"},
+        ]
+        async with session.patch("/events/status/batch", json={"updates": updates}) as response:
+            assert response.status == 404
+        assert (await get_event(session, event_ids[0]))["state"] == "new"
+
+        updates = [
+            {"event_id": event_ids[0], "state": "finished_win"},
+            {"event_id": event_ids[1], "state": "finished_lose"},
+        ]
+        async with session.patch("/events/status/batch", json={"updates": updates}) as response:
+            assert response.status == 200, f"Failed to update events: {await response.text()}"
+            assert [event["state"] for event in await response.json()] == ["finished_win", "finished_lose"]
+
+        assert (await get_event(session, event_ids[1]))["state"] == "finished_lose"
+        assert (await get_event(session, event_ids[2]))["state"] == "new"
+
+
+@pytest.mark.parametrize('anyio_backend', ['asyncio'])
+async def test_event_closed_at_deadline(anyio_backend: str) -> None:
+    """
+    Тестирует закрытие приёма ставок на событие при наступлении его дедлайна.
+
+    :param anyio_backend: Бэкенд для асинхронного тестирования (например, asyncio).
+    """
+    test_event_id = f"test_closed_event_{uuid4().hex[:8]}"
+    test_deadline = (datetime.now(timezone.utc) + timedelta(seconds=1)).isoformat()
+
+    async with ClientSession(base_url="http://line-provider:8001") as session:
+        last_frames = await asyncio.wait_for(read_stream_frames(session, -1, 1), timeout=5)
+        last_seq = int(last_frames[0]["id"])
+
+        await create_event(session, test_event_id, 1.5, test_deadline, "new")
+
+        frames = await asyncio.wait_for(read_stream_frames(session, last_seq, 2, test_event_id), timeout=5)
+        assert [frame["event"] for frame in frames] == ["created", "closed"]
+        assert json.loads(frames[1]["data"])["state"] == "closed"
+
+        assert (await get_event(session, test_event_id))["state"] == "closed"
+        async with session.get("/events") as response:
+            assert test_event_id not in [event["event_id"] for event in await response.json()]